@@ -2,11 +2,39 @@ import os
 import json
 import logging
 from openai import OpenAI
+from suggestion_cache import suggestion_cache_key, get_cached_suggestions, store_suggestions
+from llm_gateway import LLMGateway, LLMUnavailable
+from metrics import Counter, timed
 
 # Initialize OpenAI client
 OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY")
 openai_client = OpenAI(api_key=OPENAI_API_KEY) if OPENAI_API_KEY else None
 
+# Bounds concurrency and latency of model calls so a slow upstream cannot stall every worker
+llm_gateway = LLMGateway(
+    max_concurrent=int(os.environ.get("LLM_MAX_CONCURRENCY", 4)),
+    timeout=float(os.environ.get("LLM_TIMEOUT", 20.0)),
+    queue_timeout=float(os.environ.get("LLM_QUEUE_TIMEOUT", 5.0)),
+    failure_threshold=int(os.environ.get("LLM_FAILURE_THRESHOLD", 5)),
+    reset_timeout=float(os.environ.get("LLM_RESET_TIMEOUT", 30.0))
+)
+
+fallbacks = Counter('ai_suggestion_fallbacks_total', 'AI suggestions answered with the fallback suggestions', ['reason'])
+
+# the newest OpenAI model is "gpt-4o" which was released May 13, 2024.
+# do not change this unless explicitly requested by the user
+AI_MODEL = "gpt-4o"
+AI_MAX_TOKENS = 1500
+AI_TEMPERATURE = 0.7
+
+# Bump when the prompt changes so cached suggestions from the old prompt are not reused
+PROMPT_VERSION = 1
+
+# Only this much of each text is sent to the model
+RESUME_PROMPT_CHARS = 3000
+JOB_DESCRIPTION_PROMPT_CHARS = 2000
+
+@timed('ai_suggestions')
 def get_ai_suggestions(resume_text, job_description):
     """
     Get AI-powered suggestions for ATS optimization
@@ -14,16 +42,28 @@ def get_ai_suggestions(resume_text, job_description):
     """
     if not openai_client:
         logging.warning("OpenAI API key not available, using fallback suggestions")
+        fallbacks.inc('no_api_key')
         return get_fallback_suggestions()
     
+    resume_excerpt = resume_text[:RESUME_PROMPT_CHARS]
+    job_excerpt = job_description[:JOB_DESCRIPTION_PROMPT_CHARS]
+    
+    # Re-analyzing the same resume against the same posting reuses the answer
+    cache_key = suggestion_cache_key(resume_excerpt, job_excerpt,
+                                     model=AI_MODEL, max_tokens=AI_MAX_TOKENS,
+                                     temperature=AI_TEMPERATURE, prompt_version=PROMPT_VERSION)
+    cached = get_cached_suggestions(cache_key)
+    if cached is not None:
+        return cached
+    
     try:
         prompt = f"""
 You are an ATS optimization expert. Analyze this resume against the job description 
 and provide specific suggestions to improve ATS compatibility and matching.
 
-RESUME: {resume_text[:3000]}  
+RESUME: {resume_excerpt}  
 
-JOB DESCRIPTION: {job_description[:2000]}
+JOB DESCRIPTION: {job_excerpt}
 
 Provide analysis in JSON format:
 {{
@@ -48,34 +88,48 @@ Keep suggestions specific, actionable, and based on ATS best practices.
 Focus on keyword optimization, proper formatting, and content relevance.
 """
 
-        # the newest OpenAI model is "gpt-4o" which was released May 13, 2024.
-        # do not change this unless explicitly requested by the user
-        response = openai_client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are an expert ATS optimization consultant. Provide detailed, actionable advice in the requested JSON format."
-                },
-                {
-                    "role": "user", 
-                    "content": prompt
-                }
-            ],
-            response_format={"type": "json_object"},
-            max_tokens=1500,
-            temperature=0.7
+        messages = [
+            {
+                "role": "system",
+                "content": "You are an expert ATS optimization consultant. Provide detailed, actionable advice in the requested JSON format."
+            },
+            {
+                "role": "user", 
+                "content": prompt
+            }
+        ]
+        
+        # The gateway enforces the budget; the client retrying on its own would exceed it
+        response = llm_gateway.call(
+            lambda timeout: openai_client.with_options(timeout=timeout, max_retries=0).chat.completions.create(
+                model=AI_MODEL,
+                messages=messages,
+                response_format={"type": "json_object"},
+                max_tokens=AI_MAX_TOKENS,
+                temperature=AI_TEMPERATURE
+            )
         )
         
         content = response.choices[0].message.content
         if content:
             suggestions = json.loads(content)
         else:
+            fallbacks.inc('empty_response')
             return get_fallback_suggestions()
-        return validate_and_format_suggestions(suggestions)
+        
+        # Only real model answers are cached, never the fallback
+        suggestions = validate_and_format_suggestions(suggestions)
+        store_suggestions(cache_key, suggestions)
+        return suggestions
+        
+    except LLMUnavailable as e:
+        logging.warning(f"AI suggestions unavailable ({e.reason}), using fallback suggestions")
+        fallbacks.inc(e.reason)
+        return get_fallback_suggestions()
         
     except Exception as e:
         logging.error(f"Error getting AI suggestions: {str(e)}")
+        fallbacks.inc('error')
         return get_fallback_suggestions()
 
 def validate_and_format_suggestions(suggestions):
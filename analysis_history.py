@@ -0,0 +1,190 @@
+import json
+import base64
+from datetime import datetime, timezone
+from sqlalchemy import select, tuple_, exists, func, true, type_coerce
+from sqlalchemy.dialects.postgresql import JSONB
+from app import db
+from models import Analysis
+from scoring import SCORING_ENGINES
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+SORT_ORDERS = ('created_at', 'total_score')
+DEFAULT_REPORT_SIZE = 20
+MAX_REPORT_SIZE = 500
+KEYWORD_LISTS = ('matching_keywords', 'missing_keywords')
+
+# Everything the listing shows; the texts are never loaded
+LISTING_COLUMNS = (
+    Analysis.id,
+    Analysis.filename,
+    Analysis.job_description_hash,
+    Analysis.keyword_score,
+    Analysis.grammar_score,
+    Analysis.format_score,
+    Analysis.total_score,
+    Analysis.scoring_engine,
+    Analysis.created_at
+)
+
+def encode_cursor(sort, row):
+    """Opaque cursor pointing just past row in the given sort order"""
+    value = getattr(row, sort)
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    payload = json.dumps([sort, value, row.id]).encode('utf-8')
+    return base64.urlsafe_b64encode(payload).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor, sort):
+    try:
+        payload = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        cursor_sort, value, analysis_id = json.loads(payload)
+        if cursor_sort != sort:
+            raise ValueError
+        value = datetime.fromisoformat(value) if sort == 'created_at' else float(value)
+        return value, int(analysis_id)
+    except (ValueError, TypeError):
+        raise ValueError('Invalid cursor')
+
+def parse_datetime(value, name):
+    """ISO 8601 date or datetime as naive UTC, the way created_at is stored"""
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f'{name} must be an ISO 8601 date or datetime')
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+def parse_float(value, name):
+    try:
+        return float(value)
+    except ValueError:
+        raise ValueError(f'{name} must be a number')
+
+def filter_options(args):
+    """Filter keyword arguments shared by list_analyses() and keyword_report(); raises ValueError on bad input"""
+    options = {}
+    for name in ('created_after', 'created_before'):
+        if args.get(name):
+            options[name] = parse_datetime(args[name], name)
+    for name in ('min_score', 'max_score'):
+        if args.get(name):
+            options[name] = parse_float(args[name], name)
+    if args.get('job_description_hash'):
+        options['job_description_hash'] = args['job_description_hash'].lower()
+    if args.get('scoring_engine'):
+        options['scoring_engine'] = args['scoring_engine'].strip().lower()
+        if options['scoring_engine'] not in SCORING_ENGINES:
+            raise ValueError(f"scoring_engine must be one of: {', '.join(SCORING_ENGINES)}")
+    for name in ('matching_keyword', 'missing_keyword'):
+        if args.get(name, '').strip():
+            options[name] = args[name].strip().lower()
+    return options
+
+def listing_options(args, default_engine='keyword'):
+    """
+    list_analyses() keyword arguments from request arguments; raises
+    ValueError on bad input. Engines share a score band but weigh
+    keywords differently, so a total_score ranking covers one engine, default_engine unless
+    scoring_engine is given.
+    """
+    options = filter_options(args)
+
+    sort = args.get('sort', 'created_at')
+    if sort not in SORT_ORDERS:
+        raise ValueError(f"sort must be one of: {', '.join(SORT_ORDERS)}")
+    options['sort'] = sort
+    if sort == 'total_score':
+        options.setdefault('scoring_engine', default_engine)
+
+    try:
+        options['limit'] = min(max(int(args.get('limit', DEFAULT_PAGE_SIZE)), 1), MAX_PAGE_SIZE)
+    except ValueError:
+        raise ValueError('limit must be a number')
+
+    if args.get('cursor'):
+        options['cursor'] = args['cursor']
+    return options
+
+def keyword_elements(column):
+    """Table-valued function with one 'value' row per keyword of a JSON list column"""
+    if db.engine.dialect.name == 'postgresql':
+        return func.jsonb_array_elements_text(column).table_valued('value')
+    return func.json_each(column).table_valued('value')
+
+def has_keyword(column, keyword):
+    """Condition that a JSON keyword list contains keyword, evaluated by the database"""
+    if db.engine.dialect.name == 'postgresql':
+        # @> containment, answered from the GIN index
+        return type_coerce(column, JSONB).contains([keyword])
+    elements = keyword_elements(column)
+    return exists(select(1).select_from(elements).where(elements.c.value == keyword))
+
+def filter_analyses(query, created_after=None, created_before=None, min_score=None, max_score=None,
+                    job_description_hash=None, scoring_engine=None, matching_keyword=None, missing_keyword=None):
+    if created_after is not None:
+        query = query.where(Analysis.created_at >= created_after)
+    if created_before is not None:
+        query = query.where(Analysis.created_at < created_before)
+    if min_score is not None:
+        query = query.where(Analysis.total_score >= min_score)
+    if max_score is not None:
+        query = query.where(Analysis.total_score <= max_score)
+    if job_description_hash is not None:
+        query = query.where(Analysis.job_description_hash == job_description_hash)
+    if scoring_engine is not None:
+        query = query.where(Analysis.scoring_engine == scoring_engine)
+    if matching_keyword is not None:
+        query = query.where(has_keyword(Analysis.matching_keywords, matching_keyword))
+    if missing_keyword is not None:
+        query = query.where(has_keyword(Analysis.missing_keywords, missing_keyword))
+    return query
+
+def list_analyses(sort='created_at', limit=DEFAULT_PAGE_SIZE, cursor=None, created_before=None, max_score=None,
+                  **filters):
+    """
+    One page of past analyses, newest or best scoring first, and the cursor
+    of the next page (None on the last one). Pages continue from the last
+    row's (sort key, id) instead of an OFFSET, so with the composite indexes
+    on Analysis every page costs the same however deep it is.
+    Filters are those of filter_analyses(); created_after is inclusive,
+    created_before exclusive.
+    """
+    key = getattr(Analysis, sort)
+    query = select(*LISTING_COLUMNS)
+
+    if cursor is not None:
+        value, analysis_id = decode_cursor(cursor, sort)
+        query = query.where(tuple_(key, Analysis.id) < tuple_(value, analysis_id))
+        # Past the first page the cursor is the tighter upper bound. SQLite
+        # bounds an index range by only one of them, so drop the looser one
+        if sort == 'created_at' and created_before is not None and value < created_before:
+            created_before = None
+        if sort == 'total_score' and max_score is not None and value <= max_score:
+            max_score = None
+
+    query = filter_analyses(query, created_before=created_before, max_score=max_score, **filters)
+
+    # One extra row tells whether there is a next page
+    rows = db.session.execute(query.order_by(key.desc(), Analysis.id.desc()).limit(limit + 1)).all()
+    next_cursor = encode_cursor(sort, rows[limit - 1]) if len(rows) > limit else None
+    return rows[:limit], next_cursor
+
+def keyword_report(limit=DEFAULT_REPORT_SIZE, **filters):
+    """
+    How many analyses matching filters had each keyword matched and missing,
+    most frequent first. The lists are expanded and counted by the database.
+    """
+    report = {'analyses': db.session.scalar(filter_analyses(select(func.count()).select_from(Analysis), **filters))}
+    for name in KEYWORD_LISTS:
+        elements = keyword_elements(getattr(Analysis, name))
+        count = func.count().label('count')
+        # A function in FROM may refer to the table before it; no LATERAL needed
+        query = select(elements.c.value.label('keyword'), count).select_from(Analysis).join(elements, true())
+        query = filter_analyses(query, **filters)
+        rows = db.session.execute(
+            query.group_by(elements.c.value).order_by(count.desc(), elements.c.value).limit(limit)
+        ).all()
+        report[name] = [{'keyword': row.keyword, 'count': row.count} for row in rows]
+    return report
@@ -1,40 +1,67 @@
-import re
 import string
 import logging
 from collections import Counter
 import nltk
 from nltk.corpus import stopwords
-from nltk.tokenize import word_tokenize
+from skills import extract_skills
+from resume_rules import SECTION_RULES
+from prepared_document import prepare_document
+from metrics import timed
+
+# Bump whenever extract_keywords output changes so stored job profiles are not reused
+KEYWORD_EXTRACTOR_VERSION = 1
 
 # Download required NLTK data
 try:
-    nltk.data.find('tokenizers/punkt')
+    nltk.data.find('corpora/stopwords')
 except LookupError:
-    nltk.download('punkt')
+    nltk.download('stopwords')
 
+# Stopwords are frozen once at import so keyword extraction never touches NLTK
 try:
-    nltk.data.find('corpora/stopwords')
+    STOP_WORDS = frozenset(stopwords.words('english'))
 except LookupError:
-    nltk.download('stopwords')
+    logging.error("NLTK stopwords corpus not available, keywords will not be filtered for stopwords")
+    STOP_WORDS = frozenset()
 
-def analyze_resume(resume_text, job_description):
+# Contractions NLTK's word_tokenize still splits once punctuation is gone
+SPLIT_CONTRACTIONS = {
+    'cannot': ('can', 'not'),
+    'gimme': ('gim', 'me'),
+    'gonna': ('gon', 'na'),
+    'gotta': ('got', 'ta'),
+    'lemme': ('lem', 'me'),
+    'wanna': ('wan', 'na'),
+}
+
+@timed('analyze_resume')
+def analyze_resume(resume_text, job_description, job_keywords=None, keyword_analysis=None):
     """
     Comprehensive resume analysis comparing against job description
     Returns analysis results with scores and keyword matching
+
+    job_keywords may be passed in when the same job description is scored
+    against many resumes, so it only has to be tokenized once.
+    keyword_analysis may be passed in when another scoring engine (see
+    scoring.py) has already scored the keywords.
+    resume_text may be a PreparedDocument, which every stage then shares.
     """
     try:
-        # Extract keywords from both texts
-        resume_keywords = extract_keywords(resume_text)
-        job_keywords = extract_keywords(job_description)
-        
-        # Calculate keyword matching
-        keyword_analysis = calculate_keyword_match(resume_keywords, job_keywords)
+        document = prepare_document(resume_text)
+        if keyword_analysis is None:
+            # Extract keywords from both texts
+            resume_keywords = extract_keywords(document)
+            if job_keywords is None:
+                job_keywords = extract_keywords(job_description)
+            
+            # Calculate keyword matching
+            keyword_analysis = calculate_keyword_match(resume_keywords, job_keywords)
         
         # Calculate grammar score
-        grammar_score = calculate_grammar_score(resume_text)
+        grammar_score = calculate_grammar_score(document)
         
         # Calculate format score
-        format_score = calculate_format_score(resume_text)
+        format_score = calculate_format_score(document)
         
         # Calculate weighted total score
         keyword_score = keyword_analysis['match_percentage']
@@ -55,27 +82,47 @@ def analyze_resume(resume_text, job_description):
         raise
 
 def extract_keywords(text):
-    """Extract meaningful keywords from text"""
+    """Extract meaningful keywords from text (a string or a PreparedDocument)"""
+    return list(keyword_frequencies(text).keys())
+
+def keyword_frequencies(text):
+    """
+    Count occurrences of each meaningful keyword in text, in first-seen order.
+    Keywords are single words plus the skills and phrases of the skills
+    dictionary, which also covers short names like "go", "c#" and "ml".
+    text may be a PreparedDocument, whose tokens both kinds share.
+    """
+    document = prepare_document(text)
+    frequencies = word_frequencies(document)
+    try:
+        for skill, count in extract_skills(document.text, document.tokens).items():
+            # A one-word skill is usually a word keyword already
+            if count > frequencies.get(skill, 0):
+                frequencies[skill] = count
+    except Exception as e:
+        logging.error(f"Error matching skills: {str(e)}")
+    return frequencies
+
+def word_frequencies(text):
+    """Count occurrences of each meaningful single-word keyword in text, in first-seen order"""
     try:
-        # Clean and tokenize text
-        text = text.lower()
-        text = re.sub(r'[^\w\s]', ' ', text)
-        tokens = word_tokenize(text)
+        # Punctuation tokens are single characters, which the length check drops
+        tokens = prepare_document(text).tokens
+        if not SPLIT_CONTRACTIONS.keys().isdisjoint(tokens):
+            tokens = [part for token in tokens for part in SPLIT_CONTRACTIONS.get(token, (token,))]
         
         # Remove stopwords and short words
-        stop_words = set(stopwords.words('english'))
         keywords = [word for word in tokens 
-                   if word not in stop_words 
-                   and len(word) > 2 
+                   if len(word) > 2 
+                   and word not in STOP_WORDS 
                    and word.isalpha()]
         
-        # Count frequency and return top keywords
-        keyword_freq = Counter(keywords)
-        return list(keyword_freq.keys())
+        # Count frequency of each keyword
+        return Counter(keywords)
         
     except Exception as e:
         logging.error(f"Error extracting keywords: {str(e)}")
-        return []
+        return Counter()
 
 def calculate_keyword_match(resume_keywords, job_keywords):
     """Calculate keyword matching between resume and job description with improved scoring"""
@@ -126,41 +173,26 @@ def calculate_keyword_match(resume_keywords, job_keywords):
         }
 
 def calculate_grammar_score(text):
-    """Calculate grammar and readability score with improved baseline"""
+    """Calculate grammar and readability score with improved baseline; text may be a PreparedDocument"""
     try:
+        document = prepare_document(text)
+        hits = document.rule_hits.counts
+        
         # Start with a good baseline score
         base_score = 78
         
-        # Check for common grammar issues
-        sentences = re.split(r'[.!?]+', text)
-        issues = 0
-        
-        for sentence in sentences:
-            sentence = sentence.strip()
-            if not sentence:
-                continue
-                
-            # Check if sentence starts with lowercase (except for bullet points)
-            if sentence and sentence[0].islower() and not sentence.startswith(('•', '-', '*')):
-                issues += 1
-            
-            # Check for double spaces
-            if '  ' in sentence:
-                issues += 1
-            
-            # Check for missing spaces after punctuation
-            if re.search(r'[,;:](?=[A-Za-z])', sentence):
-                issues += 1
+        # Sentences starting in lowercase, with double spaces, or with no
+        # space after a comma, semicolon or colon; one issue each per sentence
+        issues = hits['lowercase_start'] + hits['double_space'] + hits['missing_space']
         
         # Calculate score with improved baseline (deduct from base_score)
         penalty = min(issues, 8) * 3  # Max 24 points penalty
         grammar_score = max(65, base_score - penalty)  # Minimum 65, starts from 78
         
         # Add bonus for good content indicators
-        word_count = len(text.split())
-        if word_count > 300:  # Substantial content bonus
+        if document.word_count > 300:  # Substantial content bonus
             grammar_score += 5
-        if re.search(r'\b(developed|implemented|managed|led|created|designed)\b', text.lower()):
+        if hits['action_verb']:
             grammar_score += 3  # Action words bonus
             
         return min(95, grammar_score)  # Cap at 95
@@ -170,30 +202,22 @@ def calculate_grammar_score(text):
         return 75  # Default good score
 
 def calculate_format_score(text):
-    """Calculate format and structure score with better baseline"""
+    """Calculate format and structure score with better baseline; text may be a PreparedDocument"""
     try:
+        document = prepare_document(text)
+        hits = document.rule_hits.counts
+        
         # Start with good baseline
         base_score = 72
         bonus_points = 0
-        text_lower = text.lower()
         
         # Check for common resume sections (4 points each)
-        sections = [
-            ['experience', 'work experience', 'employment', 'career'],
-            ['education', 'academic', 'degree', 'university'],
-            ['skills', 'technical skills', 'competencies', 'technologies'],
-            ['contact', 'email', 'phone', 'address'],
-            ['summary', 'objective', 'profile', 'about']
-        ]
-        
-        sections_found = 0
-        for section_keywords in sections:
-            if any(keyword in text_lower for keyword in section_keywords):
-                sections_found += 1
+        for section in SECTION_RULES:
+            if hits[section]:
                 bonus_points += 4
         
         # Check text length appropriateness
-        word_count = len(text.split())
+        word_count = document.word_count
         if 250 <= word_count <= 600:  # Optimal length
             bonus_points += 8
         elif 150 <= word_count <= 800:  # Good length
@@ -202,20 +226,19 @@ def calculate_format_score(text):
             bonus_points += 2
         
         # Check for professional formatting indicators
-        if any(marker in text for marker in ['•', '▪', '◦', '-', '*']):
+        if hits['bullet']:
             bonus_points += 6
         
         # Check for dates indicating experience timeline
-        if re.search(r'\b(19|20)\d{2}\b', text):
+        if hits['year']:
             bonus_points += 4
         
         # Check for professional terminology
-        professional_terms = ['project', 'team', 'client', 'company', 'organization', 'department']
-        if any(term in text_lower for term in professional_terms):
+        if hits['professional_term']:
             bonus_points += 3
             
         # Check for quantifiable achievements (numbers/percentages)
-        if re.search(r'\b\d+%|\b\d+\s*(years?|months?|projects?|clients?)\b', text_lower):
+        if hits['quantity']:
             bonus_points += 3
         
         final_score = min(95, base_score + bonus_points)
@@ -29,6 +29,37 @@ app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
 app.config['UPLOAD_FOLDER'] = 'uploads'
 
+# Batch analysis configuration
+app.config['MAX_BATCH_CONTENT_LENGTH'] = 256 * 1024 * 1024  # 256MB per batch upload
+app.config['BATCH_MAX_FILES'] = int(os.environ.get("BATCH_MAX_FILES", 500))
+app.config['BATCH_WORKERS'] = int(os.environ.get("BATCH_WORKERS", min(8, os.cpu_count() or 1)))
+
+# Background analysis job configuration
+app.config['JOB_WORKERS'] = int(os.environ.get("JOB_WORKERS", 2))
+app.config['JOB_POLL_INTERVAL'] = float(os.environ.get("JOB_POLL_INTERVAL", 2.0))  # seconds
+app.config['JOB_STALE_AFTER'] = int(os.environ.get("JOB_STALE_AFTER", 600))  # seconds before a running job is retried
+app.config['JOB_RETENTION'] = int(os.environ.get("JOB_RETENTION", 7 * 24 * 3600))  # seconds finished jobs are kept
+
+# AI suggestion cache configuration
+app.config['AI_SUGGESTION_CACHE_TTL'] = int(os.environ.get("AI_SUGGESTION_CACHE_TTL", 7 * 24 * 3600))  # seconds
+app.config['AI_SUGGESTION_CACHE_SIZE'] = int(os.environ.get("AI_SUGGESTION_CACHE_SIZE", 10000))  # stored entries
+
+# Extracted upload text cache configuration
+app.config['EXTRACTED_TEXT_CACHE_SIZE'] = int(os.environ.get("EXTRACTED_TEXT_CACHE_SIZE", 10000))  # stored entries
+
+# Resume search index configuration
+app.config['SEARCH_INDEX_DIR'] = os.environ.get("SEARCH_INDEX_DIR", os.path.join(app.instance_path, 'search_index'))
+
+# Rendered PDF report cache configuration
+app.config['REPORT_CACHE_DIR'] = os.environ.get("REPORT_CACHE_DIR", os.path.join(app.instance_path, 'report_cache'))
+app.config['REPORT_CACHE_MAX_BYTES'] = int(os.environ.get("REPORT_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+
+# Bulk report export configuration
+app.config['REPORT_EXPORT_WORKERS'] = int(os.environ.get("REPORT_EXPORT_WORKERS", min(4, os.cpu_count() or 1)))
+app.config['REPORT_EXPORT_MAX_ANALYSES'] = int(os.environ.get("REPORT_EXPORT_MAX_ANALYSES", 1000))
+app.config['REPORT_MERGE_INLINE_MAX'] = int(os.environ.get("REPORT_MERGE_INLINE_MAX", 50))  # larger merged PDFs are built by the job queue
+app.config['REPORT_EXPORT_DIR'] = os.environ.get("REPORT_EXPORT_DIR", os.path.join(app.instance_path, 'report_exports'))
+
 # Create upload directory if it doesn't exist
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 
@@ -40,5 +71,12 @@ with app.app_context():
     import models
     db.create_all()
 
+    # create_all() skips tables that already exist; bring older ones up to date
+    import schema
+    schema.upgrade_schema()
+
 # Import routes
 import routes
+
+# Modules that only add CLI commands
+import rescoring
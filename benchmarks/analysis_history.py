@@ -0,0 +1,131 @@
+"""
+Benchmark for the analysis history listing.
+
+Fills a throwaway SQLite database with N analysis rows spread over a year,
+then times pages of list_analyses() at increasing depths, reached through
+keyset cursors, next to the same pages fetched with LIMIT/OFFSET. Then
+times the first page of "analyses missing keyword X" and the keyword
+frequency report, both evaluated in the database, against loading the
+keyword lists and counting in Python.
+
+    python benchmarks/analysis_history.py [--rows 1000000] [--limit 50]
+"""
+import os
+import sys
+import time
+import random
+import argparse
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from workdir import use_work_dir
+
+WORK_DIR = use_work_dir('history_benchmark.db')
+
+import shutil
+from sqlalchemy import insert, select, func
+from app import app, db
+from models import Analysis
+from collections import Counter
+from analysis_history import list_analyses, keyword_report, encode_cursor, LISTING_COLUMNS
+
+JOB_DESCRIPTIONS = [f'{i:064x}' for i in range(200)]
+KEYWORDS = [f'skill{i}' for i in range(300)]
+
+def fill_database(count, rng):
+    started = datetime(2025, 1, 1)
+    seconds_apart = 365 * 24 * 3600 / count
+    for start in range(0, count, 20000):
+        db.session.execute(insert(Analysis), [
+            {
+                'filename': f'resume_{i}.pdf',
+                'job_description_hash': rng.choice(JOB_DESCRIPTIONS),
+                'keyword_score': 0.0,
+                'grammar_score': 0.0,
+                'format_score': 0.0,
+                'total_score': round(rng.uniform(0, 100), 1),
+                'matching_keywords': rng.sample(KEYWORDS, 8),
+                'missing_keywords': rng.sample(KEYWORDS, 6),
+                'created_at': started + timedelta(seconds=int(i * seconds_apart))
+            }
+            for i in range(start, min(start + 20000, count))
+        ])
+    db.session.commit()
+
+def timed(func, repeat=5):
+    """Best of repeat runs, in milliseconds"""
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        elapsed = (time.perf_counter() - started) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--limit', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=17)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    with app.app_context():
+        started = time.perf_counter()
+        fill_database(args.rows, rng)
+        print(f"stored {args.rows} analyses in {time.perf_counter() - started:.1f}s")
+
+        # sort order, list_analyses() filters, and the same filters as SQL for the OFFSET query
+        cases = {
+            'newest': ('created_at', {}, []),
+            'score band': ('total_score', {'min_score': 40.0, 'max_score': 60.0},
+                           [Analysis.total_score >= 40.0, Analysis.total_score <= 60.0]),
+            'job description': ('created_at', {'job_description_hash': JOB_DESCRIPTIONS[0]},
+                                [Analysis.job_description_hash == JOB_DESCRIPTIONS[0]]),
+        }
+        print(f"{'listing':>16} {'depth':>8} {'keyset ms':>10} {'offset ms':>10}")
+        for name, (sort, filters, conditions) in cases.items():
+            key = getattr(Analysis, sort)
+            ordered = select(*LISTING_COLUMNS).where(*conditions).order_by(key.desc(), Analysis.id.desc())
+
+            total = db.session.scalar(select(func.count()).select_from(ordered.subquery()))
+            for fraction in (0, 0.5, 0.99):
+                depth = int(total * fraction)
+                # Position a cursor on the row just before the page, as paging there would
+                if depth:
+                    before = db.session.execute(ordered.offset(depth - 1).limit(1)).first()
+                    cursor = encode_cursor(sort, before)
+                else:
+                    cursor = None
+
+                keyset = timed(lambda: list_analyses(sort=sort, limit=args.limit, cursor=cursor, **filters))
+                offset = timed(lambda: db.session.execute(ordered.offset(depth).limit(args.limit + 1)).all())
+                print(f"{name:>16} {depth:>8} {keyset:>10.2f} {offset:>10.2f}")
+
+        def python_missing():
+            page = []
+            for row in db.session.execute(select(*LISTING_COLUMNS, Analysis.missing_keywords)
+                                          .order_by(Analysis.created_at.desc(), Analysis.id.desc())):
+                if KEYWORDS[0] in row.missing_keywords:
+                    page.append(row)
+                    if len(page) > args.limit:
+                        break
+
+        def python_report():
+            counts = {'matching_keywords': Counter(), 'missing_keywords': Counter()}
+            for matching, missing in db.session.execute(select(Analysis.matching_keywords, Analysis.missing_keywords)):
+                counts['matching_keywords'].update(matching)
+                counts['missing_keywords'].update(missing)
+            return {name: counter.most_common(20) for name, counter in counts.items()}
+
+        print(f"{'query':>16} {'database ms':>12} {'python ms':>10}")
+        database = timed(lambda: list_analyses(limit=args.limit, missing_keyword=KEYWORDS[0]), repeat=3)
+        print(f"{'missing keyword':>16} {database:>12.1f} {timed(python_missing, repeat=3):>10.1f}")
+        database = timed(lambda: keyword_report(20), repeat=1)
+        print(f"{'keyword report':>16} {database:>12.1f} {timed(python_report, repeat=1):>10.1f}")
+
+    shutil.rmtree(WORK_DIR, ignore_errors=True)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,193 @@
+"""
+Synthetic resumes and job descriptions for the benchmarks, generated offline.
+
+A resume is a list of blocks (name, contact line, section headings,
+paragraphs, bullets and a skills table) of about the requested number of
+words. The same seed always gives the same blocks, rendered to plain text,
+to a PDF (ReportLab, one or more A4 pages) or to a DOCX (python-docx, the
+skills as a table). Run directly to write a corpus to a directory:
+
+    python benchmarks/corpus.py --out /tmp/corpus [--resumes 20] [--words 600] [--seed 25]
+"""
+import os
+import io
+import sys
+import random
+import hashlib
+import argparse
+from collections import namedtuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.utils import simpleSplit
+from reportlab.pdfgen import canvas
+from docx import Document
+
+SKILLS = (
+    "python java javascript typescript react angular django flask spring kubernetes docker "
+    "terraform aws azure gcp postgresql mysql mongodb redis kafka spark hadoop airflow "
+    "tensorflow pytorch pandas numpy graphql rest microservices linux bash jenkins ansible"
+).split()
+ACTION_VERBS = "developed implemented managed led created designed built improved reduced delivered".split()
+OBJECTS = (
+    "a data pipeline", "the billing platform", "REST APIs", "an internal dashboard", "the release process",
+    "customer onboarding", "a recommendation service", "monitoring and alerting", "the search backend",
+    "automated test suites", "the reporting module", "a migration to the cloud"
+)
+OUTCOMES = (
+    "cutting costs by {n}%", "for {n} clients", "serving {n} projects", "reducing latency by {n}%",
+    "with a team of {n} engineers", "over {n} months", "improving uptime to 99.{n}%"
+)
+FILLER = (
+    "stakeholders communication agile scrum collaboration mentoring ownership quality "
+    "performance scalability reliability documentation requirements analysis planning"
+).split()
+TITLES = ("Software Engineer", "Data Engineer", "Backend Developer", "Platform Engineer", "Data Scientist")
+COMPANIES = ("Acme Corp", "Globex", "Initech", "Umbrella Analytics", "Stark Industries", "Wayne Enterprises")
+UNIVERSITIES = ("University of Leeds", "TU Delft", "University of Toronto", "ETH Zurich")
+
+# kind is 'name', 'contact', 'heading', 'paragraph', 'bullet' or 'skills' (text is then a list of skills)
+Block = namedtuple('Block', ['kind', 'text'])
+
+def sentence(rng, skills):
+    verb = rng.choice(ACTION_VERBS).capitalize()
+    outcome = rng.choice(OUTCOMES).format(n=rng.randint(2, 60))
+    tools = ' and '.join(rng.sample(skills, 2))
+    return f"{verb} {rng.choice(OBJECTS)} with {tools}, {outcome}; {' '.join(rng.sample(FILLER, 3))}."
+
+def make_resume(rng, words=600):
+    """Blocks of a resume of about words words: summary, experience, education and skills"""
+    skills = rng.sample(SKILLS, rng.randint(6, 14))
+    first, last = rng.choice(("Jane", "Arjun", "Mei", "Carlos", "Amara")), rng.choice(("Smith", "Patel", "Chen", "Okafor"))
+    blocks = [
+        Block('name', f"{first} {last}"),
+        Block('contact', f"{first.lower()}.{last.lower()}@example.com | +44 20 7946 {rng.randint(1000, 9999)} | London"),
+        Block('heading', "Summary"),
+        Block('paragraph', f"{rng.choice(TITLES)} with {rng.randint(2, 15)} years of experience. "
+                           + ' '.join(sentence(rng, skills) for _ in range(2))),
+        Block('heading', "Experience"),
+    ]
+
+    # Jobs with bullets until the word budget is spent
+    budget = words - sum(len(block.text.split()) for block in blocks) - 40
+    year = 2024
+    while budget > 0:
+        started = year - rng.randint(1, 4)
+        title = f"{rng.choice(TITLES)}, {rng.choice(COMPANIES)} ({started} - {year})"
+        blocks.append(Block('paragraph', title))
+        budget -= len(title.split())
+        # Longer resumes describe each job in more detail rather than go further back
+        for _ in range(rng.randint(3, 6) + words // 300):
+            bullet = sentence(rng, skills)
+            blocks.append(Block('bullet', bullet))
+            budget -= len(bullet.split())
+            if budget <= 0:
+                break
+        year = started
+
+    blocks += [
+        Block('heading', "Education"),
+        Block('paragraph', f"BSc Computer Science, {rng.choice(UNIVERSITIES)}, {year - rng.randint(0, 3)}"),
+        Block('heading', "Skills"),
+        Block('skills', skills),
+    ]
+    return blocks
+
+def make_job_description(rng):
+    required = rng.sample(SKILLS, 8)
+    return (f"We are hiring a {rng.choice(TITLES)} to join our team. Requirements: "
+            f"{rng.randint(3, 8)}+ years of experience with {', '.join(required[:5])}. "
+            f"Nice to have: {', '.join(required[5:])}. You will design, build and operate services, "
+            f"work with {' and '.join(rng.sample(FILLER, 2))}, and mentor other engineers.")
+
+def block_text(block):
+    if block.kind == 'skills':
+        return ', '.join(block.text)
+    if block.kind == 'bullet':
+        return f"• {block.text}"
+    return block.text
+
+def to_text(blocks):
+    return '\n'.join(block_text(block) for block in blocks)
+
+def to_pdf(blocks):
+    """A4 pages of the resume; invariant output, so the same blocks give the same bytes"""
+    buffer = io.BytesIO()
+    pdf = canvas.Canvas(buffer, pagesize=A4, invariant=1)
+    width, height = A4
+    margin = 50
+    y = height - margin
+    for block in blocks:
+        font, size = {'name': ('Helvetica-Bold', 16), 'heading': ('Helvetica-Bold', 12)}.get(block.kind, ('Helvetica', 10))
+        for line in simpleSplit(block_text(block), font, size, width - 2 * margin):
+            if y < margin + size:
+                pdf.showPage()
+                y = height - margin
+            pdf.setFont(font, size)
+            pdf.drawString(margin, y, line)
+            y -= size * 1.4
+        y -= 4
+    pdf.save()
+    return buffer.getvalue()
+
+def to_docx(blocks):
+    """The resume as a Word document; the skills become a table of three columns"""
+    doc = Document()
+    for block in blocks:
+        if block.kind == 'name':
+            doc.add_heading(block.text, level=0)
+        elif block.kind == 'heading':
+            doc.add_heading(block.text, level=1)
+        elif block.kind == 'bullet':
+            doc.add_paragraph(block.text, style='List Bullet')
+        elif block.kind == 'skills':
+            table = doc.add_table(rows=-(-len(block.text) // 3), cols=3)
+            for i, skill in enumerate(block.text):
+                table.cell(i // 3, i % 3).text = skill
+        else:
+            doc.add_paragraph(block.text)
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    return buffer.getvalue()
+
+Corpus = namedtuple('Corpus', ['resumes', 'job_descriptions'])
+
+def make_corpus(resumes, words=600, job_descriptions=5, seed=25):
+    """resumes blocks of words words on average (half to one and a half times that), and the job descriptions"""
+    rng = random.Random(seed)
+    return Corpus([make_resume(rng, rng.randint(words // 2, words * 3 // 2)) for _ in range(resumes)],
+                  [make_job_description(rng) for _ in range(max(1, job_descriptions))])
+
+def fingerprint(corpus):
+    """sha256 of every text in the corpus, telling whether two runs used the same documents"""
+    digest = hashlib.sha256()
+    for text in [to_text(blocks) for blocks in corpus.resumes] + corpus.job_descriptions:
+        digest.update(text.encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--out', required=True, help='Directory to write the PDF, DOCX and job description files to.')
+    parser.add_argument('--resumes', type=int, default=20)
+    parser.add_argument('--words', type=int, default=600)
+    parser.add_argument('--job-descriptions', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=25)
+    args = parser.parse_args()
+
+    corpus = make_corpus(args.resumes, args.words, args.job_descriptions, args.seed)
+    os.makedirs(args.out, exist_ok=True)
+    for i, blocks in enumerate(corpus.resumes):
+        with open(os.path.join(args.out, f"resume_{i:04d}.pdf"), 'wb') as f:
+            f.write(to_pdf(blocks))
+        with open(os.path.join(args.out, f"resume_{i:04d}.docx"), 'wb') as f:
+            f.write(to_docx(blocks))
+    for i, job_description in enumerate(corpus.job_descriptions):
+        with open(os.path.join(args.out, f"job_{i:02d}.txt"), 'w', encoding='utf-8') as f:
+            f.write(job_description)
+    print(f"Wrote {len(corpus.resumes)} resumes as PDF and DOCX and {len(corpus.job_descriptions)} job descriptions "
+          f"to {args.out} (corpus {fingerprint(corpus)[:12]})")
+
+if __name__ == '__main__':
+    main()
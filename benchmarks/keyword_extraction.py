@@ -0,0 +1,93 @@
+"""
+Micro-benchmark for analyzer.extract_keywords.
+
+Times the precompiled word extractor per document (alone and with skills
+dictionary matching) and, when NLTK's tokenizer and data are available,
+checks the word keywords are exactly what the original NLTK-based path
+returned. tests/test_keyword_extraction.py runs the same check.
+
+    python benchmarks/keyword_extraction.py [--docs 2000] [--words 500]
+"""
+import os
+import re
+import sys
+import time
+import random
+import argparse
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from analyzer import extract_keywords, word_frequencies
+
+VOCABULARY = (
+    "experience python developed implemented managed team project client cannot "
+    "software engineering data analysis machine learning aws docker kubernetes "
+    "led designed api rest microservices sql postgresql react javascript agile "
+    "scrum stakeholders delivered improved reduced 25% 2019 2023 e-mail c++ c# "
+    "ci/cd node.js résumé café gonna wanna the and of to in for with on at by"
+).split()
+
+def word_keywords(text):
+    return list(word_frequencies(text).keys())
+
+def legacy_extract_keywords(text):
+    """
+    The original NLTK implementation, call for call, kept here only for
+    parity checks. Raises LookupError without the punkt and stopwords data
+    """
+    from nltk.corpus import stopwords
+    from nltk.tokenize import word_tokenize
+    text = text.lower()
+    text = re.sub(r'[^\w\s]', ' ', text)
+    tokens = word_tokenize(text)
+    stop_words = set(stopwords.words('english'))
+    keywords = [word for word in tokens
+               if word not in stop_words
+               and len(word) > 2
+               and word.isalpha()]
+    return list(Counter(keywords).keys())
+
+def make_corpus(docs, words, seed=42):
+    rng = random.Random(seed)
+    corpus = []
+    for _ in range(docs):
+        lines = []
+        remaining = words
+        while remaining > 0:
+            length = min(remaining, rng.randint(5, 15))
+            lines.append("• " + " ".join(rng.choice(VOCABULARY) for _ in range(length)) + ".")
+            remaining -= length
+        corpus.append("\n".join(lines))
+    return corpus
+
+def time_per_doc(func, corpus):
+    start = time.perf_counter()
+    for text in corpus:
+        func(text)
+    return (time.perf_counter() - start) / len(corpus)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--docs', type=int, default=2000)
+    parser.add_argument('--words', type=int, default=500)
+    args = parser.parse_args()
+
+    corpus = make_corpus(args.docs, args.words)
+    print(f"{args.docs} documents x {args.words} words")
+    print(f"word keywords:           {time_per_doc(word_keywords, corpus) * 1e6:9.1f} us/doc")
+    print(f"extract_keywords:        {time_per_doc(extract_keywords, corpus) * 1e6:9.1f} us/doc")
+
+    try:
+        mismatches = sum(1 for text in corpus if legacy_extract_keywords(text) != word_keywords(text))
+    except (ImportError, LookupError):
+        print("NLTK tokenizer or its punkt/stopwords data not installed, skipping parity check")
+        return
+
+    print(f"legacy NLTK extraction:  {time_per_doc(legacy_extract_keywords, corpus) * 1e6:9.1f} us/doc")
+    print(f"parity mismatches:       {mismatches}")
+    if mismatches:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+"""
+Benchmark for scoring.score_keywords.
+
+Scores one job description against N synthetic resumes with the original
+set-intersection scorer and with the sparse TF-IDF and BM25 engines, and
+reports time per batch (with and without tokenization) and how spread
+out the resulting scores are.
+IDF comes from a synthetic corpus of stored analyses in a throwaway
+database, counted the way the app counts it.
+
+    python benchmarks/keyword_scoring.py [--resumes 100 1000 5000] [--corpus 2000]
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from workdir import use_work_dir
+
+WORK_DIR = use_work_dir('scoring_benchmark.db')
+
+import shutil
+from sqlalchemy import insert
+from app import app, db
+from models import Analysis, ResumeContent, JobDescriptionContent
+from content_store import store_content, store_contents
+from analyzer import keyword_frequencies
+from job_profile import compile_job_profile
+from scoring import score_keywords, score_frequencies, corpus_stats, SCORING_ENGINES
+
+SKILLS = (
+    "python java javascript typescript react angular django flask spring kubernetes docker "
+    "terraform aws azure gcp postgresql mysql mongodb redis kafka spark hadoop airflow "
+    "tensorflow pytorch pandas numpy graphql rest microservices linux bash jenkins ansible"
+).split()
+COMMON = (
+    "experience team developed managed project worked responsible delivered improved "
+    "stakeholders communication leadership designed implemented company years role"
+).split()
+
+def make_resume(rng, words=400):
+    skills = rng.sample(SKILLS, rng.randint(3, 15))
+    return ' '.join(rng.choice(skills) if rng.random() < 0.25 else rng.choice(COMMON)
+                    for _ in range(words))
+
+def make_job_description(rng):
+    required = rng.sample(SKILLS, 10)
+    return "We are hiring an engineer. Requirements: " + ', '.join(required * 2) + '. ' + ' '.join(rng.sample(COMMON, 8))
+
+def fill_corpus(count, rng):
+    """Store count synthetic resumes as analyses, for corpus_stats to count"""
+    job_description_hash = store_content(JobDescriptionContent, make_job_description(rng))
+    for start in range(0, count, 1000):
+        resumes = [make_resume(rng) for _ in range(start, min(start + 1000, count))]
+        db.session.execute(insert(Analysis), [
+            {
+                'filename': f'resume_{start + i}.pdf',
+                'job_description_hash': job_description_hash,
+                'resume_hash': resume_hash,
+                'keyword_score': 0.0,
+                'grammar_score': 0.0,
+                'format_score': 0.0,
+                'total_score': 0.0
+            }
+            for i, resume_hash in enumerate(store_contents(ResumeContent, resumes))
+        ])
+        # store_contents writes through its own session
+        db.session.commit()
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--resumes', type=int, nargs='+', default=[100, 1000, 5000])
+    parser.add_argument('--corpus', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    with app.app_context():
+        fill_corpus(args.corpus, rng)
+        corpus_stats.refresh()
+        job_profile = compile_job_profile(make_job_description(rng))
+        run_engines(args.resumes, job_profile, rng)
+
+    shutil.rmtree(WORK_DIR, ignore_errors=True)
+
+def run_engines(counts, job_profile, rng):
+    print(f"{'resumes':>8} {'engine':>8} {'total ms':>9} {'score ms':>9} {'distinct':>9} {'stdev':>7} {'min':>6} {'max':>6}")
+    for count in counts:
+        resumes = [make_resume(rng) for _ in range(count)]
+        frequencies = [keyword_frequencies(resume) for resume in resumes]
+        for engine in SCORING_ENGINES:
+            analyses, elapsed = timed(lambda: score_keywords(resumes, job_profile, engine))
+            _, scoring = timed(lambda: score_frequencies(frequencies, job_profile, engine))
+            scores = [analysis['match_percentage'] for analysis in analyses]
+            print(f"{count:>8} {engine:>8} {elapsed * 1000:>9.1f} {scoring * 1000:>9.1f} "
+                  f"{len(set(scores)):>9} {statistics.pstdev(scores):>7.2f} {min(scores):>6.1f} {max(scores):>6.1f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+"""
+Fake-server harness for llm_gateway.
+
+Starts a local HTTP server that imitates the OpenAI chat completions API
+with configurable latency and failures, points a real OpenAI client at it
+and checks the concurrency cap, the latency budget and the circuit breaker.
+
+    python benchmarks/llm_gateway.py [--callers 16] [--max-concurrent 4] [--budget 1.0]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from openai import OpenAI
+from llm_gateway import LLMGateway, LLMUnavailable
+
+class FakeUpstream:
+    """Behaviour of the fake server, changed between scenarios"""
+    latency = 0.0
+    fail = False
+    in_flight = 0
+    peak_in_flight = 0
+    lock = threading.Lock()
+
+class FakeCompletionsHandler(BaseHTTPRequestHandler):
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        with FakeUpstream.lock:
+            FakeUpstream.in_flight += 1
+            FakeUpstream.peak_in_flight = max(FakeUpstream.peak_in_flight, FakeUpstream.in_flight)
+        try:
+            time.sleep(FakeUpstream.latency)
+            if FakeUpstream.fail:
+                self._send(500, {'error': {'message': 'upstream failure', 'type': 'server_error'}})
+                return
+            self._send(200, {
+                'id': 'chatcmpl-fake',
+                'object': 'chat.completion',
+                'created': int(time.time()),
+                'model': 'gpt-4o',
+                'choices': [{
+                    'index': 0,
+                    'finish_reason': 'stop',
+                    'message': {'role': 'assistant', 'content': json.dumps({'format_suggestions': ['ok']})}
+                }]
+            })
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            with FakeUpstream.lock:
+                FakeUpstream.in_flight -= 1
+
+    def _send(self, status, body):
+        payload = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+def run_calls(gateway, client, count):
+    def one_call(_):
+        try:
+            gateway.call(lambda timeout: client.with_options(timeout=timeout, max_retries=0).chat.completions.create(
+                model='gpt-4o',
+                messages=[{'role': 'user', 'content': 'hello'}]
+            ))
+            return 'ok'
+        except LLMUnavailable as e:
+            return e.reason
+        except Exception:
+            return 'error'
+
+    with ThreadPoolExecutor(max_workers=count) as pool:
+        return list(pool.map(one_call, range(count)))
+
+def check(label, condition):
+    print(f"  [{'ok' if condition else 'FAIL'}] {label}")
+    return condition
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--callers', type=int, default=16, help='Concurrent callers against the healthy upstream.')
+    parser.add_argument('--max-concurrent', type=int, default=4, help="The gateway's concurrency cap.")
+    parser.add_argument('--budget', type=float, default=1.0, help='Latency budget in seconds against the slow upstream.')
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FakeCompletionsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    client = OpenAI(api_key='test', base_url=f"http://127.0.0.1:{server.server_port}/v1")
+    passed = True
+
+    print(f"healthy upstream, {args.callers} concurrent callers, cap of {args.max_concurrent}")
+    gateway = LLMGateway(max_concurrent=args.max_concurrent, timeout=5.0, queue_timeout=5.0)
+    FakeUpstream.latency = 0.2
+    results = run_calls(gateway, client, args.callers)
+    passed &= check("all calls answered", results.count('ok') == args.callers)
+    passed &= check(f"peak upstream concurrency {FakeUpstream.peak_in_flight} <= {args.max_concurrent}",
+                    FakeUpstream.peak_in_flight <= args.max_concurrent)
+    print(f"  {gateway.stats()}")
+
+    print(f"slow upstream, {args.budget:g}s budget")
+    gateway = LLMGateway(max_concurrent=args.max_concurrent, timeout=args.budget, queue_timeout=args.budget,
+                         failure_threshold=3, reset_timeout=2.0)
+    FakeUpstream.latency = args.budget * 3
+    started = time.monotonic()
+    results = run_calls(gateway, client, args.max_concurrent)
+    elapsed = time.monotonic() - started
+    passed &= check(f"budget enforced ({elapsed:.2f}s)", elapsed < args.budget * 1.5 and set(results) == {'timeout'})
+    passed &= check("circuit opened", gateway.breaker.state == 'open')
+    results = run_calls(gateway, client, 4)
+    passed &= check("calls skipped while open", set(results) == {'circuit_open'})
+
+    print("upstream recovers after the reset timeout")
+    FakeUpstream.latency = 0.05
+    time.sleep(2.1)
+    results = run_calls(gateway, client, 1)
+    passed &= check("trial call closes the circuit", results == ['ok'] and gateway.breaker.state == 'closed')
+
+    print("failing upstream")
+    FakeUpstream.fail = True
+    results = run_calls(gateway, client, 3)
+    passed &= check("errors counted and circuit opened", results.count('error') == 3 and gateway.breaker.state == 'open')
+    print(f"  {gateway.stats()}")
+
+    server.shutdown()
+    sys.exit(0 if passed else 1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""
+Benchmark for PDF report downloads.
+
+Stores N completed analyses in a throwaway database, then downloads each
+report through the Flask test client three ways: the first download
+(rendered into the cache), a repeat download (streamed from the cache) and
+a revalidation with If-None-Match (304, nothing sent).
+
+    python benchmarks/pdf_reports.py [--analyses 50]
+"""
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from workdir import use_work_dir
+
+WORK_DIR = use_work_dir('reports_benchmark.db')
+
+import shutil
+import statistics
+from app import app, db
+from models import Analysis, ResumeContent, JobDescriptionContent
+from content_store import store_content
+from ai_suggestions import get_fallback_suggestions
+
+WORDS = ("python sql docker managed team delivered improved reporting customers platform "
+         "experience education skills project led increased reduced achieved").split()
+
+def fill_database(count, rng):
+    job_description_hash = store_content(JobDescriptionContent, 'Python developer with SQL and Docker')
+    for i in range(count):
+        resume = ' '.join(rng.choices(WORDS, k=rng.randint(200, 800)))
+        result = {
+            'keyword_score': rng.uniform(20, 90),
+            'grammar_score': rng.uniform(40, 100),
+            'format_score': rng.uniform(40, 100),
+            'total_score': rng.uniform(30, 95),
+            'matching_keywords': rng.sample(WORDS, 6),
+            'missing_keywords': rng.sample(WORDS, 4)
+        }
+        db.session.add(Analysis.from_result(f'resume_{i}.pdf', job_description_hash,
+                                            store_content(ResumeContent, resume), result, get_fallback_suggestions()))
+    db.session.commit()
+
+def timed_downloads(client, analysis_ids, headers=None):
+    timings = []
+    for analysis_id in analysis_ids:
+        started = time.perf_counter()
+        response = client.get(f'/download/{analysis_id}', headers=(headers or {}).get(analysis_id))
+        response.get_data()
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings, response
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--analyses', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=19)
+    args = parser.parse_args()
+
+    with app.app_context():
+        fill_database(args.analyses, random.Random(args.seed))
+        analysis_ids = list(db.session.execute(db.select(Analysis.id)).scalars())
+
+    client = app.test_client()
+    first, _ = timed_downloads(client, analysis_ids)
+    etags = {analysis_id: {'If-None-Match': client.get(f'/download/{analysis_id}').headers['ETag']}
+             for analysis_id in analysis_ids}
+    cached, _ = timed_downloads(client, analysis_ids)
+    revalidated, response = timed_downloads(client, analysis_ids, etags)
+    assert response.status_code == 304
+
+    for name, timings in (('rendered', first), ('cached', cached), ('304', revalidated)):
+        print(f"{name:>9}: median {statistics.median(timings):7.2f} ms, max {max(timings):7.2f} ms")
+
+    shutil.rmtree(WORK_DIR, ignore_errors=True)
+
+if __name__ == '__main__':
+    main()
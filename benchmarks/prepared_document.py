@@ -0,0 +1,87 @@
+"""
+Benchmark for the shared PreparedDocument.
+
+Runs the analysis request path for N synthetic resumes: keyword scoring,
+analyze_resume, and the suggestions, action plan and recommendations of
+the PDF report. Each resume is run twice: once handing every stage the
+plain text, which then lowercases, splits and tokenizes it on its own, and
+once with one PreparedDocument shared by every stage. Both runs must give
+identical results.
+
+    python benchmarks/prepared_document.py [--resumes 2000]
+"""
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from analyzer import analyze_resume, extract_keywords, calculate_keyword_match
+from prepared_document import PreparedDocument
+from pdf_generator import generate_fallback_suggestions, generate_detailed_recommendations, generate_action_plan
+
+VOCABULARY = (
+    "experience python developed implemented managed team project client company "
+    "software engineering data analysis machine learning aws docker kubernetes "
+    "led designed api rest microservices sql postgresql react javascript agile "
+    "scrum stakeholders delivered improved reduced 25% 2019 2023 e-mail c++ c# "
+    "education university skills contact summary sales marketing customer"
+).split()
+
+JOB_DESCRIPTION = "Python developer with SQL, Docker, AWS and machine learning experience; agile team, REST APIs"
+
+def make_resume(rng):
+    lines = []
+    for _ in range(rng.randint(20, 70)):
+        words = rng.choices(VOCABULARY, k=rng.randint(4, 14))
+        words[0] = words[0].capitalize()
+        lines.append(rng.choice(['• ', '- ', '']) + ' '.join(words) + rng.choice(['.', '', '!']))
+    return '\n'.join(lines)
+
+def run_pipeline(resume, job_keywords, shared):
+    """The request path; every stage gets the shared document when shared, else the text"""
+    document = PreparedDocument(resume) if shared else None
+    source = document if shared else resume
+    keyword_analysis = calculate_keyword_match(extract_keywords(source), job_keywords)
+    result = analyze_resume(source, JOB_DESCRIPTION, job_keywords, keyword_analysis)
+    analysis_data = dict(result, resume_text=resume)
+    return (result,
+            generate_fallback_suggestions(analysis_data, document),
+            generate_action_plan(analysis_data, document),
+            generate_detailed_recommendations(analysis_data, document))
+
+def timed(corpus, job_keywords, shared, repeat=3):
+    """Best of repeat runs over corpus, in microseconds per resume"""
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for resume in corpus:
+            run_pipeline(resume, job_keywords, shared)
+        elapsed = (time.perf_counter() - started) / len(corpus) * 1e6
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--resumes', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=22)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    corpus = [make_resume(rng) for _ in range(args.resumes)]
+    job_keywords = extract_keywords(JOB_DESCRIPTION)
+
+    mismatches = sum(1 for resume in corpus
+                     if run_pipeline(resume, job_keywords, False) != run_pipeline(resume, job_keywords, True))
+    print(f"parity: {len(corpus)} resumes, {mismatches} mismatches")
+
+    separate = timed(corpus, job_keywords, False)
+    shared = timed(corpus, job_keywords, True)
+    print(f"text per stage:         {separate:8.1f} us/resume")
+    print(f"one prepared document:  {shared:8.1f} us/resume ({separate / shared:.2f}x)")
+    sys.exit(1 if mismatches else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""
+Benchmark for bulk report exports.
+
+Stores N completed analyses in a throwaway database and exports all their
+reports through the Flask test client: as a ZIP rendered in-process, as a
+ZIP rendered across the export process pool (each with an empty report
+cache), as a ZIP served from the now warm cache, and as one merged PDF.
+Prints the time of each and the peak memory of this process.
+
+    python benchmarks/report_export.py [--analyses 200] [--workers 4]
+"""
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from workdir import use_work_dir
+
+WORK_DIR = use_work_dir('export_benchmark.db')
+
+import shutil
+import resource
+from app import app, db
+from models import Analysis, ResumeContent, JobDescriptionContent
+from content_store import store_content
+from ai_suggestions import get_fallback_suggestions
+
+WORDS = ("python sql docker managed team delivered improved reporting customers platform "
+         "experience education skills project led increased reduced achieved").split()
+
+def fill_database(count, rng):
+    job_description_hash = store_content(JobDescriptionContent, 'Python developer with SQL and Docker')
+    for i in range(count):
+        resume = ' '.join(rng.choices(WORDS, k=rng.randint(200, 800)))
+        result = {
+            'keyword_score': rng.uniform(20, 90),
+            'grammar_score': rng.uniform(40, 100),
+            'format_score': rng.uniform(40, 100),
+            'total_score': rng.uniform(30, 95),
+            'matching_keywords': rng.sample(WORDS, 6),
+            'missing_keywords': rng.sample(WORDS, 4)
+        }
+        db.session.add(Analysis.from_result(f'resume_{i}.pdf', job_description_hash,
+                                            store_content(ResumeContent, resume), result, get_fallback_suggestions()))
+    db.session.commit()
+
+def clear_report_cache():
+    shutil.rmtree(app.config['REPORT_CACHE_DIR'], ignore_errors=True)
+
+def timed_export(client, analysis_ids, export_format='zip'):
+    started = time.perf_counter()
+    response = client.post('/download/reports', data={'ids': ','.join(map(str, analysis_ids)), 'format': export_format})
+    size = sum(len(chunk) for chunk in response.response)
+    response.close()
+    assert response.status_code == 200
+    return time.perf_counter() - started, size
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--analyses', type=int, default=200)
+    parser.add_argument('--workers', type=int, default=min(4, os.cpu_count() or 1))
+    parser.add_argument('--seed', type=int, default=20)
+    args = parser.parse_args()
+
+    app.config['REPORT_EXPORT_MAX_ANALYSES'] = max(app.config['REPORT_EXPORT_MAX_ANALYSES'], args.analyses)
+    # Time the merge itself rather than the job queue's polling
+    app.config['REPORT_MERGE_INLINE_MAX'] = max(app.config['REPORT_MERGE_INLINE_MAX'], args.analyses)
+    with app.app_context():
+        fill_database(args.analyses, random.Random(args.seed))
+        analysis_ids = list(db.session.execute(db.select(Analysis.id)).scalars())
+
+    client = app.test_client()
+    runs = []
+    for name, workers, export_format, cold in (('zip, in-process', 0, 'zip', True),
+                                               (f'zip, {args.workers} workers', args.workers, 'zip', True),
+                                               ('zip, cached', args.workers, 'zip', False),
+                                               ('merged pdf, cached', args.workers, 'pdf', False)):
+        app.config['REPORT_EXPORT_WORKERS'] = workers
+        if cold:
+            clear_report_cache()
+        elapsed, size = timed_export(client, analysis_ids, export_format)
+        runs.append((name, elapsed, size))
+
+    for name, elapsed, size in runs:
+        print(f"{name:>20}: {elapsed:6.2f}s, {len(analysis_ids) / elapsed:7.1f} reports/s, {size / 1024 / 1024:6.1f} MB")
+    print(f"peak memory: {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MB")
+
+    shutil.rmtree(WORK_DIR, ignore_errors=True)
+
+if __name__ == '__main__':
+    main()
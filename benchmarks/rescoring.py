@@ -0,0 +1,89 @@
+"""
+Benchmark for `flask rescore-analyses`.
+
+Stores N analyses (resumes of a few hundred words, against a handful of job
+descriptions) in a throwaway database, then rescores all of them in-process
+and across a pool of worker processes, printing the rows per second of
+each. Both runs must store the same scores.
+
+    python benchmarks/rescoring.py [--analyses 20000] [--workers 4] [--chunk-size 1000]
+"""
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from workdir import use_work_dir
+
+WORK_DIR = use_work_dir('rescore_benchmark.db')
+
+import shutil
+from sqlalchemy import insert, select
+from app import app, db
+from models import Analysis, ResumeContent, JobDescriptionContent
+from content_store import store_content, store_contents
+from rescoring import rescore_analyses
+
+WORDS = ("python sql docker managed team delivered improved reporting customers platform experience "
+         "education skills project led increased reduced achieved 2021 25% kubernetes aws analysis").split()
+
+def fill_database(count, rng):
+    job_descriptions = [store_content(JobDescriptionContent, ' '.join(rng.choices(WORDS, k=60))) for _ in range(5)]
+    for start in range(0, count, 1000):
+        resumes = ['. '.join(' '.join(rng.choices(WORDS, k=12)) for _ in range(rng.randint(15, 60)))
+                   for _ in range(start, min(start + 1000, count))]
+        db.session.execute(insert(Analysis), [
+            {
+                'filename': f'resume_{start + i}.pdf',
+                'job_description_hash': rng.choice(job_descriptions),
+                'resume_hash': resume_hash,
+                'keyword_score': 0.0,
+                'grammar_score': 0.0,
+                'format_score': 0.0,
+                'total_score': 0.0,
+                'matching_keywords': [],
+                'missing_keywords': []
+            }
+            for i, resume_hash in enumerate(store_contents(ResumeContent, resumes))
+        ])
+        # store_contents writes through its own session
+        db.session.commit()
+
+def stored_scores():
+    return db.session.execute(
+        select(Analysis.id, Analysis.keyword_score, Analysis.grammar_score, Analysis.format_score, Analysis.total_score)
+        .order_by(Analysis.id)
+    ).all()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--analyses', type=int, default=20000)
+    parser.add_argument('--workers', type=int, default=min(4, os.cpu_count() or 1))
+    parser.add_argument('--chunk-size', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=23)
+    args = parser.parse_args()
+
+    with app.app_context():
+        fill_database(args.analyses, random.Random(args.seed))
+
+        runs = []
+        scores = []
+        for name, workers in (('in-process', 0), (f'{args.workers} workers', args.workers)):
+            started = time.perf_counter()
+            _, rescored = rescore_analyses('keyword', workers, args.chunk_size, restart=True)
+            elapsed = time.perf_counter() - started
+            runs.append((name, rescored, elapsed))
+            scores.append(stored_scores())
+
+    for name, rescored, elapsed in runs:
+        print(f"{name:>12}: {rescored} analyses in {elapsed:6.1f}s, {rescored / elapsed:7.0f} rows/s")
+    print(f"same scores: {scores[0] == scores[1]}")
+
+    shutil.rmtree(WORK_DIR, ignore_errors=True)
+    sys.exit(0 if scores[0] == scores[1] else 1)
+
+if __name__ == '__main__':
+    main()
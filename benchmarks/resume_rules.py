@@ -0,0 +1,174 @@
+"""
+Benchmark and golden check for the grammar and format scores.
+
+Scores N synthetic resumes with calculate_grammar_score and
+calculate_format_score, fed by one pass of the compiled rule scanner, next
+to the original per-heuristic implementations kept below. Every score must
+be identical; besides the resumes, a set of generated edge cases (sentence
+breaks, spacing, punctuation, case-folding oddities like İ, ſ and the
+Kelvin sign) is checked too.
+
+    python benchmarks/resume_rules.py [--resumes 10000] [--edge-cases 20000]
+"""
+import os
+import re
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from analyzer import calculate_grammar_score, calculate_format_score
+from prepared_document import PreparedDocument
+
+VOCABULARY = (
+    "experience python developed implemented managed team project client company "
+    "software engineering data analysis machine learning aws docker kubernetes "
+    "led designed api rest microservices sql postgresql react javascript agile "
+    "scrum stakeholders delivered improved reduced 25% 2019 2023 1998 e-mail "
+    "education university degree skills technologies contact phone summary profile "
+    "5 years 3 months 12 projects 4 clients organization department"
+).split()
+
+# Characters that stress sentence splitting, spacing and case folding
+EDGE_ALPHABET = list("aAbBcCdDeEiIkKlLmMnNoOpPsStTyY0129 .!?,;:-*•▪◦%\t\n") + [
+    'İ', 'ı', 'ſ', 'K', 'Σ', 'é', 'É', ' ', ' ', '٣', '_'
+]
+EDGE_WORDS = ("Led led LED developed Experience career Skills phone ABOUT team clients client 2020 1999 "
+              "20 % years Years yearsx 5years İled ledİ ſkills ſummary Key Kelvin").split()
+
+def legacy_grammar_score(text):
+    """The original calculate_grammar_score, kept here only for parity checks"""
+    base_score = 78
+    sentences = re.split(r'[.!?]+', text)
+    issues = 0
+    for sentence in sentences:
+        sentence = sentence.strip()
+        if not sentence:
+            continue
+        if sentence and sentence[0].islower() and not sentence.startswith(('•', '-', '*')):
+            issues += 1
+        if '  ' in sentence:
+            issues += 1
+        if re.search(r'[,;:](?=[A-Za-z])', sentence):
+            issues += 1
+    penalty = min(issues, 8) * 3
+    grammar_score = max(65, base_score - penalty)
+    word_count = len(text.split())
+    if word_count > 300:
+        grammar_score += 5
+    if re.search(r'\b(developed|implemented|managed|led|created|designed)\b', text.lower()):
+        grammar_score += 3
+    return min(95, grammar_score)
+
+def legacy_format_score(text):
+    """The original calculate_format_score, kept here only for parity checks"""
+    base_score = 72
+    bonus_points = 0
+    text_lower = text.lower()
+    sections = [
+        ['experience', 'work experience', 'employment', 'career'],
+        ['education', 'academic', 'degree', 'university'],
+        ['skills', 'technical skills', 'competencies', 'technologies'],
+        ['contact', 'email', 'phone', 'address'],
+        ['summary', 'objective', 'profile', 'about']
+    ]
+    for section_keywords in sections:
+        if any(keyword in text_lower for keyword in section_keywords):
+            bonus_points += 4
+    word_count = len(text.split())
+    if 250 <= word_count <= 600:
+        bonus_points += 8
+    elif 150 <= word_count <= 800:
+        bonus_points += 5
+    elif word_count >= 100:
+        bonus_points += 2
+    if any(marker in text for marker in ['•', '▪', '◦', '-', '*']):
+        bonus_points += 6
+    if re.search(r'\b(19|20)\d{2}\b', text):
+        bonus_points += 4
+    professional_terms = ['project', 'team', 'client', 'company', 'organization', 'department']
+    if any(term in text_lower for term in professional_terms):
+        bonus_points += 3
+    if re.search(r'\b\d+%|\b\d+\s*(years?|months?|projects?|clients?)\b', text_lower):
+        bonus_points += 3
+    final_score = min(95, base_score + bonus_points)
+    return max(68, final_score)
+
+def make_resume(rng):
+    lines = []
+    for _ in range(rng.randint(10, 70)):
+        words = rng.choices(VOCABULARY, k=rng.randint(4, 14))
+        if rng.random() < 0.5:
+            words[0] = words[0].capitalize()
+        line = ' '.join(words)
+        if rng.random() < 0.1:
+            line = line.replace(' ', '  ', 1)
+        if rng.random() < 0.1:
+            line = line.replace(' ', ',', 1)
+        lines.append(rng.choice(['• ', '- ', '', '']) + line + rng.choice(['.', '', '!', '. ']))
+    return '\n'.join(lines)
+
+def make_edge_case(rng):
+    parts = []
+    for _ in range(rng.randint(0, 12)):
+        if rng.random() < 0.4:
+            parts.append(rng.choice(EDGE_WORDS))
+        else:
+            parts.append(''.join(rng.choices(EDGE_ALPHABET, k=rng.randint(1, 6))))
+    return ''.join(rng.choice(['', ' ', '  ', '.', '. ', ',', '\n']) + part for part in parts)
+
+def check_parity(texts):
+    mismatches = 0
+    for text in texts:
+        if (calculate_grammar_score(text), calculate_format_score(text)) != (legacy_grammar_score(text),
+                                                                             legacy_format_score(text)):
+            mismatches += 1
+            if mismatches <= 5:
+                print(f"  mismatch: {text!r}")
+    return mismatches
+
+def time_scores(corpus, grammar, format_, repeat=5):
+    """Best of repeat runs over corpus, in microseconds per resume"""
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for text in corpus:
+            grammar(text)
+            format_(text)
+        elapsed = (time.perf_counter() - started) / len(corpus) * 1e6
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--resumes', type=int, default=10000)
+    parser.add_argument('--edge-cases', type=int, default=20000)
+    parser.add_argument('--seed', type=int, default=21)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    corpus = [make_resume(rng) for _ in range(args.resumes)]
+    edge_cases = [make_edge_case(rng) for _ in range(args.edge_cases)]
+
+    mismatches = check_parity(corpus) + check_parity(edge_cases)
+    print(f"golden check: {len(corpus)} resumes and {len(edge_cases)} edge cases, {mismatches} mismatches")
+
+    legacy = time_scores(corpus, legacy_grammar_score, legacy_format_score)
+
+    def scanned(text):
+        # What analyze_resume does: one prepared document feeds both scores
+        document = PreparedDocument(text)
+        calculate_grammar_score(document)
+        calculate_format_score(document)
+    compiled = time_scores(corpus, scanned, lambda text: None)
+
+    average_chars = sum(len(text) for text in corpus) / len(corpus)
+    print(f"resumes: {len(corpus)}, {average_chars:.0f} characters on average")
+    print(f"original heuristics: {legacy:8.1f} us/resume")
+    print(f"compiled rule scan:  {compiled:8.1f} us/resume ({legacy / compiled:.2f}x)")
+    sys.exit(1 if mismatches else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,167 @@
+"""
+Benchmark for search_index at scale.
+
+Fills a throwaway SQLite database and index directory with N synthetic
+analyses, builds the segmented inverted index in batches (merging as it
+goes), then times top-k queries. Up to --check resumes, every query is also
+answered by brute force, scoring each stored resume's keywords with BM25 in
+plain Python, and both must return the same candidates.
+
+    python benchmarks/search_index.py [--resumes 100000] [--queries 20] [-k 10] [--check 20000]
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import shutil
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from workdir import use_work_dir
+
+WORK_DIR = use_work_dir('search_benchmark.db')
+
+import math
+from sqlalchemy import insert
+from app import app, db
+from models import Analysis, ResumeContent, JobDescriptionContent
+from content_store import store_content, store_contents, select_resume_texts, stored_text
+from job_profile import get_job_profile
+from search_index import index_new_analyses, index_terms, top_candidates, search_index_stats
+from scoring import BM25_K1, BM25_B
+
+SKILLS = (
+    "python java javascript typescript react angular django flask spring kubernetes docker "
+    "terraform aws azure gcp postgresql mysql mongodb redis kafka spark hadoop airflow "
+    "tensorflow pytorch pandas numpy graphql microservices linux bash jenkins ansible "
+    "scala rust ruby php swift kotlin tableau excel salesforce sap etl"
+).split()
+COMMON = (
+    "experience team developed managed project worked responsible delivered improved "
+    "stakeholders communication leadership designed implemented company years role "
+    "customers platform systems reporting budget quality process operations support"
+).split()
+
+# Filler vocabulary with a Zipf-like spread, as in real resumes
+FILLER = COMMON + [''.join(random.Random(i).choices('abcdefghijklmnopqrstuvwxyz', k=7)) for i in range(3000)]
+FILLER_WEIGHTS = [1 / (rank + 1) for rank in range(len(FILLER))]
+
+def make_resume(rng):
+    """150-900 words; each listed skill is mentioned one to four times"""
+    words = rng.choices(FILLER, weights=FILLER_WEIGHTS, k=rng.randint(150, 900))
+    for skill in rng.sample(SKILLS, rng.randint(3, 12)):
+        for _ in range(rng.randint(1, 4)):
+            words.insert(rng.randrange(len(words) + 1), skill)
+    return ' '.join(words)
+
+def make_job_description(rng):
+    return "Hiring an engineer with " + ', '.join(rng.sample(SKILLS, 8)) + '. ' + ' '.join(rng.sample(COMMON, 6))
+
+def fill_database(count, rng):
+    job_description_hash = store_content(JobDescriptionContent, 'benchmark')
+    for start in range(0, count, 5000):
+        resume_hashes = store_contents(ResumeContent, [make_resume(rng) for _ in range(min(5000, count - start))])
+        db.session.execute(insert(Analysis), [
+            {
+                'filename': f'resume_{start + i}.pdf',
+                'job_description_hash': job_description_hash,
+                'resume_hash': resume_hash,
+                'keyword_score': 0.0,
+                'grammar_score': 0.0,
+                'format_score': 0.0,
+                'total_score': 0.0
+            }
+            for i, resume_hash in enumerate(resume_hashes)
+        ])
+    db.session.commit()
+
+def load_documents():
+    """Keyword counts of every stored resume, tokenized again from its text, under its first analysis"""
+    documents = {}
+    for analysis_id, resume_hash, content, compression, legacy_text in db.session.execute(
+            select_resume_texts(Analysis.id, Analysis.resume_hash).order_by(Analysis.id)):
+        # Texts never moved to the content tables count as their own resume
+        key = resume_hash or analysis_id
+        if key not in documents:
+            documents[key] = (analysis_id, index_terms(stored_text(content, compression, legacy_text)))
+    return list(documents.values())
+
+def brute_force_top(documents, job_description, k):
+    """BM25 of every resume against the job, the way the index should rank them"""
+    profile = get_job_profile(job_description)
+    average_length = sum(sum(terms.values()) for _, terms in documents) / len(documents)
+    weights = {}
+    for term in profile.keywords:
+        doc_freq = sum(1 for _, terms in documents if term in terms)
+        weights[term] = math.log1p((len(documents) - doc_freq + 0.5) / (doc_freq + 0.5)) * profile.weights.get(term, 1.0)
+    best_possible = sum(weights.values()) * (BM25_K1 + 1)
+
+    scores = []
+    for analysis_id, terms in documents:
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * sum(terms.values()) / average_length)
+        score = sum(weight * terms[term] * (BM25_K1 + 1) / (terms[term] + norm)
+                    for term, weight in weights.items() if term in terms)
+        if score:
+            scores.append((score, analysis_id))
+    scores.sort(key=lambda item: (-item[0], item[1]))
+    return [(analysis_id, round(score / best_possible * 100, 2)) for score, analysis_id in scores[:k]]
+
+def directory_size(path):
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--resumes', type=int, default=100000)
+    parser.add_argument('--queries', type=int, default=20)
+    parser.add_argument('-k', type=int, default=10)
+    parser.add_argument('--check', type=int, default=20000,
+                        help='Largest index to verify against brute force.')
+    parser.add_argument('--seed', type=int, default=11)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    with app.app_context():
+        started = time.perf_counter()
+        fill_database(args.resumes, rng)
+        print(f"stored {args.resumes} analyses in {time.perf_counter() - started:.1f}s")
+
+        started = time.perf_counter()
+        index_new_analyses()
+        elapsed = time.perf_counter() - started
+        stats = search_index_stats()
+        print(f"indexed in {elapsed:.1f}s ({args.resumes / elapsed:.0f} resumes/s, {stats['segments']} segments, "
+              f"{stats['postings']} postings, {directory_size(os.environ['SEARCH_INDEX_DIR']) / 1024 / 1024:.0f} MB on disk)")
+
+        job_descriptions = [make_job_description(rng) for _ in range(args.queries)]
+        for job_description in job_descriptions:
+            get_job_profile(job_description)
+        # Map the segments before timing
+        top_candidates(job_descriptions[0], args.k)
+
+        timings = []
+        results = []
+        for job_description in job_descriptions:
+            started = time.perf_counter()
+            results.append(top_candidates(job_description, args.k))
+            timings.append(time.perf_counter() - started)
+        timings.sort()
+        print(f"top-{args.k} query: median {timings[len(timings) // 2] * 1000:.1f} ms, max {timings[-1] * 1000:.1f} ms")
+
+        mismatches = 0
+        if args.resumes <= args.check:
+            documents = load_documents()
+            for job_description, fast in zip(job_descriptions, results):
+                # Ties may be ordered differently, so compare the score lists
+                exact = brute_force_top(documents, job_description, args.k)
+                if [score for _, score in fast] != [score for _, score in exact]:
+                    mismatches += 1
+            print(f"top-{args.k} mismatches against brute force: {mismatches}")
+        else:
+            print(f"brute force check skipped above {args.check} resumes")
+
+    shutil.rmtree(WORK_DIR, ignore_errors=True)
+    sys.exit(1 if mismatches else 0)
+
+if __name__ == '__main__':
+    main()
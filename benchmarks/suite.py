@@ -0,0 +1,302 @@
+"""
+Benchmark suite for the analysis pipeline, on a synthetic corpus.
+
+Generates a seeded corpus of PDF and DOCX resumes and job descriptions
+(see corpus.py, fully offline), then measures each stage on it:
+
+    extract_pdf, extract_docx   file_processor.process_file, in this process
+    keyword_extraction          analyzer.extract_keywords
+    scoring                     job profile, score_keywords and analyze_resume
+    pdf_render                  pdf_generator.generate_analysis_pdf
+    end_to_end                  POST /analyze, the results page and the PDF
+                                download through the Flask test client
+
+Each stage reports throughput (best of --repeat passes), per-item p50/p95
+latency and the peak Python memory of one pass, traced separately so the
+tracing does not slow the timed passes. end_to_end uploads documents no
+pass has seen before, so no cache answers for them; AI suggestions use the
+fallback, as no API key is passed on. The results, with the corpus
+fingerprint and environment, are printed and written as JSON with
+--output. With --baseline, they are compared against an earlier --output
+file and the exit status is 1 when a stage's throughput dropped or its
+memory grew by more than --tolerance.
+
+    python benchmarks/suite.py [--resumes 50] [--words 600] [--output results.json] [--baseline baseline.json]
+
+The other scripts in this directory benchmark single components in more
+depth, each against the implementation it replaced.
+"""
+import io
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import subprocess
+import statistics
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from workdir import use_work_dir
+
+WORK_DIR = use_work_dir('suite_benchmark.db')
+# Offline: AI suggestions always use the fallback
+os.environ.pop('OPENAI_API_KEY', None)
+
+import shutil
+import resource
+import tracemalloc
+from app import app
+from file_processor import process_file
+from analyzer import analyze_resume, extract_keywords
+from prepared_document import PreparedDocument
+from job_profile import get_job_profile
+from scoring import score_keywords
+from pdf_generator import generate_analysis_pdf
+from ai_suggestions import get_fallback_suggestions
+from metrics import stage_seconds
+from corpus import make_corpus, fingerprint, to_text, to_pdf, to_docx
+
+STAGES = ('extract_pdf', 'extract_docx', 'keyword_extraction', 'scoring', 'pdf_render', 'end_to_end')
+RESULTS_VERSION = 1
+# Peak memory differences below this are noise, whatever the relative change
+MEMORY_NOISE_MB = 0.5
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except Exception:
+        return None
+
+def timed_pass(func, items):
+    """Seconds of each func(item) call, in order"""
+    timings = []
+    for item in items:
+        started = time.perf_counter()
+        func(item)
+        timings.append(time.perf_counter() - started)
+    return timings
+
+def traced_pass(func, items):
+    """Peak Python memory above the starting point while running func over items, in MB"""
+    tracemalloc.start()
+    try:
+        baseline = tracemalloc.get_traced_memory()[0]
+        for item in items:
+            func(item)
+        return (tracemalloc.get_traced_memory()[1] - baseline) / 1024 / 1024
+    finally:
+        tracemalloc.stop()
+
+def percentile(sorted_values, q):
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+def measure(func, items, repeat, size=None):
+    """
+    Stage results of the best of repeat timed passes over items; size(item)
+    gives the input bytes of an item, for MB/s
+    """
+    passes = [timed_pass(func, items) for _ in range(repeat)]
+    best = sorted(min(passes, key=sum))
+    total = sum(best)
+    result = {
+        'items': len(items),
+        'seconds': round(total, 4),
+        'items_per_second': round(len(items) / total, 2),
+        'mean_ms': round(statistics.mean(best) * 1000, 3),
+        'p50_ms': round(percentile(best, 0.5) * 1000, 3),
+        'p95_ms': round(percentile(best, 0.95) * 1000, 3)
+    }
+    if size is not None:
+        result['mb_per_second'] = round(sum(size(item) for item in items) / total / 1024 / 1024, 2)
+    return result
+
+def measure_stage(func, items, repeat, size=None):
+    """measure() plus the peak memory of a traced pass over the same items"""
+    result = measure(func, items, repeat, size)
+    result['peak_memory_mb'] = round(traced_pass(func, items), 2)
+    return result
+
+def analysis_report(text, job_description):
+    """generate_analysis_pdf() input for a resume, as report_cache builds it from a stored analysis"""
+    job_profile = get_job_profile(job_description)
+    document = PreparedDocument(text)
+    keyword_analysis = score_keywords([document], job_profile)[0]
+    result = analyze_resume(document, job_description, job_profile.keywords, keyword_analysis)
+    return dict(result, filename='resume.pdf', job_description=job_description, resume_text=text,
+                ai_suggestions=get_fallback_suggestions(), created_at='2024-01-01 00:00:00')
+
+def score(item):
+    text, job_description = item
+    job_profile = get_job_profile(job_description)
+    document = PreparedDocument(text)
+    keyword_analysis = score_keywords([document], job_profile)[0]
+    analyze_resume(document, job_description, job_profile.keywords, keyword_analysis)
+
+def end_to_end(client):
+    def run(item):
+        data, filename, job_description = item
+        response = client.post('/analyze', data={'job_description': job_description,
+                                                 'resume': (io.BytesIO(data), filename)},
+                               content_type='multipart/form-data')
+        assert response.status_code == 302, f"/analyze returned {response.status_code}"
+        location = response.headers['Location']
+        assert client.get(location).status_code == 200
+        analysis_id = location.rstrip('/').rsplit('/', 1)[1]
+        download = client.get(f'/download/{analysis_id}')
+        assert download.status_code == 200 and download.data.startswith(b'%PDF')
+        download.close()
+    return run
+
+def stage_totals():
+    return {stage: (stats['count'], stats['total_ms']) for stage, stats in stage_seconds.stats().items()}
+
+def breakdown(before, after):
+    """Mean milliseconds per call of each instrumented stage between two stage_totals()"""
+    means = {}
+    for stage, (count, total_ms) in after.items():
+        count_before, total_before = before.get(stage, (0, 0.0))
+        if count > count_before:
+            means[stage] = round((total_ms - total_before) / (count - count_before), 2)
+    return means
+
+def compare(results, baseline, tolerance):
+    """(stage, metric, baseline, current, change, regressed) for the stages both runs measured"""
+    rows = []
+    for stage, current in results['stages'].items():
+        previous = baseline.get('stages', {}).get(stage)
+        if previous is None:
+            continue
+        for metric, higher_is_better in (('items_per_second', True), ('peak_memory_mb', False)):
+            old, new = previous.get(metric), current.get(metric)
+            if not old or new is None:
+                continue
+            change = new / old - 1
+            if higher_is_better:
+                regressed = change < -tolerance
+            else:
+                regressed = change > tolerance and new - old > MEMORY_NOISE_MB
+            rows.append((stage, metric, old, new, change, regressed))
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--resumes', type=int, default=50, help='Resumes in the corpus of the in-process stages.')
+    parser.add_argument('--words', type=int, default=600, help='Average words per resume.')
+    parser.add_argument('--job-descriptions', type=int, default=5)
+    parser.add_argument('--e2e-resumes', type=int, default=10, help='Uploads timed end to end.')
+    parser.add_argument('--repeat', type=int, default=3, help='Timed passes per stage; the best one counts.')
+    parser.add_argument('--stages', nargs='+', choices=STAGES, default=list(STAGES))
+    parser.add_argument('--seed', type=int, default=25)
+    parser.add_argument('--output', help='Write the results as JSON to this file.')
+    parser.add_argument('--baseline', help='Compare against the JSON results of an earlier run.')
+    parser.add_argument('--tolerance', type=float, default=0.1,
+                        help='Change counted as a regression, as a fraction (0.1 is 10%%).')
+    args = parser.parse_args()
+
+    # The end-to-end uploads come after the resumes: one warm-up, then a timed and a traced set.
+    # They are generated even when not run, so the corpus only depends on the options
+    e2e_count = args.e2e_resumes
+    corpus = make_corpus(args.resumes + 2 * e2e_count + 1, args.words, args.job_descriptions, args.seed)
+    resumes = corpus.resumes[:args.resumes]
+    job_descriptions = [corpus.job_descriptions[i % len(corpus.job_descriptions)] for i in range(len(corpus.resumes))]
+    texts = [to_text(blocks) for blocks in resumes]
+    pairs = list(zip(texts, job_descriptions))
+
+    results = {
+        'version': RESULTS_VERSION,
+        'created_at': datetime.utcnow().isoformat(timespec='seconds') + 'Z',
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'commit': git_commit()
+        },
+        'config': {
+            'resumes': args.resumes,
+            'words': args.words,
+            'job_descriptions': args.job_descriptions,
+            'e2e_resumes': e2e_count,
+            'repeat': args.repeat,
+            'seed': args.seed,
+            'corpus': fingerprint(corpus)
+        },
+        'stages': {}
+    }
+    stages = results['stages']
+
+    with app.app_context():
+        if 'extract_pdf' in args.stages:
+            pdfs = [to_pdf(blocks) for blocks in resumes]
+            process_file(pdfs[0], 'resume.pdf')
+            stages['extract_pdf'] = measure_stage(lambda data: process_file(data, 'resume.pdf'), pdfs, args.repeat,
+                                                  size=len)
+        if 'extract_docx' in args.stages:
+            docxs = [to_docx(blocks) for blocks in resumes]
+            process_file(docxs[0], 'resume.docx')
+            stages['extract_docx'] = measure_stage(lambda data: process_file(data, 'resume.docx'), docxs, args.repeat,
+                                                   size=len)
+        if 'keyword_extraction' in args.stages:
+            extract_keywords(texts[0])
+            stages['keyword_extraction'] = measure_stage(extract_keywords, texts, args.repeat,
+                                                         size=lambda text: len(text.encode('utf-8')))
+        if 'scoring' in args.stages:
+            score(pairs[0])
+            stages['scoring'] = measure_stage(score, pairs, args.repeat)
+        if 'pdf_render' in args.stages:
+            reports = [analysis_report(text, job_description) for text, job_description in pairs]
+            generate_analysis_pdf(reports[0])
+            stages['pdf_render'] = measure_stage(generate_analysis_pdf, reports, args.repeat)
+
+    if 'end_to_end' in args.stages and e2e_count:
+        # Alternate PDF and DOCX uploads, each document uploaded once
+        uploads = [(to_pdf(blocks), f'resume_{i}.pdf') if i % 2 == 0 else (to_docx(blocks), f'resume_{i}.docx')
+                   for i, blocks in enumerate(corpus.resumes[args.resumes:], args.resumes)]
+        items = [(data, filename, job_descriptions[i])
+                 for i, (data, filename) in enumerate(uploads, args.resumes)]
+        run = end_to_end(app.test_client())
+        run(items[0])
+        before = stage_totals()
+        result = measure(run, items[1:1 + e2e_count], 1)
+        result['breakdown_ms'] = breakdown(before, stage_totals())
+        result['peak_memory_mb'] = round(traced_pass(run, items[1 + e2e_count:]), 2)
+        stages['end_to_end'] = result
+
+    results['max_rss_mb'] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+    print(f"corpus {results['config']['corpus'][:12]}: {len(resumes)} resumes of ~{args.words} words, "
+          f"best of {args.repeat} passes ({e2e_count} end-to-end uploads, timed once)")
+    for stage, result in stages.items():
+        throughput = f", {result['mb_per_second']:7.2f} MB/s" if 'mb_per_second' in result else ''
+        print(f"{stage:>20}: {result['items_per_second']:8.1f} items/s{throughput}, p50 {result['p50_ms']:8.2f} ms, "
+              f"p95 {result['p95_ms']:8.2f} ms, peak {result['peak_memory_mb']:6.2f} MB")
+    if 'end_to_end' in stages:
+        print('end-to-end breakdown: ' + ', '.join(f"{stage} {ms} ms" for stage, ms in stages['end_to_end']['breakdown_ms'].items()))
+    print(f"max RSS: {results['max_rss_mb']} MB")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Wrote {args.output}")
+
+    status = 0
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get('config') != results['config']:
+            print("warning: the baseline was run with other options or another corpus; changes may not be meaningful")
+        rows = compare(results, baseline, args.tolerance)
+        print(f"against {args.baseline} (commit {baseline.get('environment', {}).get('commit')}):")
+        for stage, metric, old, new, change, regressed in rows:
+            print(f"{stage:>20} {metric:>16}: {old:10.2f} -> {new:10.2f} ({change:+7.1%}){'  REGRESSION' if regressed else ''}")
+        if any(row[-1] for row in rows):
+            status = 1
+
+    shutil.rmtree(WORK_DIR, ignore_errors=True)
+    return status
+
+if __name__ == '__main__':
+    sys.exit(main())
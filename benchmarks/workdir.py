@@ -0,0 +1,19 @@
+"""
+Throwaway working directory for the benchmarks that run the app.
+
+Call use_work_dir() before importing app: it points the SQLite database,
+the search index and the report cache at a new temporary directory, so a
+benchmark never reads or writes a real instance. Remove the directory it
+returns when the benchmark is done.
+"""
+import os
+import tempfile
+
+def use_work_dir(database_name):
+    """A new temporary directory holding the benchmark's database_name SQLite file, search index and report cache"""
+    work_dir = tempfile.mkdtemp()
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(work_dir, database_name)}"
+    # The job workers index new analyses while idle, so the index needs a home too
+    os.environ['SEARCH_INDEX_DIR'] = os.path.join(work_dir, 'search_index')
+    os.environ['REPORT_CACHE_DIR'] = os.path.join(work_dir, 'report_cache')
+    return work_dir
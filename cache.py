@@ -0,0 +1,189 @@
+import time
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from flask import has_app_context
+from sqlalchemy import select, delete, func, inspect
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app import db
+
+# Every named cache registers itself here so its counters can be reported
+_caches = {}
+
+class LRUCache:
+    """
+    Thread-safe in-process LRU cache with optional TTL and hit/miss counters
+    """
+
+    def __init__(self, name, max_entries=1024, ttl=None):
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        _caches[name] = self
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+
+            value, expires_at = entry
+            if expires_at is not None and expires_at < time.monotonic():
+                del self._data[key]
+                self.misses += 1
+                return default
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key, default=None):
+        with self._lock:
+            entry = self._data.pop(key, None)
+            return entry[0] if entry else default
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._data),
+            'max_entries': self.max_entries,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+class TieredCache:
+    """
+    An LRUCache in front of a database table that every worker shares.
+    Lookups go to the table only on a memory miss and inside an app
+    context; from_record turns a row into the cached value and
+    to_record(key, value, **fields) builds the row to store. With ttl, rows
+    older than ttl seconds are misses and are dropped. With max_rows, every
+    store evicts the least recently used rows down to EVICTION_TARGET of it.
+    Rows go through their own Session so a failed write never rolls back the
+    caller's work, and another worker storing the same key first is fine.
+    """
+
+    # Evict down to this share of max_rows so eviction is not run on every insert
+    EVICTION_TARGET = 0.9
+
+    def __init__(self, name, model, from_record, to_record, max_entries=1024, ttl=None, max_rows=None,
+                 counters=()):
+        self.name = name
+        self.memory = LRUCache(name, max_entries=max_entries, ttl=ttl)
+        self.model = model
+        self.from_record = from_record
+        self.to_record = to_record
+        self.ttl = ttl
+        self.max_rows = max_rows
+        self._key_column = inspect(model).primary_key[0]
+        # Least recently used rows go first; tables without last_used_at evict the oldest
+        self._used_column = getattr(model, 'last_used_at', None) or model.created_at
+        self._counters = dict.fromkeys(('db_hits', 'db_evictions', *counters), 0)
+        self._counters_lock = threading.Lock()
+
+    def get(self, key):
+        """The cached value from memory or the table, or None"""
+        value = self.memory.get(key)
+        if value is not None or not has_app_context():
+            return value
+
+        try:
+            with Session(db.engine) as session:
+                record = session.get(self.model, key)
+                if record is None:
+                    return None
+
+                if self.ttl and record.created_at < self._cutoff():
+                    session.delete(record)
+                    session.commit()
+                    return None
+
+                value = self.from_record(record)
+                if hasattr(record, 'last_used_at'):
+                    record.last_used_at = datetime.utcnow()
+                    session.commit()
+        except Exception as e:
+            logging.error(f"Error reading {self.name} cache: {str(e)}")
+            return None
+
+        self.count('db_hits')
+        self.memory.set(key, value)
+        return value
+
+    def set(self, key, value, **fields):
+        """Cache value in memory and, inside an app context, in the table"""
+        self.memory.set(key, value)
+        if not has_app_context():
+            return
+
+        try:
+            with Session(db.engine) as session:
+                session.add(self.to_record(key, value, **fields))
+                session.commit()
+                if self.ttl or self.max_rows:
+                    self.evict(session)
+        except IntegrityError:
+            pass
+        except Exception as e:
+            logging.error(f"Error writing {self.name} cache: {str(e)}")
+
+    def evict(self, session):
+        """Drop expired rows and, above max_rows, the least recently used ones"""
+        removed = 0
+        if self.ttl:
+            removed += session.execute(delete(self.model).where(self.model.created_at < self._cutoff())).rowcount
+
+        if self.max_rows:
+            count = session.execute(select(func.count()).select_from(self.model)).scalar_one()
+            if count > self.max_rows:
+                excess = count - int(self.max_rows * self.EVICTION_TARGET)
+                oldest = select(self._key_column).order_by(self._used_column.asc().nulls_first()).limit(excess)
+                removed += session.execute(delete(self.model).where(self._key_column.in_(oldest))).rowcount
+
+        session.commit()
+        if removed:
+            self.count('db_evictions', removed)
+
+    def _cutoff(self):
+        return datetime.utcnow() - timedelta(seconds=self.ttl)
+
+    def count(self, counter, amount=1):
+        with self._counters_lock:
+            self._counters[counter] += amount
+
+    def stats(self):
+        """Memory-tier counters plus the table's hits, evictions and the caller's own counters"""
+        stats = self.memory.stats()
+        with self._counters_lock:
+            stats.update(self._counters)
+        return stats
+
+def cache_stats():
+    """Return the counters of every registered cache keyed by cache name"""
+    return {name: cache.stats() for name, cache in _caches.items()}
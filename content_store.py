@@ -0,0 +1,163 @@
+import os
+import time
+import click
+from sqlalchemy import select, update, insert, or_, func, text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app import app, db
+from models import Analysis, ResumeContent, JobDescriptionContent
+from text_codec import text_hash, encode_text, decode_text
+from cache import LRUCache
+
+KNOWN_CONTENT_CACHE_SIZE = 4096
+MIGRATION_BATCH_SIZE = int(os.environ.get("CONTENT_MIGRATION_BATCH_SIZE", 500))
+
+# Keeps IN (...) lists well under database bind parameter limits
+IN_CLAUSE_SIZE = 500
+
+# Hashes known to be stored already; content rows are never deleted
+_known = LRUCache('stored_content', max_entries=KNOWN_CONTENT_CACHE_SIZE)
+
+def store_content(model, content):
+    """Save content in model's content table unless it is already there; returns its hash"""
+    return store_contents(model, [content])[0]
+
+def store_contents(model, texts):
+    """
+    Save each distinct text once in model's content table (ResumeContent or
+    JobDescriptionContent) and return the hashes in the order of texts.
+    Texts stored before cost one indexed lookup, or nothing when cached.
+    """
+    hashes = [text_hash(content) for content in texts]
+    missing = {}
+    for content_hash, content in zip(hashes, texts):
+        if _known.get((model.__tablename__, content_hash)) is None:
+            missing[content_hash] = content
+    if not missing:
+        return hashes
+
+    with Session(db.engine) as session:
+        candidates = list(missing)
+        existing = set()
+        for start in range(0, len(candidates), IN_CLAUSE_SIZE):
+            existing.update(session.execute(
+                select(model.content_hash).where(model.content_hash.in_(candidates[start:start + IN_CLAUSE_SIZE]))
+            ).scalars())
+
+        rows = [content_row(content_hash, content) for content_hash, content in missing.items() if content_hash not in existing]
+        if rows:
+            try:
+                session.execute(insert(model), rows)
+                session.commit()
+            except IntegrityError:
+                # Another request stored some of them meanwhile
+                session.rollback()
+                for row in rows:
+                    try:
+                        session.execute(insert(model), [row])
+                        session.commit()
+                    except IntegrityError:
+                        session.rollback()
+
+    for content_hash in missing:
+        _known.set((model.__tablename__, content_hash), True)
+    return hashes
+
+def content_row(content_hash, plain_text):
+    content, compression = encode_text(plain_text)
+    return {
+        'content_hash': content_hash,
+        'content': content,
+        'compression': compression,
+        'size_bytes': len(plain_text.encode('utf-8'))
+    }
+
+def select_resume_texts(*columns):
+    """select() of columns plus what stored_text() needs to rebuild each Analysis's resume"""
+    return (
+        select(*columns, ResumeContent.content, ResumeContent.compression, Analysis.legacy_resume_text)
+        .select_from(Analysis)
+        .outerjoin(ResumeContent, Analysis.resume_hash == ResumeContent.content_hash)
+    )
+
+def stored_text(content, compression, legacy_text):
+    """Text of a content row, or the copy in the Analysis row if it was never migrated"""
+    if content is None:
+        return legacy_text or ''
+    return decode_text(content, compression)
+
+def migrate_content(batch_size=MIGRATION_BATCH_SIZE):
+    """
+    Move texts still stored in Analysis rows into the content tables, a batch
+    at a time. Each batch commits on its own, so the migration can be
+    interrupted and run again. Returns (rows migrated, text bytes moved).
+    """
+    migrated = 0
+    moved_bytes = 0
+    last_id = 0
+    while True:
+        rows = db.session.execute(
+            select(Analysis.id, Analysis.legacy_resume_text, Analysis.legacy_job_description)
+            .where(Analysis.id > last_id,
+                   or_(Analysis.resume_hash.is_(None), Analysis.job_description_hash.is_(None)))
+            .order_by(Analysis.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            break
+
+        resume_hashes = store_contents(ResumeContent, [row.legacy_resume_text for row in rows])
+        job_description_hashes = store_contents(JobDescriptionContent, [row.legacy_job_description for row in rows])
+        db.session.execute(update(Analysis), [
+            {
+                'id': row.id,
+                'resume_hash': resume_hash,
+                'job_description_hash': job_description_hash,
+                'legacy_resume_text': '',
+                'legacy_job_description': ''
+            }
+            for row, resume_hash, job_description_hash in zip(rows, resume_hashes, job_description_hashes)
+        ])
+        db.session.commit()
+
+        migrated += len(rows)
+        moved_bytes += sum(len(row.legacy_resume_text.encode('utf-8')) + len(row.legacy_job_description.encode('utf-8'))
+                           for row in rows)
+        last_id = rows[-1].id
+    return migrated, moved_bytes
+
+def vacuum_database():
+    """Return the space freed by the migration to the filesystem (SQLite) or the table (PostgreSQL)"""
+    with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as connection:
+        if db.engine.dialect.name == 'sqlite':
+            connection.execute(text('VACUUM'))
+        elif db.engine.dialect.name == 'postgresql':
+            connection.execute(text('VACUUM ANALYZE analysis'))
+
+def content_store_stats():
+    stats = {'analyses': db.session.scalar(select(func.count()).select_from(Analysis))}
+    for name, model in (('resumes', ResumeContent), ('job_descriptions', JobDescriptionContent)):
+        count, text_bytes, stored_bytes = db.session.execute(
+            select(func.count(), func.coalesce(func.sum(model.size_bytes), 0),
+                   func.coalesce(func.sum(func.length(model.content)), 0))
+        ).one()
+        stats[name] = {'distinct': count, 'text_bytes': int(text_bytes), 'stored_bytes': int(stored_bytes)}
+    return stats
+
+@app.cli.command('migrate-content')
+@click.option('--batch-size', default=MIGRATION_BATCH_SIZE, show_default=True, help='Analysis rows per transaction.')
+@click.option('--vacuum', is_flag=True, help='Reclaim the freed space afterwards.')
+def migrate_content_command(batch_size, vacuum):
+    """Move resume and job description texts out of analysis rows into the deduplicated content tables."""
+    started = time.monotonic()
+    migrated, moved_bytes = migrate_content(batch_size)
+    if vacuum:
+        vacuum_database()
+    elapsed = time.monotonic() - started
+
+    click.echo(f"Migrated {migrated} analyses ({moved_bytes / 1024 / 1024:.1f} MB of text) in {elapsed:.1f}s")
+    stats = content_store_stats()
+    for name in ('resumes', 'job_descriptions'):
+        content = stats[name]
+        click.echo(f"{name}: {content['distinct']} distinct, {content['text_bytes'] / 1024 / 1024:.1f} MB of text "
+                   f"stored in {content['stored_bytes'] / 1024 / 1024:.1f} MB")
@@ -0,0 +1,140 @@
+import os
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+import file_processor
+from metrics import timed
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+class ExtractionError(Exception):
+    """An upload could not be extracted; the message is safe to show to users"""
+    pass
+
+def init_worker(memory_limit_mb):
+    """Worker process initializer: cap memory"""
+    if resource is not None and memory_limit_mb:
+        limit = memory_limit_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+def sandboxed_extract(source, filename, max_pages):
+    """Worker process entry point: check limits, then run process_file"""
+    if os.path.splitext(filename)[1].lower() == '.pdf' and max_pages:
+        with file_processor.open_pdf(source) as doc:
+            if len(doc) > max_pages:
+                raise ExtractionError(f"PDF has {len(doc)} pages, the limit is {max_pages}")
+    try:
+        return file_processor.process_file(source, filename)
+    except MemoryError:
+        raise ExtractionError("File needs too much memory to extract")
+
+class ExtractionPool:
+    """
+    Runs file extraction in separate worker processes so a malformed or
+    adversarial file cannot hang or bloat the web worker.
+    - each task has a wall-clock timeout; a stuck worker is killed and the
+      pool is rebuilt
+    - workers run with an address-space limit and a page-count limit
+    - workers are recycled after tasks_per_child tasks, and a crashed pool
+      is replaced automatically
+    With workers=0 files are extracted in-process, without any limits.
+    """
+
+    def __init__(self, workers=2, timeout=30.0, memory_limit_mb=512, max_pages=200, tasks_per_child=50):
+        self.workers = workers
+        self.timeout = timeout
+        self.memory_limit_mb = memory_limit_mb
+        self.max_pages = max_pages
+        self.tasks_per_child = tasks_per_child
+        # Only as many tasks as workers are submitted, so the timeout
+        # measures extraction time rather than time spent queued
+        self._slots = threading.BoundedSemaphore(max(1, workers))
+        self._lock = threading.Lock()
+        self._executor = None
+        self._generation = 0
+        self.timeouts = 0
+        self.crashes = 0
+
+    @timed('process_file')
+    def extract(self, source, filename):
+        """Extract text from a path or bytes; raises ExtractionError on failure"""
+        if self.workers <= 0:
+            return file_processor.process_file(source, filename)
+
+        with self._slots:
+            for attempt in range(2):
+                executor, generation = self._get_executor()
+                future = executor.submit(sandboxed_extract, source, filename, self.max_pages)
+                try:
+                    return future.result(timeout=self.timeout)
+                except FutureTimeout:
+                    self.timeouts += 1
+                    self._reset(generation)
+                    raise ExtractionError(f"Extraction took longer than {self.timeout:g} seconds")
+                except BrokenProcessPool:
+                    # Either this file crashed its worker, or the pool was
+                    # torn down under it because another task timed out
+                    replaced = generation != self._generation
+                    self._reset(generation)
+                    if replaced and attempt == 0:
+                        continue
+                    self.crashes += 1
+                    raise ExtractionError("File crashed the extraction worker")
+                except ExtractionError:
+                    raise
+                except MemoryError:
+                    raise ExtractionError("File needs too much memory to extract")
+                except Exception as e:
+                    logging.error(f"Error extracting {filename}: {str(e)}")
+                    raise ExtractionError("Could not process the uploaded file")
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=init_worker,
+                    initargs=(self.memory_limit_mb,),
+                    max_tasks_per_child=self.tasks_per_child
+                )
+                self._generation += 1
+            return self._executor, self._generation
+
+    def _reset(self, generation):
+        """Kill and drop the pool, unless another thread already replaced it"""
+        with self._lock:
+            if self._executor is None or generation != self._generation:
+                return
+            executor = self._executor
+            self._executor = None
+            self._generation += 1
+
+        # ProcessPoolExecutor cannot cancel a running task; kill its workers
+        for process in list((executor._processes or {}).values()):
+            process.kill()
+        executor.shutdown(wait=False, cancel_futures=True)
+        logging.warning("Extraction worker pool recycled")
+
+    def stats(self):
+        return {
+            'workers': self.workers,
+            'timeout': self.timeout,
+            'memory_limit_mb': self.memory_limit_mb,
+            'max_pages': self.max_pages,
+            'timeouts': self.timeouts,
+            'crashes': self.crashes
+        }
+
+extraction_pool = ExtractionPool(
+    workers=int(os.environ.get("EXTRACTION_WORKERS", 2)),
+    timeout=float(os.environ.get("EXTRACTION_TIMEOUT", 30.0)),
+    memory_limit_mb=int(os.environ.get("EXTRACTION_MEMORY_LIMIT_MB", 512)),
+    max_pages=int(os.environ.get("EXTRACTION_MAX_PAGES", 200)),
+    tasks_per_child=int(os.environ.get("EXTRACTION_TASKS_PER_CHILD", 50))
+)
@@ -1,66 +1,265 @@
 import os
+import re
+import time
+import shutil
 import logging
+import tempfile
+import zipfile
+from io import BytesIO
+from contextlib import contextmanager
 import fitz  # PyMuPDF
-from docx import Document
+from lxml import etree
+from metrics import timed_stage
 
-def process_file(filepath):
+# Bump whenever extraction output changes so cached texts are not reused
+EXTRACTOR_VERSION = 2
+
+# Extraction caps; 0 means no limit
+PDF_MAX_PAGES = int(os.environ.get("PDF_MAX_PAGES", 0))
+PDF_MAX_CHARS = int(os.environ.get("PDF_MAX_CHARS", 0))
+
+# PDF pages taking longer than this to extract are logged; 0 turns it off
+PDF_SLOW_PAGE_SECONDS = float(os.environ.get("PDF_SLOW_PAGE_SECONDS", 1.0))
+
+# WordprocessingML element names used by the DOCX extractor
+W_NS = 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
+W_P = f'{{{W_NS}}}p'
+W_T = f'{{{W_NS}}}t'
+W_TAB = f'{{{W_NS}}}tab'
+W_BR = f'{{{W_NS}}}br'
+W_CR = f'{{{W_NS}}}cr'
+W_TC = f'{{{W_NS}}}tc'
+W_TR = f'{{{W_NS}}}tr'
+MC_FALLBACK = '{http://schemas.openxmlformats.org/markup-compatibility/2006}Fallback'
+DOCX_CONTAINERS = {W_P: 'paragraph', W_TC: 'cell', W_TR: 'row'}
+DOCX_PART_PATTERN = re.compile(r'^word/(header|footer)\d*\.xml$')
+
+# Larger uploads are spooled to disk instead of being held in memory
+UPLOAD_SPOOL_THRESHOLD = int(os.environ.get("UPLOAD_SPOOL_THRESHOLD", 8 * 1024 * 1024))
+
+def process_file(source, filename=None):
     """
     Extract text from PDF or DOCX files
+    source is a file path, the file's bytes, or a binary file-like object;
+    filename gives the file type when source is not a path.
     Returns extracted text content
     """
+    name = filename or (source if isinstance(source, str) else getattr(source, 'name', ''))
     try:
-        file_extension = os.path.splitext(filepath)[1].lower()
+        file_extension = os.path.splitext(name)[1].lower()
+        
+        # File-like objects are read into memory; paths and bytes are used as they are
+        if hasattr(source, 'read'):
+            source = source.read()
         
         if file_extension == '.pdf':
-            return extract_pdf_text(filepath)
+            page_timings = []
+            text = extract_pdf_text(source, page_timings=page_timings)
+            log_slow_pages(name, page_timings)
+            return text
         elif file_extension == '.docx':
-            return extract_docx_text(filepath)
+            return extract_docx_text(source)
         else:
             raise ValueError(f"Unsupported file type: {file_extension}")
             
     except Exception as e:
-        logging.error(f"Error processing file {filepath}: {str(e)}")
+        logging.error(f"Error processing file {name}: {str(e)}")
         raise
 
-def extract_pdf_text(filepath):
-    """Extract text from PDF using PyMuPDF"""
+def log_slow_pages(name, page_timings):
+    """
+    Warn about PDF pages slower than PDF_SLOW_PAGE_SECONDS. Extraction
+    usually runs in a sandbox worker process, so this goes to the log rather
+    than to the web process's metrics.
+    """
+    if not PDF_SLOW_PAGE_SECONDS:
+        return
+    slow = [(page_num, seconds) for page_num, seconds in page_timings if seconds >= PDF_SLOW_PAGE_SECONDS]
+    for page_num, seconds in slow[:5]:
+        logging.warning(f"Slow PDF page in {name}: page {page_num + 1} of {len(page_timings)} took {seconds:.2f}s")
+    if len(slow) > 5:
+        logging.warning(f"Slow PDF pages in {name}: {len(slow) - 5} more pages over {PDF_SLOW_PAGE_SECONDS:g}s")
+
+@contextmanager
+def upload_source(stream, filename, spool_dir=None):
+    """
+    Turn an uploaded file stream into something process_file accepts.
+    Uploads up to UPLOAD_SPOOL_THRESHOLD bytes are read into memory; larger
+    ones are spooled to a temporary file that is removed afterwards.
+    """
+    if stream_size(stream) <= UPLOAD_SPOOL_THRESHOLD:
+        with timed_stage('upload_save'):
+            data = stream.read()
+        yield data
+        return
+    
+    extension = os.path.splitext(filename)[1].lower()
+    temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=extension, dir=spool_dir)
+    try:
+        with timed_stage('upload_save'), temp_file:
+            shutil.copyfileobj(stream, temp_file)
+        yield temp_file.name
+    finally:
+        if os.path.exists(temp_file.name):
+            os.remove(temp_file.name)
+
+def stream_size(stream):
+    """Size in bytes of a seekable stream, leaving it positioned at the start"""
+    stream.seek(0, os.SEEK_END)
+    size = stream.tell()
+    stream.seek(0)
+    return size
+
+def open_pdf(source):
+    """Open a PDF from a path or from bytes already in memory"""
+    if isinstance(source, str):
+        return fitz.open(source)
+    return fitz.open(stream=source, filetype='pdf')
+
+def extract_pdf_text(source, max_pages=None, max_chars=None, page_timings=None):
+    """
+    Extract text from PDF using PyMuPDF
+    Stops early after max_pages pages or max_chars characters (defaults from
+    PDF_MAX_PAGES / PDF_MAX_CHARS, 0 meaning no limit). When page_timings is
+    a list, (page number, seconds) is appended to it for every page.
+    """
     try:
-        doc = fitz.open(filepath)
-        text = ""
+        max_pages = PDF_MAX_PAGES if max_pages is None else max_pages
+        max_chars = PDF_MAX_CHARS if max_chars is None else max_chars
+        
+        pages = []
+        total_chars = 0
+        started = time.perf_counter()
+        
+        for page_num, page_text, seconds in iter_pdf_pages(source, max_pages):
+            pages.append(page_text)
+            total_chars += len(page_text)
+            if page_timings is not None:
+                page_timings.append((page_num, seconds))
+            if max_chars and total_chars >= max_chars:
+                break
         
-        for page_num in range(len(doc)):
-            page = doc.load_page(page_num)
-            text += page.get_text()
+        text = "".join(pages)
+        if max_chars:
+            text = text[:max_chars]
         
-        doc.close()
+        logging.debug(f"Extracted {len(pages)} PDF pages in {time.perf_counter() - started:.3f}s")
         return text.strip()
         
     except Exception as e:
         logging.error(f"Error extracting PDF text: {str(e)}")
         raise
 
-def extract_docx_text(filepath):
-    """Extract text from DOCX using python-docx"""
+def iter_pdf_pages(source, max_pages=0):
+    """Yield (page number, text, seconds) for each page in order"""
+    with open_pdf(source) as doc:
+        page_count = min(len(doc), max_pages) if max_pages else len(doc)
+        for page_num in range(page_count):
+            started = time.perf_counter()
+            page_text = doc.load_page(page_num).get_text()
+            yield page_num, page_text, time.perf_counter() - started
+
+def extract_docx_text(source):
+    """
+    Extract text from DOCX by streaming the WordprocessingML parts
+    Covers headers, the body (paragraphs, tables, nested tables and text
+    boxes in document order), footnotes, endnotes and footers. Each table
+    cell is emitted once however many grid columns it spans, and vertically
+    merged continuation cells are skipped.
+    """
     try:
-        doc = Document(filepath)
-        text = ""
-        
-        for paragraph in doc.paragraphs:
-            text += paragraph.text + "\n"
-        
-        # Extract text from tables
-        for table in doc.tables:
-            for row in table.rows:
-                for cell in row.cells:
-                    text += cell.text + " "
-                text += "\n"
+        with zipfile.ZipFile(source if isinstance(source, str) else BytesIO(source)) as archive:
+            names = set(archive.namelist())
+            lines = []
+            
+            for part in docx_text_parts(names):
+                with archive.open(part) as stream:
+                    extract_docx_part(stream, lines)
         
-        return text.strip()
+        return "".join(lines).strip()
         
     except Exception as e:
         logging.error(f"Error extracting DOCX text: {str(e)}")
         raise
 
+def docx_text_parts(names):
+    """Document parts holding text, in reading order"""
+    def numbered(prefix):
+        return sorted((name for name in names if DOCX_PART_PATTERN.match(name) and name.startswith(prefix)),
+                      key=lambda name: int(re.sub(r'\D', '', name) or 0))
+    
+    parts = numbered('word/header')
+    parts.append('word/document.xml')
+    parts += [name for name in ('word/footnotes.xml', 'word/endnotes.xml') if name in names]
+    parts += numbered('word/footer')
+    return [part for part in parts if part in names]
+
+def extract_docx_part(stream, lines):
+    """
+    One iterparse pass over a part, appending paragraph lines ("text\n")
+    and table row lines ("cell cell \n") to lines
+    """
+    # Open containers as (kind, buffer): paragraphs collect text runs, cells
+    # collect their paragraphs and nested rows, rows collect their cells
+    stack = [('part', lines)]
+    skip_depth = 0
+    
+    for event, elem in etree.iterparse(stream, events=('start', 'end')):
+        tag = elem.tag
+        
+        # Fallback copies of text boxes duplicate the mc:Choice content
+        if tag == MC_FALLBACK:
+            skip_depth += 1 if event == 'start' else -1
+            if event == 'end':
+                elem.clear()
+            continue
+        if skip_depth:
+            continue
+        
+        if event == 'start':
+            kind = DOCX_CONTAINERS.get(tag)
+            if kind:
+                stack.append((kind, []))
+            continue
+        
+        if tag == W_T:
+            stack[-1][1].append(elem.text or '')
+        elif tag == W_TAB:
+            stack[-1][1].append('\t')
+        elif tag == W_BR or tag == W_CR:
+            stack[-1][1].append('\n')
+        elif tag == W_P:
+            text = "".join(stack.pop()[1])
+            kind, parent = enclosing_container(stack)
+            # Inside a cell paragraphs are joined with newlines, like cell.text
+            parent.append(text if kind == 'cell' else text + "\n")
+            elem.clear()
+        elif tag == W_TC:
+            cell = stack.pop()[1]
+            if not is_merged_continuation(elem):
+                stack[-1][1].append("\n".join(cell))
+            elem.clear()
+        elif tag == W_TR:
+            row = "".join(cell + " " for cell in stack.pop()[1])
+            kind, parent = enclosing_container(stack)
+            # Rows of a nested table become part of the enclosing cell
+            parent.append(row if kind == 'cell' else row + "\n")
+            elem.clear()
+
+def enclosing_container(stack):
+    """
+    Innermost open container that is not a paragraph; text boxes sit inside
+    a paragraph but their content is emitted on lines of its own
+    """
+    for kind, buffer in reversed(stack):
+        if kind != 'paragraph':
+            return kind, buffer
+
+def is_merged_continuation(tc):
+    """Whether a w:tc continues a vertical merge from the cell above"""
+    vmerge = tc.find(f'{{{W_NS}}}tcPr/{{{W_NS}}}vMerge')
+    return vmerge is not None and vmerge.get(f'{{{W_NS}}}val', 'continue') == 'continue'
+
 def validate_file_content(text):
     """Validate that extracted text looks like a resume"""
     if not text or len(text.strip()) < 50:
@@ -0,0 +1,80 @@
+import re
+import json
+import hashlib
+from models import JobProfileRecord
+from analyzer import keyword_frequencies, KEYWORD_EXTRACTOR_VERSION, STOP_WORDS
+from skills import get_skill_matcher
+from cache import TieredCache
+
+JOB_PROFILE_CACHE_SIZE = 256
+
+class JobProfile:
+    """
+    Keyword profile of a job description: the keyword list used for matching
+    plus a relative weight (frequency / highest frequency) for each keyword
+    """
+
+    __slots__ = ('content_hash', 'keywords', 'weights')
+
+    def __init__(self, content_hash, keywords, weights):
+        self.content_hash = content_hash
+        self.keywords = keywords
+        self.weights = weights
+
+    def __repr__(self):
+        return f'<JobProfile {self.content_hash[:12]}: {len(self.keywords)} keywords>'
+
+def normalize_job_description(job_description):
+    """Lowercase and collapse whitespace; neither changes the extracted keywords"""
+    return re.sub(r'\s+', ' ', job_description.lower()).strip()
+
+def profile_key(job_description):
+    """
+    Cache key of a job profile: the normalized job description plus the
+    keyword extractor and skills dictionary versions, so changing either
+    recompiles profiles. A worker without the stopwords corpus extracts
+    other keywords, so its profiles are kept apart.
+    """
+    extractor = f"{KEYWORD_EXTRACTOR_VERSION}{'' if STOP_WORDS else '-nostopwords'}"
+    key = f"{extractor}\n{get_skill_matcher().version}\n{normalize_job_description(job_description)}"
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+def profile_from_record(record):
+    return JobProfile(record.content_hash, json.loads(record.keywords), json.loads(record.weights))
+
+def profile_record(content_hash, profile):
+    return JobProfileRecord(content_hash=content_hash, keywords=json.dumps(profile.keywords),
+                            weights=json.dumps(profile.weights))
+
+_profiles = TieredCache('job_profiles', JobProfileRecord, profile_from_record, profile_record,
+                        max_entries=JOB_PROFILE_CACHE_SIZE, counters=('compiled',))
+
+def get_job_profile(job_description):
+    """
+    Return the compiled keyword profile for a job description.
+    Looks in the in-process LRU first, then in the shared JobProfileRecord
+    table (when running inside an app context), and only tokenizes the
+    job description when neither has it.
+    """
+    content_hash = profile_key(job_description)
+
+    profile = _profiles.get(content_hash)
+    if profile is None:
+        profile = compile_job_profile(job_description, content_hash)
+        _profiles.count('compiled')
+        _profiles.set(content_hash, profile)
+    return profile
+
+def compile_job_profile(job_description, content_hash=None):
+    """Tokenize a job description into a JobProfile"""
+    if content_hash is None:
+        content_hash = profile_key(job_description)
+
+    frequencies = keyword_frequencies(job_description)
+    top = max(frequencies.values(), default=1)
+    weights = {keyword: round(count / top, 4) for keyword, count in frequencies.items()}
+    return JobProfile(content_hash, list(frequencies.keys()), weights)
+
+def job_profile_stats():
+    """Memory-tier counters plus database hits and compilations"""
+    return _profiles.stats()
@@ -0,0 +1,399 @@
+import os
+import uuid
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from flask import url_for
+from sqlalchemy import select, update, delete
+from app import app, db
+from models import Analysis, AnalysisJob, ResumeContent, JobDescriptionContent
+from text_cache import extract_text_cached
+from extraction_pool import ExtractionError
+from analyzer import analyze_resume
+from prepared_document import PreparedDocument
+from ai_suggestions import get_ai_suggestions, get_fallback_suggestions
+from job_profile import get_job_profile
+from scoring import score_keywords, corpus_stats, CORPUS_WARM_ROWS
+from content_store import store_content
+from search_index import index_new_analyses, INDEX_BATCH_SIZE
+from metrics import timed_stage
+from report_export import write_merged_report, export_path, remove_file
+
+# Rough share of the total work done once each stage starts. Results are
+# viewable from the 'suggestions' stage on, so that is reported as complete.
+STAGE_PROGRESS = {
+    'queued': 5,
+    'extracting': 20,
+    'scoring': 60,
+    'saving': 90,
+    'suggestions': 100,
+    'exporting': 50,
+    'done': 100
+}
+
+MAX_ATTEMPTS = 3
+
+GENERIC_ERROR = 'An error occurred during analysis. Please try again.'
+EXPORT_ERROR = 'An error occurred while generating the reports. Please try again.'
+
+class JobFailed(Exception):
+    """Job cannot succeed on retry (e.g. the upload has no readable text)"""
+    pass
+
+class JobQueue:
+    """
+    Database-backed analysis queue.
+    Jobs are rows in the AnalysisJob table, so they survive a restart and
+    any web process can pick them up. Each process runs one dispatcher
+    thread that claims queued rows and hands them to a small worker pool;
+    no external broker is needed. A separate maintenance thread updates the
+    search index and corpus statistics while the queue is empty, so a newly
+    submitted job never waits for that work.
+    """
+
+    def __init__(self, app, workers=2, poll_interval=2.0, stale_after=600, retention=7 * 24 * 3600):
+        self.app = app
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.stale_after = stale_after
+        self.retention = retention
+        self._slots = threading.BoundedSemaphore(workers)
+        self._wakeup = threading.Event()
+        self._idle = threading.Event()
+        self._start_lock = threading.Lock()
+        self._started = False
+        self._executor = None
+        self._last_stale_check = 0.0
+
+    def start(self):
+        """Start the dispatcher and workers for this process (idempotent)"""
+        if self._started:
+            return
+        with self._start_lock:
+            if self._started:
+                return
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='analysis-job')
+            dispatcher = threading.Thread(target=self._dispatch, name='analysis-job-dispatcher', daemon=True)
+            dispatcher.start()
+            maintenance = threading.Thread(target=self._maintain, name='analysis-job-maintenance', daemon=True)
+            maintenance.start()
+            self._started = True
+
+    def submit(self, filename, upload, job_description, scoring_engine='keyword'):
+        """Persist a new job and wake the dispatcher. Returns the job id."""
+        job = AnalysisJob()
+        job.id = uuid.uuid4().hex
+        job.status = 'queued'
+        job.stage = 'queued'
+        job.filename = filename
+        job.upload = upload
+        job.job_description = job_description
+        job.scoring_engine = scoring_engine
+
+        db.session.add(job)
+        db.session.commit()
+
+        self.start()
+        self._wakeup.set()
+        return job.id
+
+    def submit_suggestions(self, analysis):
+        """Queue AI suggestion generation for an already scored Analysis"""
+        job = AnalysisJob()
+        job.id = uuid.uuid4().hex
+        job.status = 'queued'
+        job.stage = 'suggestions'
+        job.filename = analysis.filename
+        job.analysis_id = analysis.id
+
+        db.session.add(job)
+        db.session.commit()
+
+        self.start()
+        self._wakeup.set()
+        return job.id
+
+    def submit_export(self, analysis_ids):
+        """Queue a merged PDF report of analysis_ids, too large to build within a request"""
+        job = AnalysisJob()
+        job.id = uuid.uuid4().hex
+        job.status = 'queued'
+        job.stage = 'queued'
+        job.filename = 'resume_analysis_reports.pdf'
+        job.export_ids = ','.join(str(analysis_id) for analysis_id in analysis_ids)
+
+        db.session.add(job)
+        db.session.commit()
+
+        self.start()
+        self._wakeup.set()
+        return job.id
+
+    def _dispatch(self):
+        while True:
+            self._slots.acquire()
+            self._wakeup.clear()
+            job_id = None
+            try:
+                with self.app.app_context():
+                    self._requeue_stale()
+                    job_id = self._claim_next()
+            except Exception as e:
+                logging.error(f"Error claiming analysis job: {str(e)}")
+
+            if job_id is None:
+                self._slots.release()
+                self._idle.set()
+                self._wakeup.wait(self.poll_interval)
+                continue
+
+            self._idle.clear()
+            try:
+                self._executor.submit(self._run, job_id)
+            except RuntimeError:
+                # The interpreter is exiting; the claimed job is requeued as stale on the next start
+                self._slots.release()
+                return
+
+    def _maintain(self):
+        """Maintenance loop: one pass per poll interval, only while the dispatcher finds no queued job"""
+        while True:
+            self._idle.wait()
+            self._update_search_index()
+            self._warm_corpus_stats()
+            time.sleep(self.poll_interval)
+
+    def _run(self, job_id):
+        try:
+            with self.app.app_context():
+                run_job(job_id)
+        except Exception as e:
+            logging.error(f"Error running analysis job {job_id}: {str(e)}")
+        finally:
+            self._slots.release()
+
+    def _update_search_index(self):
+        """While idle, index analyses saved since the last pass"""
+        try:
+            with self.app.app_context():
+                index_new_analyses(max_rows=INDEX_BATCH_SIZE)
+        except Exception as e:
+            logging.error(f"Error updating search index: {str(e)}")
+
+    def _warm_corpus_stats(self):
+        """While idle, count new analyses into the tfidf/bm25 corpus statistics"""
+        if not corpus_stats.wanted:
+            return
+        try:
+            with self.app.app_context():
+                corpus_stats.refresh(max_rows=CORPUS_WARM_ROWS)
+        except Exception as e:
+            logging.error(f"Error warming scoring corpus: {str(e)}")
+
+    def _claim_next(self):
+        """Atomically move the oldest queued job to running; None if there is none"""
+        candidates = db.session.execute(
+            select(AnalysisJob.id)
+            .where(AnalysisJob.status == 'queued')
+            .order_by(AnalysisJob.created_at)
+            .limit(5)
+        ).scalars().all()
+
+        for job_id in candidates:
+            # Another process may claim the same row; only one UPDATE matches
+            claimed = db.session.execute(
+                update(AnalysisJob)
+                .where(AnalysisJob.id == job_id, AnalysisJob.status == 'queued')
+                .values(status='running', attempts=AnalysisJob.attempts + 1, updated_at=datetime.utcnow())
+            )
+            db.session.commit()
+            if claimed.rowcount == 1:
+                return job_id
+
+        return None
+
+    def _requeue_stale(self):
+        """
+        Put back jobs whose worker died mid-run (e.g. a restart), unless they
+        are out of attempts: a job that kills its process every time would
+        otherwise be retried forever. Finished jobs older than the retention
+        period are deleted in the same pass.
+        """
+        now = time.monotonic()
+        if now - self._last_stale_check < self.stale_after / 10:
+            return
+        self._last_stale_check = now
+
+        cutoff = datetime.utcnow() - timedelta(seconds=self.stale_after)
+        stale = (AnalysisJob.status == 'running', AnalysisJob.updated_at < cutoff)
+        for job in db.session.execute(
+            select(AnalysisJob).where(*stale, AnalysisJob.attempts >= MAX_ATTEMPTS)
+        ).scalars():
+            logging.error(f"Analysis job {job.id} stopped responding {job.attempts} times, giving up")
+            give_up(job)
+        db.session.execute(
+            update(AnalysisJob)
+            .where(*stale, AnalysisJob.attempts < MAX_ATTEMPTS)
+            .values(status='queued', updated_at=datetime.utcnow())
+        )
+
+        expired = (AnalysisJob.status.in_(('completed', 'failed')),
+                   AnalysisJob.updated_at < datetime.utcnow() - timedelta(seconds=self.retention))
+        for job_id in db.session.execute(
+            select(AnalysisJob.id).where(*expired, AnalysisJob.export_ids.is_not(None))
+        ).scalars():
+            remove_file(export_path(job_id))
+        db.session.execute(delete(AnalysisJob).where(*expired))
+        db.session.commit()
+
+def run_job(job_id):
+    """
+    Run every remaining pipeline stage of one claimed job.
+    The Analysis row is saved as soon as scoring finishes so results can be
+    shown right away; AI suggestions are added to it afterwards.
+    """
+    job = db.session.get(AnalysisJob, job_id)
+    if job is None:
+        return
+
+    try:
+        if job.export_ids is not None:
+            run_export(job)
+            return
+
+        if job.analysis_id is None:
+            # Extraction is skipped when a previous attempt already stored the text
+            if job.resume_text is None:
+                set_stage(job, 'extracting')
+                resume_text = extract_upload(job.filename, job.upload)
+                if not resume_text.strip():
+                    raise JobFailed('Could not extract text from the uploaded file')
+                job.resume_text = resume_text
+                job.upload = None
+
+            set_stage(job, 'scoring')
+            job_profile = get_job_profile(job.job_description)
+            document = PreparedDocument(job.resume_text)
+            keyword_analysis = score_keywords([document], job_profile, job.scoring_engine or 'keyword')[0]
+            analysis_result = analyze_resume(document, job.job_description, job_profile.keywords, keyword_analysis)
+
+            set_stage(job, 'saving')
+            analysis = Analysis.from_result(job.filename,
+                                            store_content(JobDescriptionContent, job.job_description),
+                                            store_content(ResumeContent, job.resume_text),
+                                            analysis_result, None)
+            db.session.add(analysis)
+            db.session.flush()
+
+            job.analysis_id = analysis.id
+            job.resume_text = None
+            job.job_description = None
+            with timed_stage('db_commit'):
+                set_stage(job, 'suggestions')
+
+        analysis = db.session.get(Analysis, job.analysis_id)
+        if analysis.ai_suggestions is None:
+            if job.stage != 'suggestions':
+                set_stage(job, 'suggestions')
+            ai_suggestions = get_ai_suggestions(analysis.resume_text, analysis.job_description)
+            analysis.ai_suggestions = ai_suggestions
+
+        job.status = 'completed'
+        set_stage(job, 'done')
+
+    except Exception as e:
+        db.session.rollback()
+        logging.error(f"Analysis job {job_id} failed: {str(e)}")
+
+        job = db.session.get(AnalysisJob, job_id)
+        if isinstance(e, JobFailed) or job.attempts >= MAX_ATTEMPTS:
+            give_up(job, str(e) if isinstance(e, JobFailed) else None)
+        else:
+            job.status = 'queued'
+            job.updated_at = datetime.utcnow()
+        db.session.commit()
+
+def run_export(job):
+    """Build the merged report of an export job; the job's row is touched at every save so it is not taken as stale"""
+    set_stage(job, 'exporting')
+    analysis_ids = [int(analysis_id) for analysis_id in job.export_ids.split(',')]
+    path = export_path(job.id)
+    temp_path = f'{path}.tmp'
+    try:
+        write_merged_report(analysis_ids, temp_path, progress=lambda: set_stage(job, 'exporting'))
+        os.replace(temp_path, path)
+    finally:
+        remove_file(temp_path)
+
+    job.status = 'completed'
+    set_stage(job, 'done')
+
+def give_up(job, error=None):
+    """
+    Stop retrying a job. Once its Analysis is saved the scores are shown
+    already and only the suggestions are missing, so the analysis itself
+    did not fail: it completes with the fallback suggestions.
+    """
+    if job.analysis_id is not None:
+        job.status = 'completed'
+        job.stage = 'done'
+        fill_fallback_suggestions(job.analysis_id)
+    else:
+        job.status = 'failed'
+        job.error = error or (EXPORT_ERROR if job.export_ids is not None else GENERIC_ERROR)
+    job.upload = None
+    job.updated_at = datetime.utcnow()
+
+def fill_fallback_suggestions(analysis_id):
+    """Give up on AI suggestions for an analysis so its results page stops waiting"""
+    if analysis_id is None:
+        return
+    analysis = db.session.get(Analysis, analysis_id)
+    if analysis is not None and analysis.ai_suggestions is None:
+        analysis.ai_suggestions = get_fallback_suggestions()
+
+def set_stage(job, stage):
+    """Record the stage a job has reached so status polls can report it"""
+    job.stage = stage
+    job.updated_at = datetime.utcnow()
+    db.session.commit()
+
+def extract_upload(filename, upload):
+    """Extract resume text from the raw bytes of an uploaded file"""
+    try:
+        return extract_text_cached(upload or b'', filename)
+    except ExtractionError as e:
+        raise JobFailed(str(e))
+    except Exception:
+        raise JobFailed('Could not process the uploaded file')
+
+def describe_job(job):
+    """JSON-ready status of a job for the polling endpoint"""
+    status = {
+        'job_id': job.id,
+        'status': job.status,
+        'stage': job.stage,
+        'progress': STAGE_PROGRESS.get(job.stage, 0),
+        'error': job.error
+    }
+    # Scores are viewable as soon as the Analysis row exists
+    if job.analysis_id:
+        status['results_url'] = url_for('results', analysis_id=job.analysis_id)
+    if job.export_ids is not None and job.status == 'completed':
+        status['download_url'] = url_for('download_export', job_id=job.id)
+    return status
+
+job_queue = JobQueue(
+    app,
+    workers=app.config['JOB_WORKERS'],
+    poll_interval=app.config['JOB_POLL_INTERVAL'],
+    stale_after=app.config['JOB_STALE_AFTER'],
+    retention=app.config['JOB_RETENTION']
+)
+
+@app.before_request
+def start_job_queue():
+    # Starting on the first request also picks up jobs left over from a restart
+    job_queue.start()
@@ -0,0 +1,188 @@
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+class LLMUnavailable(Exception):
+    """The gateway did not get an answer in time; callers should fall back"""
+
+    def __init__(self, reason):
+        super().__init__(f"LLM call skipped: {reason}")
+        self.reason = reason
+
+class CircuitBreaker:
+    """
+    Stops calling a failing upstream.
+    Opens after failure_threshold consecutive failures, lets a single trial
+    call through once reset_timeout has passed, and closes again when that
+    trial succeeds.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = 'closed'
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == 'closed':
+                return True
+            if self.state == 'open' and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = 'half_open'
+            if self.state == 'half_open' and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = 'closed'
+            self.failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == 'half_open' or self.failures >= self.failure_threshold:
+                if self.state != 'open':
+                    logging.warning(f"LLM circuit breaker opened after {self.failures} failures")
+                self.state = 'open'
+                self.opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+    def release(self):
+        """Give back a trial slot that was granted but never used"""
+        with self._lock:
+            self._trial_in_flight = False
+
+class LatencyStats:
+    """Running count, total and maximum of a latency in seconds"""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds):
+        with self._lock:
+            self.count += 1
+            self.total += seconds
+            self.max = max(self.max, seconds)
+
+    def stats(self):
+        return {
+            'count': self.count,
+            'avg_ms': round(self.total / self.count * 1000, 1) if self.count else 0.0,
+            'max_ms': round(self.max * 1000, 1)
+        }
+
+class LLMGateway:
+    """
+    Managed access to a slow upstream model.
+    - at most max_concurrent calls are in flight per process
+    - every call has a hard budget of `timeout` seconds, queue wait included
+    - the circuit breaker skips calls entirely while the upstream is failing
+    Whenever no answer arrives, LLMUnavailable is raised so the caller can
+    return its fallback.
+    """
+
+    def __init__(self, max_concurrent=4, timeout=20.0, queue_timeout=5.0,
+                 failure_threshold=5, reset_timeout=30.0):
+        self.max_concurrent = max_concurrent
+        self.timeout = timeout
+        self.queue_timeout = queue_timeout
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self.queue_wait = LatencyStats()
+        self.call_latency = LatencyStats()
+        self.requests = 0
+        self.successes = 0
+        self.failures = 0
+        self.fallbacks = {}
+        self.in_flight = 0
+        self._slots = threading.BoundedSemaphore(max_concurrent)
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrent, thread_name_prefix='llm-call')
+        self._lock = threading.Lock()
+
+    def call(self, request):
+        """
+        Run request(timeout) under the gateway limits and return its result.
+        request receives the seconds left in the budget, to pass on as the
+        client's own timeout.
+        """
+        with self._lock:
+            self.requests += 1
+
+        if not self.breaker.allow():
+            raise self._fallback('circuit_open')
+
+        started = time.monotonic()
+        deadline = started + self.timeout
+        acquired = self._slots.acquire(timeout=min(self.queue_timeout, self.timeout))
+        self.queue_wait.observe(time.monotonic() - started)
+        if not acquired:
+            self.breaker.release()
+            raise self._fallback('queue_full')
+
+        remaining = max(0.0, deadline - time.monotonic())
+        future = self._executor.submit(self._invoke, request, remaining)
+        try:
+            result = future.result(timeout=remaining)
+        except FutureTimeout:
+            # The call keeps its slot until it really returns, so the
+            # in-flight bound holds even for abandoned calls
+            self._record_failure()
+            raise self._fallback('timeout')
+        except Exception:
+            self._record_failure()
+            if time.monotonic() >= deadline:
+                # The client's own timeout, given the same deadline, fired first
+                raise self._fallback('timeout')
+            self._fallback('error')
+            raise
+
+        self.breaker.record_success()
+        with self._lock:
+            self.successes += 1
+        return result
+
+    def _invoke(self, request, timeout):
+        with self._lock:
+            self.in_flight += 1
+        started = time.monotonic()
+        try:
+            return request(timeout)
+        finally:
+            self.call_latency.observe(time.monotonic() - started)
+            with self._lock:
+                self.in_flight -= 1
+            self._slots.release()
+
+    def _record_failure(self):
+        self.breaker.record_failure()
+        with self._lock:
+            self.failures += 1
+
+    def _fallback(self, reason):
+        with self._lock:
+            self.fallbacks[reason] = self.fallbacks.get(reason, 0) + 1
+        return LLMUnavailable(reason)
+
+    def stats(self):
+        fallbacks = sum(self.fallbacks.values())
+        return {
+            'circuit_state': self.breaker.state,
+            'max_concurrent': self.max_concurrent,
+            'in_flight': self.in_flight,
+            'requests': self.requests,
+            'successes': self.successes,
+            'failures': self.failures,
+            'fallbacks': dict(self.fallbacks),
+            'fallback_rate': round(fallbacks / self.requests, 4) if self.requests else 0.0,
+            'queue_wait': self.queue_wait.stats(),
+            'call_latency': self.call_latency.stats()
+        }
@@ -0,0 +1,216 @@
+import time
+import bisect
+import logging
+import functools
+import threading
+
+# Upper bounds in seconds of the latency histogram buckets, from 1ms to 2 minutes
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+# Latest observations kept per label set for the p50/p95/p99 gauges
+QUANTILE_WINDOW = 1024
+QUANTILES = (0.5, 0.95, 0.99)
+
+PREFIX = 'ats_'
+
+# Every metric registers itself here so /metrics can render it. Each
+# process (gunicorn worker, pool worker) keeps its own metrics
+_metrics = {}
+# Functions returning samples of counters kept elsewhere, see register_collector
+_collectors = []
+
+class Counter:
+    """Monotonic count per combination of label values"""
+
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = PREFIX + name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+        _metrics[self.name] = self
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def value(self, *label_values):
+        return self._values.get(label_values, 0)
+
+    def samples(self):
+        with self._lock:
+            values = list(self._values.items())
+        for label_values, value in values:
+            yield self.name, dict(zip(self.labels, label_values)), value
+
+class HistogramSeries:
+    """Bucket counts, sum and count of one label set, plus a ring of the latest observations"""
+
+    __slots__ = ('buckets', 'sum', 'count', 'window')
+
+    def __init__(self, bucket_count):
+        self.buckets = [0] * (bucket_count + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.window = []
+
+class Histogram:
+    """
+    Latency histogram per combination of label values, exposed with
+    cumulative Prometheus buckets (for histogram_quantile across processes)
+    and, under name_quantile, the p50/p95/p99 of the latest
+    QUANTILE_WINDOW observations of this process
+    """
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = PREFIX + name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.bucket_bounds = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+        _metrics[self.name] = self
+
+    def observe(self, value, *label_values):
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = HistogramSeries(len(self.bucket_bounds))
+            series.buckets[bisect.bisect_left(self.bucket_bounds, value)] += 1
+            series.sum += value
+            if len(series.window) < QUANTILE_WINDOW:
+                series.window.append(value)
+            else:
+                series.window[series.count % QUANTILE_WINDOW] = value
+            series.count += 1
+
+    def quantiles(self, *label_values):
+        """{quantile: value} over the latest observations of a label set; empty before the first"""
+        with self._lock:
+            series = self._series.get(label_values)
+            window = sorted(series.window) if series is not None else []
+        if not window:
+            return {}
+        return {q: window[min(len(window) - 1, int(q * len(window)))] for q in QUANTILES}
+
+    def stats(self):
+        """count, total and p50/p95/p99 in milliseconds per label set, for the JSON stats endpoints"""
+        with self._lock:
+            series = {label_values: (s.count, s.sum) for label_values, s in self._series.items()}
+        return {
+            ','.join(label_values): dict(
+                count=count,
+                total_ms=round(total * 1000, 1),
+                **{f"p{round(q * 100)}_ms": round(value * 1000, 1)
+                   for q, value in self.quantiles(*label_values).items()}
+            )
+            for label_values, (count, total) in series.items()
+        }
+
+    def samples(self):
+        with self._lock:
+            series = [(label_values, list(s.buckets), s.sum, s.count) for label_values, s in self._series.items()]
+        for label_values, buckets, total, count in series:
+            labels = dict(zip(self.labels, label_values))
+            cumulative = 0
+            for bound, bucket in zip(self.bucket_bounds + (float('inf'),), buckets):
+                cumulative += bucket
+                yield f"{self.name}_bucket", dict(labels, le=format_value(bound)), cumulative
+            yield f"{self.name}_sum", labels, total
+            yield f"{self.name}_count", labels, count
+
+    def quantile_samples(self):
+        for label_values in list(self._series):
+            labels = dict(zip(self.labels, label_values))
+            for q, value in self.quantiles(*label_values).items():
+                yield f"{self.name}_quantile", dict(labels, quantile=format_value(q)), value
+
+stage_seconds = Histogram('stage_duration_seconds', 'Time spent in each analysis pipeline stage', ['stage'])
+stage_errors = Counter('stage_errors_total', 'Pipeline stages that raised an exception', ['stage'])
+
+class StageTimer:
+    """Context manager recording the time of its block in stage_seconds, and stage_errors if it raises"""
+
+    __slots__ = ('stage', 'started')
+
+    def __init__(self, stage):
+        self.stage = stage
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        stage_seconds.observe(time.perf_counter() - self.started, self.stage)
+        if exc_type is not None:
+            stage_errors.inc(self.stage)
+        return False
+
+def timed_stage(stage):
+    """with timed_stage('name'): time a block of code as a pipeline stage"""
+    return StageTimer(stage)
+
+def timed(stage):
+    """Decorator timing every call of a function as a pipeline stage"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with StageTimer(stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def register_collector(collect):
+    """
+    Export counters kept elsewhere (e.g. cache stats) at scrape time.
+    collect() returns (name, kind, documentation, [(labels, value), ...]) tuples
+    """
+    _collectors.append(collect)
+
+def format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return f"{value:.1f}"
+    return repr(value) if isinstance(value, float) else str(value)
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def format_sample(name, labels, value):
+    if labels:
+        rendered = ','.join(f'{key}="{escape_label(label)}"' for key, label in labels.items())
+        return f"{name}{{{rendered}}} {format_value(value)}"
+    return f"{name} {format_value(value)}"
+
+def render_metrics():
+    """Every metric and collector in the Prometheus text exposition format"""
+    lines = []
+
+    def family(name, kind, documentation, samples):
+        lines.append(f"# HELP {name} {documentation}")
+        lines.append(f"# TYPE {name} {kind}")
+        lines.extend(format_sample(*sample) for sample in samples)
+
+    for metric in list(_metrics.values()):
+        family(metric.name, metric.kind, metric.documentation, metric.samples())
+        if metric.kind == 'histogram':
+            family(f"{metric.name}_quantile", 'gauge',
+                   f"p50/p95/p99 of the latest {QUANTILE_WINDOW} observations of {metric.name} in this process",
+                   metric.quantile_samples())
+
+    for collect in _collectors:
+        try:
+            families = list(collect())
+        except Exception as e:
+            # A broken collector must not take the whole endpoint down
+            logging.error(f"Error collecting metrics from {getattr(collect, '__name__', collect)}: {str(e)}")
+            continue
+        for name, kind, documentation, samples in families:
+            family(PREFIX + name, kind, documentation,
+                   ((PREFIX + name, labels, value) for labels, value in samples))
+
+    return '\n'.join(lines) + '\n'
@@ -1,20 +1,195 @@
 from app import db
 from datetime import datetime
 from sqlalchemy import Text
+from sqlalchemy.dialects.postgresql import JSONB
+from text_codec import decode_text
+
+# JSONB on PostgreSQL, JSON text queried through JSON1 on SQLite. None is
+# stored as SQL NULL, which marks suggestions that are still being generated
+JSON_DOCUMENT = db.JSON(none_as_null=True).with_variant(JSONB(none_as_null=True), 'postgresql')
+
+class StoredContent(db.Model):
+    """Text stored once per SHA-256 of its content, optionally compressed"""
+    __abstract__ = True
+
+    content_hash = db.Column(db.String(64), primary_key=True)
+    content = db.Column(db.LargeBinary, nullable=False)
+    compression = db.Column(db.String(10))  # None, 'zlib' or 'zstd'
+    size_bytes = db.Column(db.Integer, nullable=False)  # Uncompressed UTF-8 size
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    @property
+    def text(self):
+        return decode_text(self.content, self.compression)
+
+    def __repr__(self):
+        return f'<{type(self).__name__} {self.content_hash[:12]}>'
+
+class ResumeContent(StoredContent):
+    pass
+
+class JobDescriptionContent(StoredContent):
+    pass
 
 class Analysis(db.Model):
+    # Keyset pagination of the history listing: every sort order and filter
+    # combination reads one index range in order
+    __table_args__ = (
+        db.Index('ix_analysis_created_at_id', 'created_at', 'id'),
+        db.Index('ix_analysis_engine_total_score_id', 'scoring_engine', 'total_score', 'id'),
+        db.Index('ix_analysis_job_description_created_at_id', 'job_description_hash', 'created_at', 'id'),
+        db.Index('ix_analysis_job_description_engine_total_score_id', 'job_description_hash', 'scoring_engine',
+                 'total_score', 'id'),
+        # Keyword lookups ("analyses missing X") as JSONB containment
+        db.Index('ix_analysis_matching_keywords', 'matching_keywords', postgresql_using='gin',
+                 postgresql_ops={'matching_keywords': 'jsonb_path_ops'}).ddl_if(dialect='postgresql'),
+        db.Index('ix_analysis_missing_keywords', 'missing_keywords', postgresql_using='gin',
+                 postgresql_ops={'missing_keywords': 'jsonb_path_ops'}).ddl_if(dialect='postgresql'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     filename = db.Column(db.String(255), nullable=False)
-    job_description = db.Column(Text, nullable=False)
-    resume_text = db.Column(Text, nullable=False)
+    resume_hash = db.Column(db.String(64), db.ForeignKey('resume_content.content_hash'), index=True)
+    job_description_hash = db.Column(db.String(64), db.ForeignKey('job_description_content.content_hash'))
+    # Pre-deduplication copies, emptied by `flask migrate-content`. Kept so
+    # existing databases work without rebuilding the table
+    legacy_job_description = db.Column('job_description', Text, nullable=False, default='')
+    legacy_resume_text = db.Column('resume_text', Text, nullable=False, default='')
     keyword_score = db.Column(db.Float, nullable=False)
     grammar_score = db.Column(db.Float, nullable=False)
     format_score = db.Column(db.Float, nullable=False)
     total_score = db.Column(db.Float, nullable=False)
-    matching_keywords = db.Column(Text)  # JSON string
-    missing_keywords = db.Column(Text)   # JSON string
-    ai_suggestions = db.Column(Text)     # JSON string
+    # Engine of keyword_score (see scoring.py); every engine scores on the same 55-95 band
+    scoring_engine = db.Column(db.String(20), nullable=False, default='keyword', server_default='keyword')
+    matching_keywords = db.Column(JSON_DOCUMENT)  # List of keywords
+    missing_keywords = db.Column(JSON_DOCUMENT)   # List of keywords
+    ai_suggestions = db.Column(JSON_DOCUMENT)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    resume = db.relationship(ResumeContent)
+    job_description_content = db.relationship(JobDescriptionContent)
+
+    @property
+    def resume_text(self):
+        return self.resume.text if self.resume is not None else self.legacy_resume_text
+
+    @property
+    def job_description(self):
+        if self.job_description_content is not None:
+            return self.job_description_content.text
+        return self.legacy_job_description
+
+    @classmethod
+    def from_result(cls, filename, job_description_hash, resume_hash, analysis_result, ai_suggestions):
+        """
+        Build an Analysis row from an analyze_resume result and suggestions.
+        The texts are referenced by the hashes content_store.store_content returned
+        """
+        analysis = cls()
+        analysis.filename = filename
+        analysis.job_description_hash = job_description_hash
+        analysis.resume_hash = resume_hash
+        analysis.keyword_score = analysis_result['keyword_score']
+        analysis.grammar_score = analysis_result['grammar_score']
+        analysis.format_score = analysis_result['format_score']
+        analysis.total_score = analysis_result['total_score']
+        # The original keyword matcher does not name itself
+        analysis.scoring_engine = analysis_result.get('keyword_details', {}).get('scoring_engine', 'keyword')
+        analysis.matching_keywords = analysis_result['matching_keywords']
+        analysis.missing_keywords = analysis_result['missing_keywords']
+        # None marks suggestions that are still being generated
+        analysis.ai_suggestions = ai_suggestions
+        return analysis
+
     def __repr__(self):
         return f'<Analysis {self.id}: {self.filename}>'
+
+class JobProfileRecord(db.Model):
+    """Compiled keyword profile of a job description, keyed by content hash"""
+    content_hash = db.Column(db.String(64), primary_key=True)
+    keywords = db.Column(Text, nullable=False)  # JSON string
+    weights = db.Column(Text, nullable=False)   # JSON string
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<JobProfileRecord {self.content_hash[:12]}>'
+
+class AnalysisJob(db.Model):
+    """
+    Queued analysis request, processed by the background job workers.
+    Jobs created with analysis_id already set only generate AI suggestions;
+    jobs with export_ids build a merged PDF report of those analyses.
+    """
+    id = db.Column(db.String(32), primary_key=True)
+    status = db.Column(db.String(20), nullable=False, default='queued', index=True)
+    stage = db.Column(db.String(20), nullable=False, default='queued')
+    filename = db.Column(db.String(255), nullable=False)
+    job_description = db.Column(Text)   # Only needed until the Analysis row exists
+    upload = db.Column(db.LargeBinary)  # Raw upload, cleared once text is extracted
+    resume_text = db.Column(Text)
+    scoring_engine = db.Column(db.String(20))
+    export_ids = db.Column(Text)  # Comma separated analysis ids of a merged report export
+    analysis_id = db.Column(db.Integer, db.ForeignKey('analysis.id'))
+    error = db.Column(Text)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<AnalysisJob {self.id}: {self.status}>'
+
+class SuggestionCacheEntry(db.Model):
+    """Cached AI suggestions, keyed by a hash of the prompt inputs and model settings"""
+    cache_key = db.Column(db.String(64), primary_key=True)
+    suggestions = db.Column(Text, nullable=False)  # JSON string
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    last_used_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+    def __repr__(self):
+        return f'<SuggestionCacheEntry {self.cache_key[:12]}>'
+
+class ExtractedText(db.Model):
+    """Text extracted from an uploaded file, keyed by a hash of the file's bytes"""
+    content_hash = db.Column(db.String(80), primary_key=True)
+    text = db.Column(Text, nullable=False)
+    size_bytes = db.Column(db.Integer, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    last_used_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+    def __repr__(self):
+        return f'<ExtractedText {self.content_hash[:12]}>'
+
+class SearchIndexState(db.Model):
+    """
+    Single row tracking the resume search index: how far it has got through
+    Analysis, which on-disk segments make up the current index and which
+    skills dictionary version its terms were extracted with
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    last_analysis_id = db.Column(db.Integer, nullable=False, default=0)
+    doc_count = db.Column(db.Integer, nullable=False, default=0)
+    total_length = db.Column(db.Integer, nullable=False, default=0)
+    segments = db.Column(Text, nullable=False, default='[]')  # JSON list of segment names
+    skills_version = db.Column(db.String(64), nullable=False, default='', server_default='')  # dictionary and index format the terms came from
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<SearchIndexState v{self.version}: {self.doc_count} resumes>'
+
+class RescoreCheckpoint(db.Model):
+    """
+    Single row tracking an unfinished `flask rescore-analyses` run: the
+    engine it converts analyses to (empty when each keeps its own) and the
+    last analysis whose new scores are saved. Deleted once the run finishes
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    scoring_engine = db.Column(db.String(20), nullable=False)
+    last_analysis_id = db.Column(db.Integer, nullable=False, default=0)
+    rescored = db.Column(db.Integer, nullable=False, default=0)
+    changed = db.Column(db.Integer, nullable=False, default=0)
+    started_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<RescoreCheckpoint {self.scoring_engine}: up to analysis {self.last_analysis_id}>'
@@ -1,64 +1,73 @@
-import json
 import os
 from datetime import datetime
 from io import BytesIO
+from xml.sax.saxutils import escape
 
 from reportlab.lib import colors
 from reportlab.lib.pagesizes import letter, A4
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, PageBreak
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, LongTable, TableStyle, PageBreak
 from reportlab.platypus.flowables import HRFlowable
 from reportlab.lib.enums import TA_LEFT, TA_CENTER, TA_RIGHT, TA_JUSTIFY
 
+from prepared_document import prepare_document
+from metrics import timed
 
-def generate_analysis_pdf(analysis_data, filename="resume_analysis_report.pdf"):
+
+# Bump whenever the report's content or layout changes, so cached reports are rendered again
+REPORT_TEMPLATE_VERSION = 2
+
+# Styles are immutable once built; share them across reports
+styles = getSampleStyleSheet()
+
+title_style = ParagraphStyle(
+    'CustomTitle',
+    parent=styles['Heading1'],
+    fontSize=24,
+    spaceAfter=30,
+    textColor=colors.HexColor('#0d6efd'),
+    alignment=TA_CENTER
+)
+
+heading_style = ParagraphStyle(
+    'CustomHeading',
+    parent=styles['Heading2'],
+    fontSize=16,
+    spaceAfter=12,
+    textColor=colors.HexColor('#198754'),
+    borderWidth=1,
+    borderColor=colors.HexColor('#198754'),
+    borderPadding=5
+)
+
+subheading_style = ParagraphStyle(
+    'CustomSubheading',
+    parent=styles['Heading3'],
+    fontSize=14,
+    spaceAfter=8,
+    textColor=colors.HexColor('#6c757d')
+)
+
+body_style = ParagraphStyle(
+    'CustomBody',
+    parent=styles['Normal'],
+    fontSize=11,
+    spaceAfter=6,
+    alignment=TA_JUSTIFY
+)
+
+@timed('pdf_render')
+def generate_analysis_pdf(analysis_data, filename="resume_analysis_report.pdf", output=None):
     """
-    Generate a comprehensive PDF report from analysis data
+    Generate a comprehensive PDF report from analysis data, written to
+    output (a binary file object) or to a new BytesIO; returns the buffer
     """
-    buffer = BytesIO()
+    buffer = output if output is not None else BytesIO()
+    # Lowercased and counted once for every section that looks at the resume text
+    document = prepare_document(analysis_data.get('resume_text', ''))
     doc = SimpleDocTemplate(buffer, pagesize=A4, topMargin=0.75*inch, bottomMargin=0.75*inch)
     
-    # Get styles
-    styles = getSampleStyleSheet()
-    
-    # Custom styles
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=24,
-        spaceAfter=30,
-        textColor=colors.HexColor('#0d6efd'),
-        alignment=TA_CENTER
-    )
-    
-    heading_style = ParagraphStyle(
-        'CustomHeading',
-        parent=styles['Heading2'],
-        fontSize=16,
-        spaceAfter=12,
-        textColor=colors.HexColor('#198754'),
-        borderWidth=1,
-        borderColor=colors.HexColor('#198754'),
-        borderPadding=5
-    )
-    
-    subheading_style = ParagraphStyle(
-        'CustomSubheading',
-        parent=styles['Heading3'],
-        fontSize=14,
-        spaceAfter=8,
-        textColor=colors.HexColor('#6c757d')
-    )
-    
-    body_style = ParagraphStyle(
-        'CustomBody',
-        parent=styles['Normal'],
-        fontSize=11,
-        spaceAfter=6,
-        alignment=TA_JUSTIFY
-    )
-    
     # Build document content
     story = []
     
@@ -100,7 +109,7 @@ def generate_analysis_pdf(analysis_data, filename="resume_analysis_report.pdf"):
     story.append(Spacer(1, 10))
     
     # Matching keywords
-    matching_keywords = json.loads(analysis_data.get('matching_keywords', '[]'))
+    matching_keywords = analysis_data.get('matching_keywords', [])
     if matching_keywords:
         story.append(Paragraph("✓ Matching Keywords Found:", subheading_style))
         keywords_text = ", ".join(matching_keywords[:15])  # Limit to first 15 keywords
@@ -110,7 +119,7 @@ def generate_analysis_pdf(analysis_data, filename="resume_analysis_report.pdf"):
         story.append(Spacer(1, 10))
     
     # Missing keywords
-    missing_keywords = json.loads(analysis_data.get('missing_keywords', '[]'))
+    missing_keywords = analysis_data.get('missing_keywords', [])
     if missing_keywords:
         story.append(Paragraph("⚠ Missing Keywords to Add:", subheading_style))
         missing_text = ", ".join(missing_keywords[:15])  # Limit to first 15 keywords
@@ -123,14 +132,14 @@ def generate_analysis_pdf(analysis_data, filename="resume_analysis_report.pdf"):
     story.append(Paragraph("AI-Powered Optimization Suggestions", heading_style))
     story.append(Spacer(1, 10))
     
-    ai_suggestions = json.loads(analysis_data.get('ai_suggestions', '[]'))
+    ai_suggestions = analysis_data.get('ai_suggestions', [])
     if ai_suggestions:
         for i, suggestion in enumerate(ai_suggestions, 1):
             story.append(Paragraph(f"{i}. {suggestion}", body_style))
             story.append(Spacer(1, 5))
     else:
         # Provide fallback suggestions based on score
-        fallback_suggestions = generate_fallback_suggestions(analysis_data)
+        fallback_suggestions = generate_fallback_suggestions(analysis_data, document)
         for i, suggestion in enumerate(fallback_suggestions, 1):
             story.append(Paragraph(f"{i}. {suggestion}", body_style))
             story.append(Spacer(1, 5))
@@ -141,7 +150,7 @@ def generate_analysis_pdf(analysis_data, filename="resume_analysis_report.pdf"):
     story.append(Paragraph("Immediate Action Plan", heading_style))
     story.append(Spacer(1, 10))
     
-    action_plan = generate_action_plan(analysis_data)
+    action_plan = generate_action_plan(analysis_data, document)
     
     # Priority Actions
     story.append(Paragraph("🎯 Priority Actions (Complete First)", subheading_style))
@@ -168,7 +177,7 @@ def generate_analysis_pdf(analysis_data, filename="resume_analysis_report.pdf"):
     story.append(Paragraph("Detailed Improvement Recommendations", heading_style))
     story.append(Spacer(1, 10))
     
-    recommendations = generate_detailed_recommendations(analysis_data)
+    recommendations = generate_detailed_recommendations(analysis_data, document)
     for category, recs in recommendations.items():
         story.append(Paragraph(category, subheading_style))
         for rec in recs:
@@ -186,10 +195,78 @@ def generate_analysis_pdf(analysis_data, filename="resume_analysis_report.pdf"):
     
     # Build PDF
     doc.build(story)
-    buffer.seek(0)
+    if output is None:
+        buffer.seek(0)
     return buffer
 
 
+def render_report_file(analysis_data, path):
+    """Process pool entry point: render a report into the file at path"""
+    with open(path, 'wb') as f:
+        generate_analysis_pdf(analysis_data, output=f)
+
+
+def generate_summary_pdf(rows, output):
+    """
+    Write the summary table that opens a merged batch report to output (a
+    binary file object): one row per analysis, with its scores, in rows order.
+    rows are dicts with the keys of generate_analysis_pdf()'s analysis_data,
+    plus 'id' and 'report_missing', set when the analysis's report could not
+    be generated; those are marked and listed in an errors section.
+    """
+    missing = [row for row in rows if row.get('report_missing')]
+    doc = SimpleDocTemplate(output, pagesize=A4, topMargin=0.75*inch, bottomMargin=0.75*inch)
+    heading = f"{len(rows)} analyses, each report follows this summary"
+    if missing:
+        heading += f" ({len(missing)} could not be generated)"
+    story = [
+        Paragraph("Resume ATS Batch Report", title_style),
+        Paragraph(heading, styles['Heading3']),
+        Spacer(1, 20)
+    ]
+
+    cell_style = ParagraphStyle('SummaryCell', parent=styles['Normal'], fontSize=9)
+    table_data = [['#', 'Resume', 'Analyzed', 'ATS', 'Keyword', 'Grammar', 'Format']]
+    for i, row in enumerate(rows, 1):
+        resume = escape(row['filename'])
+        if row.get('report_missing'):
+            resume += '<br/><font color="red">Report could not be generated</font>'
+        table_data.append([
+            str(i),
+            Paragraph(resume, cell_style),
+            row['created_at'],
+            f"{row['total_score']}",
+            f"{row['keyword_score']}",
+            f"{row['grammar_score']}",
+            f"{row['format_score']}"
+        ])
+
+    # LongTable splits across pages much faster than Table for long batches
+    summary_table = LongTable(table_data, repeatRows=1,
+                              colWidths=[0.4*inch, 2.3*inch, 1.5*inch, 0.6*inch, 0.7*inch, 0.7*inch, 0.6*inch])
+    summary_table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#0d6efd')),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, -1), 9),
+        ('ALIGN', (3, 0), (-1, -1), 'CENTER'),
+        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.beige]),
+        ('GRID', (0, 0), (-1, -1), 0.5, colors.black)
+    ]))
+    story.append(summary_table)
+
+    if missing:
+        story.append(Spacer(1, 20))
+        story.append(Paragraph("Errors", styles['Heading3']))
+        for row in missing:
+            story.append(Paragraph(f"Analysis {row['id']}, {escape(row['filename'])}: the report could not be generated",
+                                   styles['Normal']))
+
+    doc.build(story)
+    return output
+
+
 def get_score_status(score, max_score=100):
     """Get status text based on score"""
     percentage = (score / max_score) * 100
@@ -203,19 +280,24 @@ def get_score_status(score, max_score=100):
         return "Needs Improvement"
 
 
-def generate_fallback_suggestions(analysis_data):
-    """Generate comprehensive, personalized suggestions based on resume analysis"""
+def generate_fallback_suggestions(analysis_data, document=None):
+    """
+    Generate comprehensive, personalized suggestions based on resume analysis.
+    document is the PreparedDocument of the resume text, when the caller has it.
+    """
+    if document is None:
+        document = prepare_document(analysis_data.get('resume_text', ''))
     suggestions = []
     total_score = analysis_data.get('total_score', 0)
     keyword_score = analysis_data.get('keyword_score', 0)
     grammar_score = analysis_data.get('grammar_score', 0)
     format_score = analysis_data.get('format_score', 0)
-    resume_text = analysis_data.get('resume_text', '').lower()
+    resume_text = document.lowered
     
     # Keyword-specific suggestions
     if keyword_score < 45:
-        matching_keywords = json.loads(analysis_data.get('matching_keywords', '[]'))
-        missing_keywords = json.loads(analysis_data.get('missing_keywords', '[]'))
+        matching_keywords = analysis_data.get('matching_keywords', [])
+        missing_keywords = analysis_data.get('missing_keywords', [])
         
         if len(matching_keywords) < 5:
             suggestions.append("Critical: Add more job-relevant keywords. Currently only matching " + str(len(matching_keywords)) + " key terms")
@@ -247,7 +329,7 @@ def generate_fallback_suggestions(analysis_data):
             suggestions.append("Add an Education section with your degree, institution, and graduation year")
         if 'experience' not in resume_text and 'work' not in resume_text:
             suggestions.append("Include a clear Work Experience or Professional Experience section")
-        if not any(char in analysis_data.get('resume_text', '') for char in ['•', '-', '*']):
+        if not any(char in document.text for char in ['•', '-', '*']):
             suggestions.append("Use bullet points to organize information for better readability")
     
     # Industry-specific suggestions based on content
@@ -271,7 +353,7 @@ def generate_fallback_suggestions(analysis_data):
         suggestions.append("Consider having a professional review your resume for additional improvements")
     
     # Length-based suggestions
-    word_count = len(analysis_data.get('resume_text', '').split())
+    word_count = document.word_count
     if word_count < 200:
         suggestions.append("Expand your resume content - aim for 300-600 words to provide sufficient detail")
     elif word_count > 800:
@@ -287,16 +369,21 @@ def generate_fallback_suggestions(analysis_data):
     return suggestions[:12]  # Return up to 12 personalized suggestions
 
 
-def generate_detailed_recommendations(analysis_data):
-    """Generate detailed, personalized recommendations by category"""
+def generate_detailed_recommendations(analysis_data, document=None):
+    """
+    Generate detailed, personalized recommendations by category.
+    document is the PreparedDocument of the resume text, when the caller has it.
+    """
+    if document is None:
+        document = prepare_document(analysis_data.get('resume_text', ''))
     recommendations = {}
     
     keyword_score = analysis_data.get('keyword_score', 0)
     grammar_score = analysis_data.get('grammar_score', 0)
     format_score = analysis_data.get('format_score', 0)
-    resume_text = analysis_data.get('resume_text', '').lower()
-    missing_keywords = json.loads(analysis_data.get('missing_keywords', '[]'))
-    matching_keywords = json.loads(analysis_data.get('matching_keywords', '[]'))
+    resume_text = document.lowered
+    missing_keywords = analysis_data.get('missing_keywords', [])
+    matching_keywords = analysis_data.get('matching_keywords', [])
     
     # Strategic Keyword Optimization
     keyword_recs = []
@@ -353,7 +440,7 @@ def generate_detailed_recommendations(analysis_data):
     if 'skills' not in resume_text and 'competencies' not in resume_text:
         format_recs.append("Add a dedicated Skills or Core Competencies section")
     
-    if not any(bullet in analysis_data.get('resume_text', '') for bullet in ['•', '-', '*']):
+    if not any(bullet in document.text for bullet in ['•', '-', '*']):
         format_recs.append("Use bullet points to organize information for easy scanning")
     
     format_recs.extend([
@@ -433,14 +520,19 @@ def generate_detailed_recommendations(analysis_data):
     return recommendations
 
 
-def generate_action_plan(analysis_data):
-    """Generate a prioritized action plan based on analysis results"""
+def generate_action_plan(analysis_data, document=None):
+    """
+    Generate a prioritized action plan based on analysis results.
+    document is the PreparedDocument of the resume text, when the caller has it.
+    """
+    if document is None:
+        document = prepare_document(analysis_data.get('resume_text', ''))
     total_score = analysis_data.get('total_score', 0)
     keyword_score = analysis_data.get('keyword_score', 0)
     grammar_score = analysis_data.get('grammar_score', 0)
     format_score = analysis_data.get('format_score', 0)
-    resume_text = analysis_data.get('resume_text', '').lower()
-    missing_keywords = json.loads(analysis_data.get('missing_keywords', '[]'))
+    resume_text = document.lowered
+    missing_keywords = analysis_data.get('missing_keywords', [])
     
     priority_actions = []
     quick_wins = []
@@ -463,17 +555,17 @@ def generate_action_plan(analysis_data):
     if 'phone' not in resume_text and 'email' not in resume_text:
         quick_wins.append("Add complete contact information (phone, email, location)")
     
-    if not any(date in analysis_data.get('resume_text', '') for date in ['2020', '2021', '2022', '2023', '2024']):
+    if not any(date in document.text for date in ['2020', '2021', '2022', '2023', '2024']):
         quick_wins.append("Include employment dates to show your career timeline")
     
-    if not any(bullet in analysis_data.get('resume_text', '') for bullet in ['•', '-', '*']):
+    if not any(bullet in document.text for bullet in ['•', '-', '*']):
         quick_wins.append("Convert job descriptions to bullet points for better readability")
     
     if 'summary' not in resume_text and 'objective' not in resume_text:
         quick_wins.append("Add a professional summary that highlights your key qualifications")
     
     # Content-based quick wins
-    if len(analysis_data.get('resume_text', '').split()) < 250:
+    if document.word_count < 250:
         quick_wins.append("Expand your experience descriptions with more specific details")
     
     if not any(action in resume_text for action in ['managed', 'led', 'developed', 'implemented']):
@@ -0,0 +1,51 @@
+from resume_rules import rule_scanner
+from skills import SKILL_TOKEN_PATTERN
+
+class PreparedDocument:
+    """
+    A resume text with what the analysis stages derive from it, computed
+    once per upload and shared: the lowercased text, its tokens (runs of
+    word characters and single other characters, as the skills matcher
+    uses them), the word count, and the sentence offsets and rule counts
+    of the grammar and format rules. All but the lowercased text are
+    computed on first use, so each caller only pays for what it reads.
+    """
+
+    __slots__ = ('text', 'lowered', '_tokens', '_word_count', '_rule_hits')
+
+    def __init__(self, text):
+        self.text = text
+        self.lowered = text.lower()
+        self._tokens = None
+        self._word_count = None
+        self._rule_hits = None
+
+    @property
+    def tokens(self):
+        """skills.skill_tokens(text); words are the tokens that begin with a word character"""
+        if self._tokens is None:
+            self._tokens = SKILL_TOKEN_PATTERN.findall(self.lowered)
+        return self._tokens
+
+    @property
+    def word_count(self):
+        """len(text.split())"""
+        if self._word_count is None:
+            self._word_count = len(self.text.split())
+        return self._word_count
+
+    @property
+    def rule_hits(self):
+        """RuleHits of the grammar and format rules (see resume_rules.py)"""
+        if self._rule_hits is None:
+            self._rule_hits = rule_scanner.scan(self.text, self.lowered)
+        return self._rule_hits
+
+    def __repr__(self):
+        return f'<PreparedDocument: {len(self.text)} characters>'
+
+def prepare_document(text):
+    """PreparedDocument of text; a PreparedDocument is returned as it is"""
+    if isinstance(text, PreparedDocument):
+        return text
+    return PreparedDocument(text)
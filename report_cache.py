@@ -0,0 +1,129 @@
+import os
+import json
+import hashlib
+import logging
+import tempfile
+import threading
+from app import app
+from pdf_generator import generate_analysis_pdf, REPORT_TEMPLATE_VERSION
+
+_counters = {'hits': 0, 'misses': 0, 'evictions': 0}
+_counters_lock = threading.Lock()
+
+def analysis_report_data(analysis):
+    """generate_analysis_pdf() input for an Analysis row"""
+    return {
+        'filename': analysis.filename,
+        'job_description': analysis.job_description,
+        'resume_text': analysis.resume_text,
+        'keyword_score': analysis.keyword_score,
+        'grammar_score': analysis.grammar_score,
+        'format_score': analysis.format_score,
+        'total_score': analysis.total_score,
+        'matching_keywords': analysis.matching_keywords or [],
+        'missing_keywords': analysis.missing_keywords or [],
+        'ai_suggestions': analysis.ai_suggestions or [],
+        'created_at': analysis.created_at.strftime('%Y-%m-%d %H:%M:%S') if analysis.created_at else 'Unknown'
+    }
+
+def report_etag(analysis):
+    """
+    Identifies a report's content: the template version and what the report
+    shows of the analysis. Suggestions never change once they are in, but
+    `flask rescore-analyses` can change the scores and keywords
+    """
+    scores = json.dumps([analysis.keyword_score, analysis.grammar_score, analysis.format_score,
+                         analysis.total_score, analysis.matching_keywords, analysis.missing_keywords])
+    return f"{analysis.id}-v{REPORT_TEMPLATE_VERSION}-{hashlib.sha256(scores.encode('utf-8')).hexdigest()[:8]}"
+
+def cache_directory():
+    directory = app.config['REPORT_CACHE_DIR']
+    os.makedirs(directory, exist_ok=True)
+    return directory
+
+def report_path(analysis):
+    return os.path.join(cache_directory(), f"{report_etag(analysis)}.pdf")
+
+def lookup_report(analysis):
+    """Path of the cached report of a completed analysis, or None if it has not been rendered"""
+    path = report_path(analysis)
+    try:
+        # The modification time doubles as the last use, for eviction
+        os.utime(path)
+        _count('hits')
+        return path
+    except FileNotFoundError:
+        _count('misses')
+        return None
+
+def report_temp_file():
+    """(fd, path) of a new file in the cache directory to render a report into"""
+    return tempfile.mkstemp(dir=cache_directory(), suffix='.tmp')
+
+def store_report(analysis, temp_path):
+    """Move a report rendered into temp_path into the cache; returns its path there"""
+    path = report_path(analysis)
+    os.replace(temp_path, path)
+    evict_reports(os.path.dirname(path), keep=path)
+    return path
+
+def cached_report(analysis):
+    """
+    Path of the rendered PDF report of a completed analysis. Reports are
+    rendered once per analysis and template version, straight to a file in
+    REPORT_CACHE_DIR; the least recently used ones are deleted once the
+    cache grows past REPORT_CACHE_MAX_BYTES, which also clears out reports
+    of analyses that were re-scored since.
+    """
+    path = lookup_report(analysis)
+    if path is not None:
+        return path
+
+    fd, temp_path = report_temp_file()
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            generate_analysis_pdf(analysis_report_data(analysis), output=f)
+    except Exception:
+        os.unlink(temp_path)
+        raise
+    return store_report(analysis, temp_path)
+
+def evict_reports(directory, keep=None):
+    """Delete least recently used reports until the cache fits REPORT_CACHE_MAX_BYTES"""
+    max_bytes = app.config['REPORT_CACHE_MAX_BYTES']
+    reports = []
+    for entry in os.scandir(directory):
+        if entry.name.endswith('.pdf'):
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            reports.append((stat.st_mtime, stat.st_size, entry.path))
+
+    total = sum(size for _, size, _ in reports)
+    for _, size, path in sorted(reports):
+        if total <= max_bytes:
+            break
+        if path == keep:
+            continue
+        try:
+            # Responses already streaming this file keep their open handle
+            os.unlink(path)
+            _count('evictions')
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logging.error(f"Error evicting cached report {path}: {str(e)}")
+            continue
+        total -= size
+
+def _count(counter, amount=1):
+    with _counters_lock:
+        _counters[counter] += amount
+
+def report_cache_stats():
+    stats = dict(_counters)
+    lookups = stats['hits'] + stats['misses']
+    stats['hit_ratio'] = round(stats['hits'] / lookups, 4) if lookups else 0.0
+    stats['max_bytes'] = app.config['REPORT_CACHE_MAX_BYTES']
+    return stats
@@ -0,0 +1,319 @@
+import os
+import logging
+import zipfile
+from io import BytesIO
+import threading
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
+import fitz  # PyMuPDF
+from sqlalchemy import select
+from werkzeug.utils import secure_filename
+from app import app, db
+from models import Analysis
+from pdf_generator import render_report_file, generate_summary_pdf
+from report_cache import lookup_report, report_temp_file, store_report, analysis_report_data
+
+# Reports rendered or waiting to be written out, per worker; bounds memory and temp files
+REPORTS_IN_FLIGHT_PER_WORKER = 2
+# Analysis rows loaded per query
+EXPORT_LOAD_BATCH = 50
+# Merged reports are appended to disk and reopened this often, so pages never pile up in memory
+MERGE_FLUSH_EVERY = 100
+COPY_CHUNK_SIZE = 256 * 1024
+
+_executor = None
+_executor_lock = threading.Lock()
+
+def render_executor():
+    """Process pool rendering exported reports, started on first use"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                max_workers=app.config['REPORT_EXPORT_WORKERS'],
+                mp_context=multiprocessing.get_context('spawn')
+            )
+        return _executor
+
+def reset_executor(executor):
+    """Drop a broken pool so the next export starts a new one"""
+    global _executor
+    with _executor_lock:
+        if _executor is executor:
+            _executor = None
+    executor.shutdown(wait=False, cancel_futures=True)
+
+def submit_render(analysis_data, path):
+    """Future of rendering a report into path; rendered in-process when REPORT_EXPORT_WORKERS is 0"""
+    if app.config['REPORT_EXPORT_WORKERS'] <= 0:
+        future = Future()
+        try:
+            render_report_file(analysis_data, path)
+            future.set_result(path)
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    executor = render_executor()
+    try:
+        return executor.submit(render_report_file, analysis_data, path)
+    except BrokenProcessPool:
+        reset_executor(executor)
+        return render_executor().submit(render_report_file, analysis_data, path)
+
+def remove_file(path):
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+class PendingReport:
+    """The report of one exported analysis: already cached, or being rendered into a temp file"""
+
+    def __init__(self, analysis, path, future=None, cacheable=False):
+        self.analysis = analysis
+        self.path = path
+        self.future = future
+        self.cacheable = cacheable
+
+    @property
+    def temporary(self):
+        """Rendered just for this export, because the analysis's AI suggestions are still pending"""
+        return self.future is not None and not self.cacheable
+
+    def done(self):
+        return self.future is None or self.future.done()
+
+    def finish(self):
+        """Wait for the report; returns its path, or None if it could not be rendered"""
+        if self.future is None:
+            return self.path
+        try:
+            self.future.result()
+        except Exception as e:
+            logging.error(f"Error rendering report for analysis {self.analysis.id}: {str(e)}")
+            remove_file(self.path)
+            return None
+        if self.cacheable:
+            self.path = store_report(self.analysis, self.path)
+            self.future = None
+        return self.path
+
+    def discard(self):
+        """Abandon an unfinished report, deleting its temp file once the worker lets go of it"""
+        if self.future is not None and not self.future.cancel():
+            self.future.add_done_callback(lambda future: remove_file(self.path))
+        elif self.future is not None:
+            remove_file(self.path)
+
+def start_report(analysis):
+    """PendingReport of analysis: its cached report, or one submitted to the render pool"""
+    cacheable = analysis.ai_suggestions is not None
+    if cacheable:
+        path = lookup_report(analysis)
+        if path is not None:
+            return PendingReport(analysis, path)
+
+    fd, temp_path = report_temp_file()
+    os.close(fd)
+    future = submit_render(analysis_report_data(analysis), temp_path)
+    return PendingReport(analysis, temp_path, future, cacheable)
+
+def started_reports(analysis_ids):
+    """start_report() of each of analysis_ids in turn, loading the rows a batch at a time"""
+    for start in range(0, len(analysis_ids), EXPORT_LOAD_BATCH):
+        batch = analysis_ids[start:start + EXPORT_LOAD_BATCH]
+        analyses = {
+            analysis.id: analysis
+            for analysis in db.session.execute(select(Analysis).where(Analysis.id.in_(batch))).scalars()
+        }
+        for analysis_id in batch:
+            if analysis_id in analyses:
+                yield start_report(analyses[analysis_id])
+
+def exported_reports(analysis_ids, ordered=False):
+    """
+    (Analysis, report path) for each of analysis_ids, the path being None if
+    the report failed to render. Reports not in the cache are rendered across
+    the export process pool and come out as they complete, or in the order
+    of analysis_ids if ordered. Only a few reports per worker are loaded,
+    rendering or waiting at any time, whatever the number of analyses.
+    A path is only valid until the next one is asked for.
+    """
+    window = max(1, app.config['REPORT_EXPORT_WORKERS']) * REPORTS_IN_FLIGHT_PER_WORKER
+    reports = started_reports(analysis_ids)
+    in_flight = []
+    exhausted = False
+    try:
+        while True:
+            while not exhausted and len(in_flight) < window:
+                report = next(reports, None)
+                if report is None:
+                    exhausted = True
+                else:
+                    in_flight.append(report)
+            if not in_flight:
+                return
+
+            if ordered:
+                report = in_flight[0]
+            else:
+                report = next((report for report in in_flight if report.done()), None)
+                if report is None:
+                    wait([report.future for report in in_flight], return_when=FIRST_COMPLETED)
+                    continue
+            in_flight.remove(report)
+
+            path = report.finish()
+            try:
+                yield report.analysis, path
+            finally:
+                if path is not None and report.temporary:
+                    remove_file(path)
+    finally:
+        # The export was abandoned, e.g. the client disconnected
+        for report in in_flight:
+            report.discard()
+
+def missing_analyses(analysis_ids):
+    """Those of analysis_ids that have no Analysis row"""
+    found = set()
+    for start in range(0, len(analysis_ids), EXPORT_LOAD_BATCH):
+        found.update(db.session.execute(
+            select(Analysis.id).where(Analysis.id.in_(analysis_ids[start:start + EXPORT_LOAD_BATCH]))
+        ).scalars())
+    return [analysis_id for analysis_id in analysis_ids if analysis_id not in found]
+
+def report_entry_name(analysis):
+    """Name of an analysis's report inside the export ZIP; the id keeps names unique"""
+    stem = secure_filename(os.path.splitext(analysis.filename)[0]) or 'resume'
+    return f"{analysis.id}_{stem}_report.pdf"
+
+class ZipStream:
+    """Write-only file object that collects what zipfile writes until the response drains it"""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+def report_zip_stream(analysis_ids):
+    """
+    The ZIP of the reports of analysis_ids, as chunks of bytes for a streamed
+    response. Entries are written as their reports become ready; reports that
+    fail to render are listed in errors.txt instead.
+    """
+    stream = ZipStream()
+    failed = []
+    # zipfile sees an unseekable stream and writes sizes after each entry
+    with zipfile.ZipFile(stream, 'w', zipfile.ZIP_STORED) as archive:
+        for analysis, path in exported_reports(analysis_ids):
+            if path is None:
+                failed.append(analysis)
+                continue
+            # PDF content streams are compressed already; storing them is as small and much faster
+            entry_info = zipfile.ZipInfo.from_file(path, report_entry_name(analysis))
+            with open(path, 'rb') as source, archive.open(entry_info, 'w') as entry:
+                while True:
+                    chunk = source.read(COPY_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    entry.write(chunk)
+                    yield stream.drain()
+            yield stream.drain()
+        if failed:
+            archive.writestr('errors.txt', ''.join(
+                f"{analysis.id}\t{analysis.filename}\tthe report could not be generated\n" for analysis in failed
+            ))
+    yield stream.drain()
+
+def summary_rows(analysis_ids, missing_reports=()):
+    """
+    generate_summary_pdf() rows of the analyses of analysis_ids that exist,
+    in that order; those in missing_reports are marked as having no report
+    """
+    rows = {}
+    for start in range(0, len(analysis_ids), EXPORT_LOAD_BATCH):
+        for row in db.session.execute(
+            select(Analysis.id, Analysis.filename, Analysis.keyword_score, Analysis.grammar_score,
+                   Analysis.format_score, Analysis.total_score, Analysis.created_at)
+            .where(Analysis.id.in_(analysis_ids[start:start + EXPORT_LOAD_BATCH]))
+        ):
+            rows[row.id] = {
+                'id': row.id,
+                'filename': row.filename,
+                'keyword_score': row.keyword_score,
+                'grammar_score': row.grammar_score,
+                'format_score': row.format_score,
+                'total_score': row.total_score,
+                'created_at': row.created_at.strftime('%Y-%m-%d %H:%M') if row.created_at else 'Unknown',
+                'report_missing': row.id in missing_reports
+            }
+    return [rows[analysis_id] for analysis_id in analysis_ids if analysis_id in rows]
+
+def export_path(job_id):
+    """Where the merged report of a queued export job is written"""
+    directory = app.config['REPORT_EXPORT_DIR']
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, f'{job_id}.pdf')
+
+def write_merged_report(analysis_ids, path, progress=None):
+    """
+    Write one PDF to path: a summary table of the analyses of analysis_ids,
+    then each of their reports in that order, with a bookmark per report.
+    Pages are appended to the file with incremental saves every
+    MERGE_FLUSH_EVERY reports, so memory does not grow with the batch. The
+    summary goes in front last, once it is known which reports failed to
+    render: their rows are marked and listed in an errors section, as the
+    ZIP export lists them in errors.txt. progress() is called after each
+    incremental save.
+    """
+    merged = fitz.open()
+    saved = False
+    try:
+        toc = []
+        failed = set()
+        unsaved = 0
+        for analysis, report_path in exported_reports(analysis_ids, ordered=True):
+            if report_path is None:
+                failed.add(analysis.id)
+                continue
+            with fitz.open(report_path) as report:
+                toc.append([1, f"{analysis.id} {analysis.filename}", merged.page_count + 1])
+                merged.insert_pdf(report)
+            unsaved += 1
+            if unsaved >= MERGE_FLUSH_EVERY:
+                save_merged(merged, path, saved)
+                merged.close()
+                merged = fitz.open(path)
+                saved = True
+                unsaved = 0
+                if progress is not None:
+                    progress()
+
+        summary = generate_summary_pdf(summary_rows(analysis_ids, failed), output=BytesIO())
+        with fitz.open(stream=summary.getvalue(), filetype='pdf') as summary_pdf:
+            merged.insert_pdf(summary_pdf, start_at=0)
+            offset = summary_pdf.page_count
+        merged.set_toc([[1, 'Summary', 1]] + [[level, title, page + offset] for level, title, page in toc])
+        save_merged(merged, path, saved)
+    finally:
+        merged.close()
+
+def save_merged(merged, path, saved):
+    """Save a merged report to path: in full the first time, then only what changed since"""
+    if saved:
+        merged.save(path, incremental=True, encryption=fitz.PDF_ENCRYPT_KEEP)
+    else:
+        merged.save(path)
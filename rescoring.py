@@ -0,0 +1,234 @@
+import os
+import time
+import logging
+import multiprocessing
+from collections import deque
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+import click
+from sqlalchemy import select, update
+from sqlalchemy.orm import aliased
+from app import app, db
+from models import Analysis, JobDescriptionContent, RescoreCheckpoint
+from content_store import select_resume_texts, stored_text
+from analyzer import analyze_resume
+from prepared_document import PreparedDocument
+from job_profile import get_job_profile
+from scoring import score_keywords, scoring_engine, corpus_stats, SCORING_ENGINES
+
+RESCORE_CHUNK_SIZE = int(os.environ.get("RESCORE_CHUNK_SIZE", 1000))  # Analysis rows per read and per transaction
+RESCORE_WORKERS = int(os.environ.get("RESCORE_WORKERS", os.cpu_count() or 1))
+# Rows per task sent to a worker; small enough to keep every worker busy until a chunk ends
+RESCORE_TASK_SIZE = 100
+# Chunks read ahead while earlier ones are still being scored
+CHUNKS_IN_FLIGHT = 2
+
+# Columns an analysis is scored from: its id, job description, engine and resume (as select_resume_texts returns them)
+JobDescriptionText = aliased(JobDescriptionContent)
+RESCORE_COLUMNS = (Analysis.id, JobDescriptionText.content, JobDescriptionText.compression,
+                   Analysis.legacy_job_description, Analysis.scoring_engine)
+
+def init_worker(engines):
+    """Worker process initializer: tfidf and bm25 need the corpus statistics, built once per worker"""
+    if any(engine != 'keyword' for engine in engines):
+        with app.app_context():
+            corpus_stats.refresh()
+
+def rescore_rows(rows, engine=None):
+    """
+    Worker process entry point: score stored analyses again, as a list of
+    update(Analysis) parameters. Each analysis is scored with the engine it
+    was scored with, or converted to engine when one is given. rows are
+    read_chunk() rows; one that cannot be scored is logged and left out, so
+    it keeps its old scores.
+    """
+    # Analyses of one job description and engine are scored together, as a batch upload would be
+    by_job_description = {}
+    for analysis_id, jd_content, jd_compression, legacy_jd, row_engine, content, compression, legacy_text in rows:
+        job_description = stored_text(jd_content, jd_compression, legacy_jd)
+        by_job_description.setdefault((job_description, engine or row_engine), []).append(
+            (analysis_id, PreparedDocument(stored_text(content, compression, legacy_text)))
+        )
+
+    results = []
+    for (job_description, analysis_engine), analyses in by_job_description.items():
+        try:
+            job_profile = get_job_profile(job_description)
+            keyword_analyses = score_keywords([document for _, document in analyses], job_profile, analysis_engine)
+        except Exception as e:
+            logging.error(f"Error scoring keywords of analyses {analyses[0][0]}-{analyses[-1][0]}: {str(e)}")
+            continue
+
+        for (analysis_id, document), keyword_analysis in zip(analyses, keyword_analyses):
+            try:
+                result = analyze_resume(document, job_description, job_profile.keywords, keyword_analysis)
+            except Exception as e:
+                logging.error(f"Error rescoring analysis {analysis_id}: {str(e)}")
+                continue
+            results.append({
+                'id': analysis_id,
+                'keyword_score': result['keyword_score'],
+                'grammar_score': result['grammar_score'],
+                'format_score': result['format_score'],
+                'total_score': result['total_score'],
+                'scoring_engine': analysis_engine,
+                'matching_keywords': result['matching_keywords'],
+                'missing_keywords': result['missing_keywords']
+            })
+    return results
+
+def read_chunk(last_id, chunk_size):
+    """The next chunk_size analyses after last_id, with their stored texts, streamed from the database"""
+    rows = db.session.execute(
+        select_resume_texts(*RESCORE_COLUMNS)
+        .outerjoin(JobDescriptionText, Analysis.job_description_hash == JobDescriptionText.content_hash)
+        .where(Analysis.id > last_id)
+        .order_by(Analysis.id)
+        .limit(chunk_size)
+        .execution_options(yield_per=RESCORE_TASK_SIZE)
+    )
+    return [tuple(row) for row in rows]
+
+def describe_engine(engine):
+    return engine or "each analysis's own engine"
+
+def load_checkpoint(engine=None, restart=False):
+    """
+    The checkpoint of the unfinished run to continue, or of a new one.
+    An unfinished run with another engine is only replaced with restart.
+    The checkpoint's engine is empty when analyses keep their own.
+    """
+    engine = engine or ''
+    checkpoint = db.session.execute(select(RescoreCheckpoint)).scalars().first()
+    if checkpoint is None:
+        checkpoint = RescoreCheckpoint()
+        db.session.add(checkpoint)
+    elif not restart and checkpoint.last_analysis_id and checkpoint.scoring_engine != engine:
+        raise ValueError(f"An unfinished run scores with {describe_engine(checkpoint.scoring_engine)}; "
+                         f"continue it with the same --engine or start over with --restart")
+
+    if restart or not checkpoint.last_analysis_id:
+        checkpoint.scoring_engine = engine
+        checkpoint.last_analysis_id = 0
+        checkpoint.rescored = 0
+        checkpoint.changed = 0
+        checkpoint.started_at = datetime.utcnow()
+    checkpoint.updated_at = datetime.utcnow()
+    db.session.commit()
+    return checkpoint
+
+def scores_changed(analysis, values):
+    return (analysis.keyword_score, analysis.grammar_score, analysis.format_score, analysis.total_score,
+            analysis.scoring_engine) != (values['keyword_score'], values['grammar_score'], values['format_score'],
+                                         values['total_score'], values['scoring_engine'])
+
+def save_chunk(checkpoint, results, last_id):
+    """
+    Write a chunk's new scores with one batched UPDATE and move the
+    checkpoint past it in the same transaction, so an interrupted run
+    continues exactly after the last chunk saved. Returns how many of the
+    results changed the scores.
+    """
+    current = {
+        analysis.id: analysis for analysis in db.session.execute(
+            select(Analysis.id, Analysis.keyword_score, Analysis.grammar_score, Analysis.format_score,
+                   Analysis.total_score, Analysis.scoring_engine)
+            .where(Analysis.id > checkpoint.last_analysis_id, Analysis.id <= last_id)
+        )
+    }
+    changed = sum(1 for values in results if values['id'] in current and scores_changed(current[values['id']], values))
+    if results:
+        db.session.execute(update(Analysis), results)
+
+    checkpoint.last_analysis_id = last_id
+    checkpoint.rescored += len(results)
+    checkpoint.changed += changed
+    checkpoint.updated_at = datetime.utcnow()
+    db.session.commit()
+    return changed
+
+def rescore_analyses(engine=None, workers=RESCORE_WORKERS, chunk_size=RESCORE_CHUNK_SIZE,
+                     restart=False, progress=None):
+    """
+    Score every stored analysis again with the current scoring code and
+    write the new scores back. Each analysis keeps the engine it was scored
+    with, so its scores stay that engine's; with engine, every
+    analysis is converted to that engine and records it. Analyses are read
+    in id order in chunks of chunk_size, and each chunk's rows are scored
+    across a process pool of workers
+    processes (in-process with 0) while the next chunk is read, then saved
+    with one batched UPDATE together with the checkpoint. Running it again
+    after an interruption continues after the last chunk saved; restart
+    starts over. progress is called after each chunk with the checkpoint
+    and the number of analyses rescored so far by this call.
+    Returns (checkpoint of the finished run, analyses rescored by this call).
+    """
+    checkpoint = load_checkpoint(engine, restart)
+    rescored = 0
+
+    engines = [engine] if engine else db.session.execute(select(Analysis.scoring_engine).distinct()).scalars().all()
+    executor = None
+    if workers > 0:
+        executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                                       initializer=init_worker, initargs=(engines,))
+    else:
+        init_worker(engines)
+    try:
+        pending = deque()
+        last_id = checkpoint.last_analysis_id
+        while True:
+            rows = read_chunk(last_id, chunk_size)
+            if rows:
+                last_id = rows[-1][0]
+                tasks = [rows[start:start + RESCORE_TASK_SIZE] for start in range(0, len(rows), RESCORE_TASK_SIZE)]
+                if executor is None:
+                    pending.append((last_id, [rescore_rows(task, engine) for task in tasks]))
+                else:
+                    pending.append((last_id, [executor.submit(rescore_rows, task, engine) for task in tasks]))
+                # Keep reading while the pool works through the chunks before this one
+                if len(pending) < CHUNKS_IN_FLIGHT:
+                    continue
+            if not pending:
+                break
+
+            chunk_last_id, tasks = pending.popleft()
+            results = [values for task in tasks
+                       for values in (task if executor is None else task.result())]
+            save_chunk(checkpoint, results, chunk_last_id)
+            rescored += len(results)
+            if progress is not None:
+                progress(checkpoint, rescored)
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+
+    db.session.delete(checkpoint)
+    db.session.commit()
+    return checkpoint, rescored
+
+@app.cli.command('rescore-analyses')
+@click.option('--engine', default=None,
+              help=f"Convert every analysis to this keyword scoring engine ({', '.join(SCORING_ENGINES)}); "
+                   f"by default each is scored with the engine it was scored with.")
+@click.option('--workers', default=RESCORE_WORKERS, show_default=True,
+              help='Scoring processes; 0 scores in this process.')
+@click.option('--chunk-size', default=RESCORE_CHUNK_SIZE, show_default=True,
+              help='Analysis rows per read and per transaction.')
+@click.option('--restart', is_flag=True, help='Start over instead of continuing an interrupted run.')
+def rescore_analyses_command(engine, workers, chunk_size, restart):
+    """Score all stored analyses again after a change to the scoring, continuing an interrupted run."""
+    started = time.monotonic()
+
+    def report(checkpoint, rescored):
+        elapsed = time.monotonic() - started
+        click.echo(f"Rescored {checkpoint.rescored} analyses (up to #{checkpoint.last_analysis_id}), "
+                   f"{checkpoint.changed} with new scores, {rescored / elapsed:.0f} rows/s")
+
+    try:
+        checkpoint, rescored = rescore_analyses(scoring_engine(engine) if engine else None, workers,
+                                                max(1, chunk_size), restart, progress=report)
+    except ValueError as e:
+        raise click.UsageError(str(e))
+    elapsed = time.monotonic() - started
+    click.echo(f"Rescored {checkpoint.rescored} analyses in {elapsed:.1f}s ({rescored / elapsed:.0f} rows/s), "
+               f"{checkpoint.changed} with new scores")
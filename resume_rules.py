@@ -0,0 +1,123 @@
+import re
+from collections import Counter, namedtuple
+
+# A heuristic of the grammar and format scores. scope 'text' rules record
+# whether the text matches at all, 'sentence' rules in how many sentences
+# they match. A rule matches any of its keywords (plain substrings), its
+# regular expression, or, with first_character, a test of the first
+# character of each sentence. lowercase rules look at text.lower().
+# Sentence patterns list in starts the characters a match can begin with,
+# none of . ! or ?, and no two rules may share one.
+Rule = namedtuple('Rule', ['scope', 'keywords', 'pattern', 'lowercase', 'first_character', 'starts'],
+                  defaults=[(), None, False, None, ''])
+
+RULES = {
+    # Grammar issues, each counted once per sentence
+    'lowercase_start': Rule('sentence', first_character=str.islower),
+    'double_space': Rule('sentence', pattern=r'  (?=\s*[^\s.!?])', starts=' '),
+    'missing_space': Rule('sentence', pattern=r'[,;:](?=[A-Za-z])', starts=',;:'),
+    'action_verb': Rule('text', pattern=r'\b(developed|implemented|managed|led|created|designed)\b', lowercase=True),
+
+    # Resume sections
+    'experience_section': Rule('text', keywords=('experience', 'work experience', 'employment', 'career'), lowercase=True),
+    'education_section': Rule('text', keywords=('education', 'academic', 'degree', 'university'), lowercase=True),
+    'skills_section': Rule('text', keywords=('skills', 'technical skills', 'competencies', 'technologies'), lowercase=True),
+    'contact_section': Rule('text', keywords=('contact', 'email', 'phone', 'address'), lowercase=True),
+    'summary_section': Rule('text', keywords=('summary', 'objective', 'profile', 'about'), lowercase=True),
+
+    # Formatting and content
+    'bullet': Rule('text', keywords=('•', '▪', '◦', '-', '*')),
+    'year': Rule('text', pattern=r'\b(19|20)\d{2}\b'),
+    'professional_term': Rule('text', keywords=('project', 'team', 'client', 'company', 'organization', 'department'),
+                              lowercase=True),
+    # \b\d+%|\b\d+\s*(years?|months?|projects?|clients?)\b, led by \d so the search skips to digits
+    'quantity': Rule('text', pattern=r'\d(?<!\w\d)\d*(?:%|\s*(?:years?|months?|projects?|clients?)\b)', lowercase=True),
+}
+
+SECTION_RULES = ('experience_section', 'education_section', 'skills_section', 'contact_section', 'summary_section')
+
+# Sentences are what re.split(r'[.!?]+', text) returns, stripped
+SENTENCE_ENDS = '.!?'
+LEADING_SPACE = re.compile(r'\s*')
+
+# counts maps each rule that matched to 1 ('text' rules) or to the number
+# of sentences it matched in ('sentence' rules); sentence i is
+# text[sentence_starts[i]:sentence_ends[i]], without surrounding whitespace
+RuleHits = namedtuple('RuleHits', ['counts', 'sentence_starts', 'sentence_ends'])
+
+def compile_sentence_scanner(sentence_rules):
+    """
+    One regular expression finding sentence breaks and the matches of all
+    sentence rules in a single pass. Every alternative begins by consuming
+    one of the breaks' or rules' first characters, which lets the search
+    skip straight over the text in between. A break also consumes the
+    whitespace after it, so rules never match outside a stripped sentence.
+    """
+    candidates = SENTENCE_ENDS
+    branches = [f"(?<=[{SENTENCE_ENDS}])(?P<sentence_break>[{SENTENCE_ENDS}]*\\s*)"]
+    for name, rule in sentence_rules:
+        if not rule.starts or set(rule.starts) & set(candidates):
+            raise ValueError(f"Sentence rule {name} needs start characters of its own")
+        candidates += rule.starts
+        # The lookahead, inside a lookbehind over the consumed character, matches the rule from there
+        branches.append(f"(?<=(?=(?P<{name}>{rule.pattern})).)")
+    return re.compile(f"[{re.escape(candidates)}](?:{'|'.join(branches)})")
+
+class RuleScanner:
+    """
+    Evaluates a rule table over a text in one call. Rules are compiled once;
+    a scan shares one lowercased copy of the text and one pass for sentence
+    boundaries between all rules. Text rules stop at their first match.
+    """
+
+    def __init__(self, rules):
+        self.rules = rules
+        self.text_rules = []
+        self.first_character_rules = []
+        sentence_rules = []
+        for name, rule in rules.items():
+            if rule.first_character is not None:
+                self.first_character_rules.append((name, rule.first_character))
+            elif rule.scope == 'sentence':
+                sentence_rules.append((name, rule))
+            else:
+                pattern = re.compile(rule.pattern) if rule.pattern is not None else None
+                self.text_rules.append((name, rule.keywords, pattern, rule.lowercase))
+        self.sentence_scanner = compile_sentence_scanner(sentence_rules)
+        self.sentence_rules = [name for name, _ in sentence_rules]
+
+    def scan(self, text, lowered=None):
+        """RuleHits of text; lowered is text.lower(), when the caller has it already"""
+        counts = Counter()
+        if lowered is None:
+            lowered = text.lower()
+
+        for name, keywords, pattern, lowercase in self.text_rules:
+            subject = lowered if lowercase else text
+            if any(keyword in subject for keyword in keywords) or (pattern is not None and pattern.search(subject)):
+                counts[name] = 1
+
+        # One pass finds the sentence breaks and every sentence rule match
+        starts = [LEADING_SPACE.match(text).end()]
+        ends = []
+        matched = {name: set() for name in self.sentence_rules}
+        for match in self.sentence_scanner.finditer(text, starts[0]):
+            name = match.lastgroup
+            if name == 'sentence_break':
+                ends.append(match.start())
+                starts.append(match.end())
+            else:
+                matched[name].add(len(starts))
+        ends.append(len(text))
+
+        for name, test in self.first_character_rules:
+            count = sum(1 for start, end in zip(starts, ends) if start < end and test(text[start]))
+            if count:
+                counts[name] = count
+        for name, sentences in matched.items():
+            if sentences:
+                counts[name] = len(sentences)
+
+        return RuleHits(counts, starts, ends)
+
+rule_scanner = RuleScanner(RULES)
@@ -1,155 +1,492 @@
 import os
-import json
 import logging
 import zipfile
+import shutil
 import tempfile
-from flask import render_template, request, redirect, url_for, flash, jsonify, send_file
+from concurrent.futures import ThreadPoolExecutor
+from flask import (render_template, request, redirect, url_for, flash, jsonify, send_file, stream_with_context, g,
+                   Response)
 from werkzeug.utils import secure_filename
+from werkzeug.exceptions import RequestEntityTooLarge
 from app import app, db
-from models import Analysis
-from file_processor import process_file
+from models import Analysis, AnalysisJob, ResumeContent, JobDescriptionContent
+from content_store import store_content, store_contents
+from file_processor import upload_source, stream_size, UPLOAD_SPOOL_THRESHOLD
+from text_cache import extract_text_cached, text_cache_stats
+from extraction_pool import ExtractionError, extraction_pool
 from analyzer import analyze_resume
-from ai_suggestions import get_ai_suggestions
+from prepared_document import PreparedDocument
+from scoring import score_keywords, scoring_engine, DEFAULT_SCORING_ENGINE, SCORING_ENGINE_LABELS
+from job_profile import get_job_profile, job_profile_stats
+from cache import cache_stats
+from suggestion_cache import suggestion_cache_stats
+from jobs import job_queue, describe_job
+from analysis_history import (list_analyses, listing_options, filter_options, keyword_report,
+                              DEFAULT_REPORT_SIZE, MAX_REPORT_SIZE)
+from search_index import top_candidates, search_index_stats, MAX_TOP_K
+from ai_suggestions import get_fallback_suggestions, llm_gateway
 from pdf_generator import generate_analysis_pdf
+from report_cache import cached_report, analysis_report_data, report_etag, report_cache_stats
+from report_export import report_zip_stream, write_merged_report, missing_analyses, export_path
+from metrics import Histogram, Counter, timed_stage, stage_seconds, register_collector, render_metrics
 import time
 
 ALLOWED_EXTENSIONS = {'pdf', 'docx'}
 
+request_seconds = Histogram('http_request_duration_seconds', 'Time to produce a response, per endpoint', ['endpoint'])
+requests_total = Counter('http_requests_total', 'Responses per endpoint and status code', ['endpoint', 'status'])
+
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+def is_zip_file(filename):
+    return '.' in filename and filename.rsplit('.', 1)[1].lower() == 'zip'
+
+class TooManyBatchFiles(Exception):
+    """A batch holds more resumes than BATCH_MAX_FILES"""
+
 @app.route('/')
 def index():
-    return render_template('index.html')
+    return render_template('index.html', default_scoring_engine=DEFAULT_SCORING_ENGINE)
+
+def read_analysis_form():
+    """
+    Validate the single-resume analysis form.
+    Returns (file, job_description, scoring engine, error message or None)
+    """
+    if 'resume' not in request.files:
+        return None, None, None, 'No resume file uploaded'
+    
+    file = request.files['resume']
+    job_description = request.form.get('job_description', '').strip()
+    
+    if file.filename == '':
+        return None, None, None, 'No file selected'
+    
+    if not job_description:
+        return None, None, None, 'Job description is required'
+    
+    if not allowed_file(file.filename):
+        return None, None, None, 'Only PDF and DOCX files are allowed'
+    
+    engine, error = read_scoring_engine()
+    if error:
+        return None, None, None, error
+    
+    return file, job_description, engine, None
+
+def read_scoring_engine():
+    """Scoring engine requested in the form or query string: (engine, error or None)"""
+    try:
+        return scoring_engine(request.values.get('scoring')), None
+    except ValueError as e:
+        return None, str(e)
 
 @app.route('/analyze', methods=['POST'])
 def analyze():
     try:
         # Validate form data
-        if 'resume' not in request.files:
-            flash('No resume file uploaded', 'error')
+        file, job_description, engine, error = read_analysis_form()
+        if error:
+            flash(error, 'error')
             return redirect(url_for('index'))
         
-        file = request.files['resume']
-        job_description = request.form.get('job_description', '').strip()
-        
-        if file.filename == '':
-            flash('No file selected', 'error')
-            return redirect(url_for('index'))
+        # Process the file straight from the upload; only very large
+        # uploads are spooled to disk
+        with upload_source(file.stream, file.filename, app.config['UPLOAD_FOLDER']) as source:
+            resume_text = extract_text_cached(source, file.filename)
         
-        if not job_description:
-            flash('Job description is required', 'error')
+        if not resume_text.strip():
+            flash('Could not extract text from the uploaded file', 'error')
             return redirect(url_for('index'))
         
-        if not allowed_file(file.filename):
-            flash('Only PDF and DOCX files are allowed', 'error')
-            return redirect(url_for('index'))
+        # Analyze the resume against the cached job profile; every stage
+        # shares one lowercased, tokenized copy of the resume
+        document = PreparedDocument(resume_text)
+        job_profile = get_job_profile(job_description)
+        keyword_analysis = score_keywords([document], job_profile, engine)[0]
+        analysis_result = analyze_resume(document, job_description, job_profile.keywords, keyword_analysis)
         
-        # Save uploaded file
-        original_filename = file.filename or "resume"
-        filename = secure_filename(original_filename)
-        timestamp = str(int(time.time()))
-        filename = f"{timestamp}_{filename}"
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        file.save(filepath)
+        # Save the scores right away; AI suggestions are generated by a
+        # background job while the results page polls for them
+        analysis = Analysis.from_result(file.filename or "resume",
+                                        store_content(JobDescriptionContent, job_description),
+                                        store_content(ResumeContent, resume_text),
+                                        analysis_result, None)
         
-        try:
-            # Process the file
-            resume_text = process_file(filepath)
-            
-            if not resume_text.strip():
-                flash('Could not extract text from the uploaded file', 'error')
-                return redirect(url_for('index'))
-            
-            # Analyze the resume
-            analysis_result = analyze_resume(resume_text, job_description)
-            
-            # Get AI suggestions
-            ai_suggestions = get_ai_suggestions(resume_text, job_description)
-            
-            # Save analysis to database
-            analysis = Analysis()
-            analysis.filename = file.filename or "resume"
-            analysis.job_description = job_description
-            analysis.resume_text = resume_text
-            analysis.keyword_score = analysis_result['keyword_score']
-            analysis.grammar_score = analysis_result['grammar_score']
-            analysis.format_score = analysis_result['format_score']
-            analysis.total_score = analysis_result['total_score']
-            analysis.matching_keywords = json.dumps(analysis_result['matching_keywords'])
-            analysis.missing_keywords = json.dumps(analysis_result['missing_keywords'])
-            analysis.ai_suggestions = json.dumps(ai_suggestions)
-            
-            db.session.add(analysis)
+        db.session.add(analysis)
+        with timed_stage('db_commit'):
             db.session.commit()
-            
-            return redirect(url_for('results', analysis_id=analysis.id))
-            
-        finally:
-            # Clean up uploaded file
-            if os.path.exists(filepath):
-                os.remove(filepath)
+        
+        job_queue.submit_suggestions(analysis)
+        
+        return redirect(url_for('results', analysis_id=analysis.id))
+    
+    except ExtractionError as e:
+        flash(str(e), 'error')
+        return redirect(url_for('index'))
                 
     except Exception as e:
         logging.error(f"Error during analysis: {str(e)}")
         flash('An error occurred during analysis. Please try again.', 'error')
         return redirect(url_for('index'))
 
+@app.route('/analyze/batch', methods=['POST'])
+def analyze_batch():
+    """
+    Score one job description against many resumes in a single request.
+    Accepts several 'resumes' files and/or ZIP archives of PDF/DOCX files
+    and returns the stored analyses ranked by total score.
+    """
+    # Batches are allowed to be larger than single uploads
+    request.max_content_length = app.config['MAX_BATCH_CONTENT_LENGTH']
+
+    try:
+        job_description = request.form.get('job_description', '').strip()
+        uploads = [f for f in request.files.getlist('resumes') if f and f.filename]
+    except RequestEntityTooLarge:
+        # The app-wide 413 handler redirects to the upload form; this endpoint answers in JSON
+        max_mb = app.config['MAX_BATCH_CONTENT_LENGTH'] // (1024 * 1024)
+        return jsonify({'error': f"Batch upload too large (max {max_mb}MB)"}), 413
+
+    if not job_description:
+        return jsonify({'error': 'Job description is required'}), 400
+
+    engine, error = read_scoring_engine()
+    if error:
+        return jsonify({'error': error}), 400
+
+    if not uploads:
+        return jsonify({'error': 'No resume files uploaded'}), 400
+
+    try:
+        with ThreadPoolExecutor(max_workers=app.config['BATCH_WORKERS']) as executor:
+            with tempfile.TemporaryDirectory(dir=app.config['UPLOAD_FOLDER']) as batch_dir:
+                try:
+                    batch_files, errors = collect_batch_files(uploads, batch_dir)
+                except zipfile.BadZipFile:
+                    return jsonify({'error': 'Uploaded ZIP archive is not valid'}), 400
+                except TooManyBatchFiles:
+                    return jsonify({'error': f"Too many resumes in one batch (max {app.config['BATCH_MAX_FILES']})"}), 400
+
+                if not batch_files:
+                    return jsonify({'error': 'No PDF or DOCX resumes found in upload', 'errors': errors}), 400
+
+                outcomes = list(executor.map(lambda item: extract_batch_file(*item), batch_files))
+
+            extracted = []
+            for filename, resume_text, error in outcomes:
+                if resume_text is None:
+                    errors.append({'filename': filename, 'error': error})
+                else:
+                    extracted.append((filename, resume_text))
+
+            # Tokenize the job description once and score the whole batch in one pass
+            job_profile = get_job_profile(job_description)
+            job_keywords = job_profile.keywords
+            documents = [PreparedDocument(resume_text) for _, resume_text in extracted]
+            keyword_analyses = score_keywords(documents, job_profile, engine)
+
+            # Grammar, format and rule scans of each resume on the same pool
+            results = list(executor.map(
+                lambda item: analyze_resume(item[0], job_description, job_keywords, item[1]),
+                zip(documents, keyword_analyses)
+            ))
+
+        # Per-resume AI calls would make a batch take minutes, so batch
+        # analyses are stored with the standard suggestions
+        fallback_suggestions = get_fallback_suggestions()
+
+        # Every row of the batch shares one stored job description
+        job_description_hash = store_content(JobDescriptionContent, job_description)
+        resume_hashes = store_contents(ResumeContent, [resume_text for _, resume_text in extracted])
+
+        analyses = [Analysis.from_result(filename, job_description_hash, resume_hash, result, fallback_suggestions)
+                    for (filename, _), resume_hash, result in zip(extracted, resume_hashes, results)]
+
+        # Single bulk insert for the whole batch
+        db.session.add_all(analyses)
+        with timed_stage('db_commit'):
+            db.session.commit()
+
+        ranked = sorted(analyses, key=lambda a: a.total_score, reverse=True)
+        return jsonify({
+            'count': len(ranked),
+            'job_keywords': len(job_keywords),
+            'scoring_engine': engine,
+            'results': [
+                {
+                    'rank': rank,
+                    'analysis_id': analysis.id,
+                    'filename': analysis.filename,
+                    'total_score': analysis.total_score,
+                    'keyword_score': analysis.keyword_score,
+                    'grammar_score': analysis.grammar_score,
+                    'format_score': analysis.format_score,
+                    'scoring_engine': analysis.scoring_engine,
+                    'results_url': url_for('results', analysis_id=analysis.id)
+                }
+                for rank, analysis in enumerate(ranked, 1)
+            ],
+            'errors': errors
+        })
+
+    except Exception as e:
+        db.session.rollback()
+        logging.error(f"Error during batch analysis: {str(e)}")
+        return jsonify({'error': 'An error occurred during batch analysis. Please try again.'}), 500
+
+def collect_batch_files(uploads, batch_dir):
+    """
+    Gather uploaded resumes (and the resumes inside any ZIP archives).
+    Returns a list of (display name, source) where source is the file's
+    bytes, or a path in batch_dir for files above UPLOAD_SPOOL_THRESHOLD,
+    and a list of errors for entries that were skipped. Raises
+    TooManyBatchFiles before reading a resume past BATCH_MAX_FILES.
+    """
+    batch_files = []
+    errors = []
+
+    def spool_path(name):
+        return os.path.join(batch_dir, f"{len(batch_files)}_{secure_filename(name) or 'resume'}")
+
+    def check_limit():
+        if len(batch_files) >= app.config['BATCH_MAX_FILES']:
+            raise TooManyBatchFiles()
+
+    for upload in uploads:
+        if is_zip_file(upload.filename):
+            with zipfile.ZipFile(upload.stream) as archive:
+                for member in archive.infolist():
+                    name = os.path.basename(member.filename)
+                    if member.is_dir() or not name or member.filename.startswith('__MACOSX/'):
+                        continue
+                    if not allowed_file(name):
+                        errors.append({'filename': name, 'error': 'Only PDF and DOCX files are allowed'})
+                        continue
+                    if member.file_size > app.config['MAX_CONTENT_LENGTH']:
+                        errors.append({'filename': name, 'error': 'File too large'})
+                        continue
+                    check_limit()
+                    if member.file_size <= UPLOAD_SPOOL_THRESHOLD:
+                        batch_files.append((name, archive.read(member)))
+                        continue
+                    path = spool_path(name)
+                    with archive.open(member) as source, open(path, 'wb') as target:
+                        shutil.copyfileobj(source, target)
+                    batch_files.append((name, path))
+        elif allowed_file(upload.filename):
+            check_limit()
+            if stream_size(upload.stream) <= UPLOAD_SPOOL_THRESHOLD:
+                batch_files.append((upload.filename, upload.stream.read()))
+                continue
+            path = spool_path(upload.filename)
+            upload.save(path)
+            batch_files.append((upload.filename, path))
+        else:
+            errors.append({'filename': upload.filename, 'error': 'Only PDF and DOCX files are allowed'})
+
+    return batch_files, errors
+
+def extract_batch_file(filename, source):
+    """
+    Extract the text of one resume of a batch. Returns (filename, resume_text,
+    None), or (filename, None, error message) on failure.
+    """
+    try:
+        # Worker threads need their own app context for the text cache table
+        with app.app_context():
+            resume_text = extract_text_cached(source, filename)
+        if not resume_text.strip():
+            return filename, None, 'Could not extract text from the uploaded file'
+        return filename, resume_text, None
+    except ExtractionError as e:
+        return filename, None, str(e)
+    except Exception as e:
+        logging.error(f"Error analyzing batch file {filename}: {str(e)}")
+        return filename, None, 'Could not process the uploaded file'
+
+@app.route('/jobs', methods=['POST'])
+def submit_job():
+    """Queue an analysis and return its job id immediately"""
+    file, job_description, engine, error = read_analysis_form()
+    if error:
+        return jsonify({'error': error}), 400
+    
+    try:
+        job_id = job_queue.submit(file.filename or "resume", file.read(), job_description, engine)
+    except Exception as e:
+        db.session.rollback()
+        logging.error(f"Error queueing analysis job: {str(e)}")
+        return jsonify({'error': 'An error occurred during analysis. Please try again.'}), 500
+    
+    return jsonify({
+        'job_id': job_id,
+        'status_url': url_for('job_status', job_id=job_id)
+    }), 202
+
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    """Current stage of a queued analysis, with the results URL once done"""
+    job = db.get_or_404(AnalysisJob, job_id)
+    return jsonify(describe_job(job))
+
 @app.route('/results/<int:analysis_id>')
 def results(analysis_id):
     analysis = Analysis.query.get_or_404(analysis_id)
     
-    # Parse JSON data
-    matching_keywords = json.loads(analysis.matching_keywords)
-    missing_keywords = json.loads(analysis.missing_keywords)
-    ai_suggestions = json.loads(analysis.ai_suggestions)
-    
+    # ai_suggestions is still None while the suggestions job is running; the page polls for them
     return render_template('results.html',
                          analysis=analysis,
-                         matching_keywords=matching_keywords,
-                         missing_keywords=missing_keywords,
-                         ai_suggestions=ai_suggestions)
+                         matching_keywords=analysis.matching_keywords or [],
+                         missing_keywords=analysis.missing_keywords or [],
+                         ai_suggestions=analysis.ai_suggestions,
+                         scoring_engine_label=SCORING_ENGINE_LABELS.get(analysis.scoring_engine, analysis.scoring_engine))
+
+@app.route('/results/<int:analysis_id>/suggestions')
+def results_suggestions(analysis_id):
+    """AI suggestions for a results page, rendered once they are ready"""
+    analysis = db.get_or_404(Analysis, analysis_id)
+    
+    if analysis.ai_suggestions is None:
+        return jsonify({'ready': False})
+    
+    return jsonify({
+        'ready': True,
+        'html': render_template('_ai_suggestions.html', ai_suggestions=analysis.ai_suggestions)
+    })
 
 @app.route('/download/<int:analysis_id>')
 def download_pdf(analysis_id):
-    """Download analysis results as PDF"""
+    """Download analysis results as PDF, from the report cache once the analysis is complete"""
     try:
         analysis = Analysis.query.get_or_404(analysis_id)
         
-        # Prepare data for PDF generation
-        analysis_data = {
-            'filename': analysis.filename,
-            'job_description': analysis.job_description,
-            'resume_text': analysis.resume_text,
-            'keyword_score': analysis.keyword_score,
-            'grammar_score': analysis.grammar_score,
-            'format_score': analysis.format_score,
-            'total_score': analysis.total_score,
-            'matching_keywords': analysis.matching_keywords,
-            'missing_keywords': analysis.missing_keywords,
-            'ai_suggestions': analysis.ai_suggestions,
-            'created_at': analysis.created_at.strftime('%Y-%m-%d %H:%M:%S') if analysis.created_at else 'Unknown'
-        }
-        
-        # Generate PDF
-        pdf_buffer = generate_analysis_pdf(analysis_data)
-        
         # Create filename with timestamp
         timestamp = time.strftime('%Y%m%d_%H%M%S')
         filename = f"resume_analysis_report_{timestamp}.pdf"
         
-        return send_file(
-            pdf_buffer,
+        # While AI suggestions are being generated the report shows the
+        # fallback ones, so it is rendered afresh and not cached
+        if analysis.ai_suggestions is None:
+            response = send_file(
+                generate_analysis_pdf(analysis_report_data(analysis)),
+                as_attachment=True,
+                download_name=filename,
+                mimetype='application/pdf'
+            )
+            response.cache_control.no_store = True
+            return response
+        
+        etag = report_etag(analysis)
+        if request.if_none_match.contains_weak(etag):
+            response = app.response_class(status=304)
+            response.set_etag(etag, weak=True)
+            return response
+        
+        # Streamed from disk rather than read into memory
+        response = send_file(
+            cached_report(analysis),
             as_attachment=True,
             download_name=filename,
-            mimetype='application/pdf'
+            mimetype='application/pdf',
+            etag=False,
+            conditional=False
         )
+        # Weak: a re-render after eviction has a new timestamp in the footer
+        response.set_etag(etag, weak=True)
+        response.cache_control.no_cache = True
+        return response.make_conditional(request, accept_ranges=True, complete_length=response.content_length)
         
     except Exception as e:
         logging.error(f"Error generating PDF: {e}")
         flash('Error generating PDF report. Please try again.', 'error')
         return redirect(url_for('results', analysis_id=analysis_id))
 
+@app.route('/download/reports', methods=['GET', 'POST'])
+def download_reports():
+    """
+    Reports of a shortlist of analyses (ids: comma separated analysis ids) in
+    one download: a ZIP of the individual reports, streamed as they are
+    rendered, or with format=pdf a single PDF opening with a summary table.
+    A merged PDF of more than REPORT_MERGE_INLINE_MAX analyses is built by
+    the job queue instead; the response is then the job to poll, whose
+    status gives the download_url once the PDF is ready.
+    """
+    try:
+        analysis_ids = list(dict.fromkeys(
+            int(analysis_id) for value in request.values.getlist('ids')
+            for analysis_id in value.split(',') if analysis_id.strip()
+        ))
+    except ValueError:
+        return jsonify({'error': 'ids must be comma separated analysis ids'}), 400
+    if not analysis_ids:
+        return jsonify({'error': 'At least one analysis id is required'}), 400
+    if len(analysis_ids) > app.config['REPORT_EXPORT_MAX_ANALYSES']:
+        return jsonify({'error': f"At most {app.config['REPORT_EXPORT_MAX_ANALYSES']} reports can be exported at once"}), 400
+
+    export_format = request.values.get('format', 'zip')
+    if export_format not in ('zip', 'pdf'):
+        return jsonify({'error': 'format must be zip or pdf'}), 400
+
+    missing = missing_analyses(analysis_ids)
+    if missing:
+        return jsonify({'error': f"Unknown analysis ids: {', '.join(str(analysis_id) for analysis_id in missing)}"}), 404
+
+    timestamp = time.strftime('%Y%m%d_%H%M%S')
+    if export_format == 'zip':
+        response = app.response_class(stream_with_context(report_zip_stream(analysis_ids)), mimetype='application/zip')
+        response.headers['Content-Disposition'] = f'attachment; filename="resume_analysis_reports_{timestamp}.zip"'
+        return response
+
+    if len(analysis_ids) > app.config['REPORT_MERGE_INLINE_MAX']:
+        try:
+            job_id = job_queue.submit_export(analysis_ids)
+        except Exception as e:
+            db.session.rollback()
+            logging.error(f"Error queueing report export: {str(e)}")
+            return jsonify({'error': 'An error occurred while generating the reports. Please try again.'}), 500
+        return jsonify({
+            'job_id': job_id,
+            'status_url': url_for('job_status', job_id=job_id)
+        }), 202
+
+    fd, merged_path = tempfile.mkstemp(suffix='.pdf')
+    os.close(fd)
+    try:
+        write_merged_report(analysis_ids, merged_path)
+        response = send_file(
+            merged_path,
+            as_attachment=True,
+            download_name=f"resume_analysis_reports_{timestamp}.pdf",
+            mimetype='application/pdf'
+        )
+    except Exception as e:
+        os.unlink(merged_path)
+        logging.error(f"Error generating merged PDF report: {str(e)}")
+        return jsonify({'error': 'An error occurred while generating the reports. Please try again.'}), 500
+    response.call_on_close(lambda: os.unlink(merged_path))
+    return response
+
+@app.route('/download/reports/<job_id>')
+def download_export(job_id):
+    """The merged PDF built by a queued report export, once its job has completed"""
+    job = db.get_or_404(AnalysisJob, job_id)
+    if job.export_ids is None:
+        return jsonify({'error': 'Not a report export'}), 404
+    if job.status != 'completed':
+        return jsonify(describe_job(job)), 409
+
+    path = export_path(job.id)
+    if not os.path.exists(path):
+        return jsonify({'error': 'The export is no longer available'}), 404
+    return send_file(
+        path,
+        as_attachment=True,
+        download_name=f"resume_analysis_reports_{job.created_at.strftime('%Y%m%d_%H%M%S')}.pdf",
+        mimetype='application/pdf'
+    )
+
 @app.route('/download-source')
 def download_source():
     """Download complete source code as ZIP"""
@@ -206,6 +543,187 @@ def download_source():
         flash('Error creating source download. Please try again.', 'error')
         return redirect(url_for('index'))
 
+def all_cache_stats():
+    """Counters of every cache keyed by cache name, including their database tiers"""
+    stats = cache_stats()
+    stats['job_profiles'] = job_profile_stats()
+    stats['ai_suggestions'] = suggestion_cache_stats()
+    stats['extracted_text'] = text_cache_stats()
+    stats['pdf_reports'] = report_cache_stats()
+    return stats
+
+@app.route('/api/cache-stats')
+def cache_statistics():
+    """Hit/miss counters of the in-process caches, for tuning cache sizes"""
+    return jsonify(all_cache_stats())
+
+@app.route('/api/analyses')
+def analysis_history():
+    """
+    Past analyses a page at a time, newest (or with sort=total_score, best
+    scoring among one scoring engine's analyses) first. Filters:
+    created_after, created_before, min_score, max_score,
+    job_description_hash, scoring_engine, matching_keyword, missing_keyword;
+    pass next_cursor back as cursor.
+    """
+    try:
+        options = listing_options(request.args, DEFAULT_SCORING_ENGINE)
+        rows, next_cursor = list_analyses(**options)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        logging.error(f"Error listing analyses: {str(e)}")
+        return jsonify({'error': 'An error occurred while listing analyses. Please try again.'}), 500
+
+    return jsonify({
+        'count': len(rows),
+        'next_cursor': next_cursor,
+        'results': [
+            {
+                'analysis_id': row.id,
+                'filename': row.filename,
+                'job_description_hash': row.job_description_hash,
+                'keyword_score': row.keyword_score,
+                'grammar_score': row.grammar_score,
+                'format_score': row.format_score,
+                'total_score': row.total_score,
+                'scoring_engine': row.scoring_engine,
+                'created_at': row.created_at.isoformat() if row.created_at else None,
+                'results_url': url_for('results', analysis_id=row.id)
+            }
+            for row in rows
+        ]
+    })
+
+@app.route('/api/keyword-report')
+def keyword_statistics():
+    """Most often matched and missing keywords, over analyses selected by the /api/analyses filters"""
+    try:
+        options = filter_options(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    try:
+        limit = min(max(int(request.args.get('limit', DEFAULT_REPORT_SIZE)), 1), MAX_REPORT_SIZE)
+    except ValueError:
+        return jsonify({'error': 'limit must be a number'}), 400
+
+    try:
+        return jsonify(keyword_report(limit, **options))
+    except Exception as e:
+        db.session.rollback()
+        logging.error(f"Error building keyword report: {str(e)}")
+        return jsonify({'error': 'An error occurred while building the keyword report. Please try again.'}), 500
+
+@app.route('/api/candidates', methods=['POST'])
+def candidates():
+    """Best matching stored resumes for a job description, from the search index"""
+    job_description = request.values.get('job_description', '').strip()
+    if not job_description:
+        return jsonify({'error': 'Job description is required'}), 400
+
+    try:
+        k = min(max(int(request.values.get('k', 10)), 1), MAX_TOP_K)
+    except ValueError:
+        return jsonify({'error': 'k must be a number'}), 400
+
+    try:
+        # New analyses are indexed by the job queue while it is idle
+        ranked = top_candidates(job_description, k)
+
+        rows = db.session.execute(
+            db.select(Analysis.id, Analysis.filename, Analysis.total_score, Analysis.created_at)
+            .where(Analysis.id.in_([analysis_id for analysis_id, _ in ranked]))
+        ).all()
+        details = {row.id: row for row in rows}
+
+        return jsonify({
+            'count': len(ranked),
+            'indexed_resumes': search_index_stats()['resumes'],
+            'results': [
+                {
+                    'rank': rank,
+                    'analysis_id': analysis_id,
+                    'filename': details[analysis_id].filename,
+                    'match_score': score,
+                    'total_score': details[analysis_id].total_score,
+                    'created_at': details[analysis_id].created_at.isoformat() if details[analysis_id].created_at else None,
+                    'results_url': url_for('results', analysis_id=analysis_id)
+                }
+                for rank, (analysis_id, score) in enumerate(ranked, 1)
+                if analysis_id in details
+            ]
+        })
+
+    except Exception as e:
+        db.session.rollback()
+        logging.error(f"Error searching candidates: {str(e)}")
+        return jsonify({'error': 'An error occurred while searching candidates. Please try again.'}), 500
+
+@app.route('/api/llm-stats')
+def llm_statistics():
+    """Concurrency, latency, fallback and circuit breaker state of the AI gateway"""
+    return jsonify(llm_gateway.stats())
+
+@app.route('/api/extraction-stats')
+def extraction_statistics():
+    """Limits, timeouts and worker crashes of the sandboxed extraction pool"""
+    return jsonify(extraction_pool.stats())
+
+@app.route('/api/stage-stats')
+def stage_statistics():
+    """Call count and p50/p95/p99 latency of each analysis pipeline stage in this process"""
+    return jsonify(stage_seconds.stats())
+
+@app.route('/metrics')
+def metrics():
+    """Stage and request latencies plus cache, AI gateway and extraction counters for Prometheus"""
+    return Response(render_metrics(), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request(response):
+    """Request latency and status per endpoint; a streamed body is timed until its first byte"""
+    started = g.pop('request_started', None)
+    if started is not None:
+        endpoint = request.endpoint or 'unmatched'
+        request_seconds.observe(time.perf_counter() - started, endpoint)
+        requests_total.inc(endpoint, str(response.status_code))
+    return response
+
+# Cache counters exported per cache, with the stats key each one is read from
+CACHE_METRICS = (
+    ('cache_hits_total', 'counter', 'Lookups answered from memory (pdf_reports: from disk)', 'hits'),
+    ('cache_misses_total', 'counter', 'Lookups not answered from memory (pdf_reports: from disk)', 'misses'),
+    ('cache_db_hits_total', 'counter', 'Memory misses answered from the database', 'db_hits'),
+    ('cache_evictions_total', 'counter', 'Entries evicted to stay within the size limit', 'evictions'),
+    ('cache_entries', 'gauge', 'Entries held in memory', 'size'),
+)
+
+def collect_service_metrics():
+    """Samples of the counters the caches, AI gateway and extraction pool already keep"""
+    caches = all_cache_stats()
+    for name, kind, documentation, key in CACHE_METRICS:
+        yield name, kind, documentation, [({'cache': cache}, stats[key])
+                                          for cache, stats in caches.items() if key in stats]
+
+    llm = llm_gateway.stats()
+    yield 'llm_requests_total', 'counter', 'Calls made through the AI gateway', [({}, llm['requests'])]
+    yield 'llm_failures_total', 'counter', 'AI gateway calls that failed upstream', [({}, llm['failures'])]
+    yield 'llm_fallbacks_total', 'counter', 'AI gateway calls answered by the fallback, per reason', [
+        ({'reason': reason}, count) for reason, count in llm['fallbacks'].items()]
+    yield 'llm_in_flight', 'gauge', 'AI gateway calls in progress', [({}, llm['in_flight'])]
+
+    extraction = extraction_pool.stats()
+    yield 'extraction_timeouts_total', 'counter', 'Extractions killed at the time limit', [({}, extraction['timeouts'])]
+    yield 'extraction_crashes_total', 'counter', 'Extraction worker crashes', [({}, extraction['crashes'])]
+
+register_collector(collect_service_metrics)
+
 @app.errorhandler(413)
 def too_large(e):
     flash('File too large. Maximum size is 16MB.', 'error')
@@ -0,0 +1,66 @@
+import logging
+from sqlalchemy import inspect, text
+from sqlalchemy.dialects.postgresql import JSONB
+from app import db
+from models import Analysis, ExtractedText
+
+# Columns added to existing tables after their first release, by table
+ADDED_COLUMNS = {
+    'analysis': {
+        'resume_hash': 'VARCHAR(64)',
+        'job_description_hash': 'VARCHAR(64)',
+        # Rows from before the engines were recorded were all scored by the keyword matcher
+        'scoring_engine': "VARCHAR(20) NOT NULL DEFAULT 'keyword'"
+    },
+    'analysis_job': {
+        # Jobs queued before it was recorded are scored by the keyword matcher
+        'scoring_engine': 'VARCHAR(20)',
+        'export_ids': 'TEXT'
+    },
+    'search_index_state': {
+        # An empty skills_version never matches the dictionary, so an index built before it is rebuilt
+        'skills_version': "VARCHAR(64) NOT NULL DEFAULT ''"
+    },
+    'extracted_text': {
+        # Texts cached before it was tracked are the first to be evicted
+        'last_used_at': 'TIMESTAMP'
+    }
+}
+
+# Models whose indexes are created on tables that already exist
+INDEXED_MODELS = (Analysis, ExtractedText)
+
+# Indexes replaced by ones that also cover scoring_engine
+OBSOLETE_INDEXES = ('ix_analysis_total_score_id', 'ix_analysis_job_description_total_score_id')
+
+# Columns that held json.dumps text before they became native JSON. SQLite
+# stores JSON as text either way; PostgreSQL needs them converted to JSONB
+JSON_COLUMNS = ('matching_keywords', 'missing_keywords', 'ai_suggestions')
+
+def upgrade_schema():
+    """
+    Add the columns, column types and indexes the models gained since an
+    existing database was created. Each step checks first, so this is cheap to run at startup.
+    """
+    inspector = inspect(db.engine)
+    columns = {table: {column['name']: column['type'] for column in inspector.get_columns(table)}
+               for table in ADDED_COLUMNS}
+    with db.engine.begin() as connection:
+        for table, added in ADDED_COLUMNS.items():
+            for name, column_type in added.items():
+                if name not in columns[table]:
+                    logging.info(f"Adding column {table}.{name}")
+                    connection.execute(text(f'ALTER TABLE {table} ADD COLUMN {name} {column_type}'))
+
+        if db.engine.dialect.name == 'postgresql':
+            for name in JSON_COLUMNS:
+                if not isinstance(columns['analysis'][name], JSONB):
+                    logging.info(f"Converting analysis.{name} to JSONB")
+                    connection.execute(text(f'ALTER TABLE analysis ALTER COLUMN {name} TYPE JSONB USING {name}::jsonb'))
+
+        for name in OBSOLETE_INDEXES:
+            connection.execute(text(f'DROP INDEX IF EXISTS {name}'))
+
+        for model in INDEXED_MODELS:
+            for index in model.__table__.indexes:
+                index.create(connection, checkfirst=True)
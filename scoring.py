@@ -0,0 +1,243 @@
+import os
+import logging
+import threading
+import numpy as np
+from scipy import sparse
+from flask import has_app_context
+from sqlalchemy.orm import Session
+from app import db
+from models import Analysis
+from content_store import select_resume_texts, stored_text
+from analyzer import keyword_frequencies, calculate_keyword_match
+from skills import get_skill_matcher
+from metrics import timed
+
+# 'keyword' is the original set-intersection scorer
+SCORING_ENGINES = ('keyword', 'tfidf', 'bm25')
+SCORING_ENGINE_LABELS = {'keyword': 'Keyword match', 'tfidf': 'TF-IDF similarity', 'bm25': 'BM25 relevance'}
+DEFAULT_SCORING_ENGINE = os.environ.get("SCORING_ENGINE", "keyword")
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# The keyword matcher clamps its scores to 55-95. The engines' 0-1 scores are
+# put on the same band, so totals, rankings and report thresholds read the
+# same whatever the engine; the square root spreads out the low similarities
+# most resumes have, roughly like the keyword matcher's bonuses do
+MATCH_FLOOR = 55
+MATCH_CEILING = 95
+
+CORPUS_BATCH_SIZE = 500
+# Most analyses a scoring request tokenizes to catch up; the idle job
+# dispatcher counts the rest in batches of CORPUS_WARM_ROWS
+CORPUS_REQUEST_ROWS = int(os.environ.get("CORPUS_REQUEST_ROWS", 200))
+CORPUS_WARM_ROWS = int(os.environ.get("CORPUS_WARM_ROWS", 2000))
+
+class CorpusStats:
+    """
+    Document frequencies of keywords over the stored Analysis resumes.
+    Brought up to date incrementally: each refresh only tokenizes analyses
+    added since the last one. A new skills dictionary changes the keywords,
+    so it starts the count over. Once the tfidf or bm25 engine is wanted,
+    the idle job dispatcher keeps it warm, so requests only catch up on a
+    few new analyses and never wait for another thread's refresh.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        # Warmed in the background only when an engine that uses it is in play
+        self.wanted = DEFAULT_SCORING_ENGINE != 'keyword'
+        self.reset()
+
+    def reset(self, skills_version=None):
+        self.doc_count = 0
+        self.total_length = 0
+        self.doc_freq = {}
+        self.skills_version = skills_version
+        self._last_id = 0
+
+    def refresh(self, max_rows=None, blocking=True):
+        """
+        Count the analyses added since the last refresh, at most max_rows of
+        them, and return how many were counted. Tokenizing happens outside
+        the lock readers share; without blocking, returns 0 right away while
+        another thread is refreshing.
+        """
+        if not has_app_context() or not self._refresh_lock.acquire(blocking=blocking):
+            return 0
+        try:
+            skills_version = get_skill_matcher().version
+            if skills_version != self.skills_version:
+                with self._lock:
+                    self.reset(skills_version)
+
+            query = (select_resume_texts(Analysis.id)
+                     .where(Analysis.id > self._last_id)
+                     .order_by(Analysis.id)
+                     .execution_options(yield_per=CORPUS_BATCH_SIZE))
+            if max_rows is not None:
+                query = query.limit(max_rows)
+
+            added = CorpusStats()
+            added.reset(skills_version)
+            try:
+                with Session(db.engine) as session:
+                    for analysis_id, content, compression, legacy_text in session.execute(query):
+                        added.add_document(keyword_frequencies(stored_text(content, compression, legacy_text)))
+                        added._last_id = analysis_id
+            except Exception as e:
+                logging.error(f"Error refreshing scoring corpus: {str(e)}")
+
+            if added.doc_count:
+                with self._lock:
+                    self.merge(added)
+            return added.doc_count
+        finally:
+            self._refresh_lock.release()
+
+    def add_document(self, frequencies):
+        self.doc_count += 1
+        self.total_length += sum(frequencies.values())
+        for term in frequencies:
+            self.doc_freq[term] = self.doc_freq.get(term, 0) + 1
+
+    def merge(self, other):
+        """Add the counts of another CorpusStats that continues this one"""
+        self.doc_count += other.doc_count
+        self.total_length += other.total_length
+        for term, count in other.doc_freq.items():
+            self.doc_freq[term] = self.doc_freq.get(term, 0) + count
+        self._last_id = other._last_id
+
+    def average_length(self):
+        return self.total_length / self.doc_count if self.doc_count else 0.0
+
+    def idf(self, terms, engine):
+        """IDF weights for terms as an array; smoothed for tfidf, Robertson-Sparck Jones for bm25"""
+        n = self.doc_count
+        df = np.fromiter((self.doc_freq.get(term, 0) for term in terms), dtype=np.float64, count=len(terms))
+        if engine == 'bm25':
+            return np.log1p((n - df + 0.5) / (df + 0.5))
+        return np.log((1 + n) / (1 + df)) + 1
+
+    def stats(self):
+        return {
+            'documents': self.doc_count,
+            'terms': len(self.doc_freq),
+            'average_length': round(self.average_length(), 1)
+        }
+
+corpus_stats = CorpusStats()
+
+def scoring_engine(name):
+    """Validate a requested engine name; empty means the configured default"""
+    name = (name or DEFAULT_SCORING_ENGINE).strip().lower()
+    if name not in SCORING_ENGINES:
+        raise ValueError(f"Unknown scoring engine: {name}")
+    return name
+
+@timed('score_keywords')
+def score_keywords(resume_texts, job_profile, engine='keyword'):
+    """
+    Keyword analyses of many resumes against one job profile, in the shape
+    returned by calculate_keyword_match (plus the engine used).
+    resume_texts may be PreparedDocuments.
+    """
+    return score_frequencies([keyword_frequencies(text) for text in resume_texts], job_profile, engine)
+
+def score_frequencies(frequencies, job_profile, engine='keyword'):
+    """
+    score_keywords for already tokenized resumes (keyword_frequencies counts).
+    The tfidf and bm25 engines score the whole list with a single sparse
+    matrix-vector product and rank keywords by weight.
+    """
+    job_terms = job_profile.keywords
+    if engine == 'keyword' or not job_terms:
+        return [dict(calculate_keyword_match(list(counts), job_terms), scoring_engine=engine)
+                for counts in frequencies]
+
+    corpus_stats.wanted = True
+    corpus_stats.refresh(max_rows=CORPUS_REQUEST_ROWS, blocking=False)
+    # BM25 only needs the job's terms; cosine similarity needs whole resume vectors
+    matrix, vocabulary = term_matrix(frequencies, job_terms, extend=(engine == 'tfidf'))
+    idf = corpus_stats.idf(vocabulary, engine)
+    job_weights = np.array([job_profile.weights.get(term, 1.0) for term in job_terms])
+
+    if engine == 'tfidf':
+        scores = tfidf_scores(matrix, idf, job_weights)
+    else:
+        lengths = np.array([sum(counts.values()) for counts in frequencies], dtype=np.float64)
+        scores = bm25_scores(matrix, idf, job_weights, lengths, corpus_stats.average_length())
+
+    term_weights = dict(zip(job_terms, idf[:len(job_terms)] * job_weights))
+    return [keyword_analysis(counts, job_terms, term_weights, score, engine)
+            for counts, score in zip(frequencies, scores)]
+
+def term_matrix(frequencies, job_terms, extend=False):
+    """
+    CSR matrix of raw term counts, one row per resume. Columns start with
+    the job terms; with extend=True every other resume term gets a column.
+    """
+    vocabulary = {term: index for index, term in enumerate(job_terms)}
+    indptr = [0]
+    indices = []
+    data = []
+    for counts in frequencies:
+        for term, count in counts.items():
+            column = vocabulary.get(term)
+            if column is None:
+                if not extend:
+                    continue
+                column = vocabulary[term] = len(vocabulary)
+            indices.append(column)
+            data.append(count)
+        indptr.append(len(indices))
+
+    matrix = sparse.csr_matrix(
+        (np.array(data, dtype=np.float64), np.array(indices, dtype=np.int32), np.array(indptr, dtype=np.int64)),
+        shape=(len(frequencies), len(vocabulary))
+    )
+    return matrix, list(vocabulary)
+
+def tfidf_scores(matrix, idf, job_weights):
+    """Cosine similarity (0-1) between sublinear TF-IDF resume vectors and the job vector"""
+    matrix.data = (1 + np.log(matrix.data)) * idf[matrix.indices]
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+
+    query = np.zeros(matrix.shape[1])
+    query[:len(job_weights)] = job_weights * idf[:len(job_weights)]
+    scores = matrix @ query
+
+    denominator = norms * np.linalg.norm(query)
+    return np.divide(scores, denominator, out=np.zeros_like(scores), where=denominator > 0)
+
+def bm25_scores(matrix, idf, job_weights, lengths, average_length):
+    """BM25 divided by its upper bound (every term saturated), so 0-1"""
+    if not average_length:
+        average_length = lengths.mean() or 1.0
+    rows = np.repeat(np.arange(matrix.shape[0]), np.diff(matrix.indptr))
+    norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths / average_length)
+    tf = matrix.data
+    matrix.data = tf * (BM25_K1 + 1) / (tf + norm[rows])
+
+    query = idf * job_weights
+    return (matrix @ query) / (query.sum() * (BM25_K1 + 1))
+
+def calibrated_score(score):
+    """An engine's 0-1 score on the keyword matcher's 55-95 band"""
+    return round(MATCH_FLOOR + (MATCH_CEILING - MATCH_FLOOR) * float(np.sqrt(min(max(score, 0.0), 1.0))), 2)
+
+def keyword_analysis(counts, job_terms, term_weights, score, engine):
+    """calculate_keyword_match-shaped result for one resume's engine score"""
+    matching = [term for term in job_terms if term in counts]
+    missing = sorted((term for term in job_terms if term not in counts),
+                     key=lambda term: term_weights[term], reverse=True)
+    return {
+        'matching_keywords': sorted(matching, key=lambda term: term_weights[term], reverse=True),
+        'missing_keywords': missing,
+        'match_percentage': calibrated_score(score),
+        'total_job_keywords': len(job_terms),
+        'total_matching': len(matching),
+        'scoring_engine': engine
+    }
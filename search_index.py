@@ -0,0 +1,436 @@
+import os
+import json
+import math
+import time
+import uuid
+import shutil
+import logging
+import threading
+from datetime import datetime
+import click
+import numpy as np
+from sqlalchemy import select, update, func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app import app, db
+from models import Analysis, SearchIndexState
+from analyzer import keyword_frequencies
+from job_profile import get_job_profile
+from scoring import BM25_K1, BM25_B
+from skills import get_skill_matcher
+from content_store import select_resume_texts, stored_text
+
+STATE_ID = 1
+MAX_TERM_LENGTH = 100
+INDEX_BATCH_SIZE = int(os.environ.get("SEARCH_INDEX_BATCH_SIZE", 500))
+MAX_SEGMENTS = int(os.environ.get("SEARCH_INDEX_MAX_SEGMENTS", 8))
+MAX_TOP_K = 100
+# Bump whenever what an index document is changes, so existing indexes are rebuilt
+INDEX_FORMAT = 2
+
+class Segment:
+    """
+    One immutable, memory-mapped slice of the inverted index on disk.
+    Postings are grouped by term: doc_ids[offsets[i]:offsets[i + 1]] are the
+    resumes containing terms[i] and tfs their counts; docs and lengths hold
+    every resume of the segment with its total keyword count. A resume's
+    document id is the id of the first Analysis of it.
+    """
+
+    __slots__ = ('name', 'terms', 'index', 'offsets', 'doc_ids', 'tfs', 'docs', 'lengths')
+
+    @classmethod
+    def load(cls, directory, name):
+        path = os.path.join(directory, name)
+        segment = cls()
+        segment.name = name
+        with open(os.path.join(path, 'terms.json'), encoding='utf-8') as f:
+            segment.terms = json.load(f)
+        segment.index = {term: i for i, term in enumerate(segment.terms)}
+        for array in ('offsets', 'doc_ids', 'tfs', 'docs', 'lengths'):
+            setattr(segment, array, np.load(os.path.join(path, f'{array}.npy'), mmap_mode='r'))
+        return segment
+
+    def postings(self, term):
+        """(doc_ids, tfs) of a term, or None when no resume of the segment has it"""
+        i = self.index.get(term)
+        if i is None:
+            return None
+        start, end = self.offsets[i], self.offsets[i + 1]
+        return self.doc_ids[start:end], self.tfs[start:end]
+
+def write_segment(directory, name, terms, term_ids, doc_ids, tfs, docs, lengths):
+    """Write postings grouped by term to a new segment directory; the rename makes it appear atomically"""
+    order = np.lexsort((doc_ids, term_ids))
+    offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(term_ids, minlength=len(terms)), out=offsets[1:])
+
+    path = os.path.join(directory, name)
+    temp_path = f'{path}.tmp'
+    os.makedirs(temp_path)
+    with open(os.path.join(temp_path, 'terms.json'), 'w', encoding='utf-8') as f:
+        json.dump(terms, f)
+    np.save(os.path.join(temp_path, 'offsets.npy'), offsets)
+    np.save(os.path.join(temp_path, 'doc_ids.npy'), doc_ids[order].astype(np.int32))
+    np.save(os.path.join(temp_path, 'tfs.npy'), tfs[order].astype(np.int32))
+    np.save(os.path.join(temp_path, 'docs.npy'), docs.astype(np.int32))
+    np.save(os.path.join(temp_path, 'lengths.npy'), lengths.astype(np.int32))
+    os.rename(temp_path, path)
+
+def build_segment(directory, name, documents):
+    """Write a segment for a list of (document id, {term: count})"""
+    terms = sorted({term for _, frequencies in documents for term in frequencies})
+    term_index = {term: i for i, term in enumerate(terms)}
+
+    term_ids, doc_ids, tfs = [], [], []
+    for analysis_id, frequencies in documents:
+        for term, tf in frequencies.items():
+            term_ids.append(term_index[term])
+            doc_ids.append(analysis_id)
+            tfs.append(tf)
+
+    write_segment(directory, name, terms,
+                  np.array(term_ids, dtype=np.int32),
+                  np.array(doc_ids, dtype=np.int32),
+                  np.array(tfs, dtype=np.int32),
+                  np.array([analysis_id for analysis_id, _ in documents], dtype=np.int32),
+                  np.array([sum(frequencies.values()) for _, frequencies in documents], dtype=np.int32))
+
+def merge_segment_files(directory, name, segments):
+    """Write one segment holding every posting of segments, remapping their term ids"""
+    terms = sorted(set().union(*(segment.index for segment in segments)))
+    term_index = {term: i for i, term in enumerate(terms)}
+
+    term_ids = []
+    for segment in segments:
+        mapping = np.array([term_index[term] for term in segment.terms], dtype=np.int32)
+        term_ids.append(np.repeat(mapping, np.diff(segment.offsets)))
+
+    write_segment(directory, name, terms,
+                  np.concatenate(term_ids),
+                  np.concatenate([segment.doc_ids for segment in segments]),
+                  np.concatenate([segment.tfs for segment in segments]),
+                  np.concatenate([segment.docs for segment in segments]),
+                  np.concatenate([segment.lengths for segment in segments]))
+
+def index_directory():
+    directory = app.config['SEARCH_INDEX_DIR']
+    os.makedirs(directory, exist_ok=True)
+    return directory
+
+def segment_name(first_id, last_id):
+    return f'{first_id}-{last_id}-{uuid.uuid4().hex[:8]}'
+
+def index_terms(resume_text):
+    """Keyword counts of a resume as stored in the index"""
+    return {term: count for term, count in keyword_frequencies(resume_text or '').items()
+            if len(term) <= MAX_TERM_LENGTH}
+
+def terms_version():
+    """Skills dictionary version and INDEX_FORMAT the index's terms are extracted with"""
+    return f'{INDEX_FORMAT}-{get_skill_matcher().version}'
+
+def index_new_analyses(max_rows=None):
+    """
+    Add the resumes of Analysis rows newer than the index watermark to the
+    search index, reading up to max_rows analyses in batches of
+    INDEX_BATCH_SIZE, then merge the smallest segments if there are more
+    than MAX_SEGMENTS. A resume analysed against several job descriptions
+    is indexed once. Returns the number of resumes indexed. An index built
+    with another terms_version() is cleared first, as its terms no longer
+    match what queries look up. Safe to run from several workers at once:
+    the state row only moves if no other worker moved it first, otherwise
+    the segment written meanwhile is thrown away.
+    """
+    version = terms_version()
+    with Session(db.engine) as session:
+        indexed_version = get_index_state(session).skills_version
+    if indexed_version != version:
+        logging.info(f"Search index terms changed from '{indexed_version}' to '{version}', rebuilding the search index")
+        clear_index(version)
+
+    read = indexed = 0
+    while max_rows is None or read < max_rows:
+        limit = INDEX_BATCH_SIZE if max_rows is None else min(INDEX_BATCH_SIZE, max_rows - read)
+        rows, documents = index_batch(limit)
+        if not rows:
+            break
+        read += rows
+        indexed += documents
+
+    if read:
+        merge_segments(MAX_SEGMENTS)
+    return indexed
+
+def index_batch(limit):
+    """Index the next limit analyses; returns (analyses read, resumes indexed)"""
+    directory = index_directory()
+    with Session(db.engine) as session:
+        state = get_index_state(session)
+        if state.skills_version != terms_version():
+            # The index is being rebuilt for another terms version
+            return 0, 0
+        rows = session.execute(
+            select_resume_texts(Analysis.id, Analysis.resume_hash)
+            .where(Analysis.id > state.last_analysis_id)
+            .order_by(Analysis.id)
+            .limit(limit)
+        ).all()
+        if not rows:
+            return 0, 0
+
+        # Resumes already indexed under an earlier analysis. Texts never
+        # moved to the content tables have no hash and count as their own resume
+        hashes = {row.resume_hash for row in rows if row.resume_hash}
+        seen = set(session.execute(
+            select(Analysis.resume_hash)
+            .where(Analysis.resume_hash.in_(hashes), Analysis.id <= state.last_analysis_id)
+            .distinct()
+        ).scalars()) if hashes else set()
+
+        documents = []
+        for analysis_id, resume_hash, content, compression, legacy_text in rows:
+            if resume_hash:
+                if resume_hash in seen:
+                    continue
+                seen.add(resume_hash)
+            documents.append((analysis_id, index_terms(stored_text(content, compression, legacy_text))))
+
+        segments = json.loads(state.segments)
+        if documents:
+            name = segment_name(rows[0].id, rows[-1].id)
+            build_segment(directory, name, documents)
+            segments.append(name)
+
+        committed = commit_state(session, state,
+                                 segments=segments,
+                                 last_analysis_id=rows[-1].id,
+                                 doc_count=state.doc_count + len(documents),
+                                 total_length=state.total_length + sum(sum(terms.values()) for _, terms in documents))
+        if not committed:
+            if documents:
+                shutil.rmtree(os.path.join(directory, name), ignore_errors=True)
+            return 0, 0
+        return len(rows), len(documents)
+
+def merge_segments(max_segments=MAX_SEGMENTS):
+    """Merge the smallest segments into one until at most max_segments remain"""
+    max_segments = max(max_segments, 1)
+    directory = index_directory()
+    with Session(db.engine) as session:
+        state = get_index_state(session)
+        names = json.loads(state.segments)
+        if len(names) <= max_segments:
+            return False
+
+        segments = sorted((Segment.load(directory, name) for name in names), key=lambda segment: len(segment.docs))
+        merged = segments[:len(names) - max_segments + 1]
+        merged_names = {segment.name for segment in merged}
+        name = segment_name(min(int(segment.docs.min()) for segment in merged),
+                            max(int(segment.docs.max()) for segment in merged))
+        merge_segment_files(directory, name, merged)
+
+        committed = commit_state(session, state, segments=[n for n in names if n not in merged_names] + [name])
+        # Readers that already mapped the old files keep reading them until they let go
+        for stale in (merged_names if committed else {name}):
+            shutil.rmtree(os.path.join(directory, stale), ignore_errors=True)
+        return committed
+
+def commit_state(session, state, **values):
+    """Apply values to the index state unless another worker changed it since it was read"""
+    if 'segments' in values:
+        values['segments'] = json.dumps(values['segments'])
+    claimed = session.execute(
+        update(SearchIndexState)
+        .where(SearchIndexState.id == STATE_ID, SearchIndexState.version == state.version)
+        .values(version=state.version + 1, updated_at=datetime.utcnow(), **values)
+    )
+    if claimed.rowcount != 1:
+        session.rollback()
+        return False
+    session.commit()
+    return True
+
+def get_index_state(session):
+    state = session.get(SearchIndexState, STATE_ID)
+    if state is not None:
+        return state
+
+    state = SearchIndexState(id=STATE_ID, version=0, last_analysis_id=0, doc_count=0, total_length=0, segments='[]',
+                             skills_version=terms_version())
+    session.add(state)
+    try:
+        session.commit()
+    except IntegrityError:
+        session.rollback()
+        state = session.get(SearchIndexState, STATE_ID)
+    return state
+
+def clear_index(version=None):
+    """Drop every segment so the next index run starts from the first Analysis, with terms of version"""
+    directory = index_directory()
+    if version is None:
+        version = terms_version()
+    with Session(db.engine) as session:
+        state = get_index_state(session)
+        names = json.loads(state.segments)
+        if not commit_state(session, state, segments=[], last_analysis_id=0, doc_count=0, total_length=0,
+                            skills_version=version):
+            return False
+    for name in names:
+        shutil.rmtree(os.path.join(directory, name), ignore_errors=True)
+    return True
+
+class IndexSnapshot:
+    """The segments of one index version, with resume lengths looked up by document id"""
+
+    __slots__ = ('version', 'doc_count', 'average_length', 'segments', 'lengths')
+
+    def __init__(self, state, segments):
+        self.version = state.version
+        self.doc_count = state.doc_count
+        self.average_length = state.total_length / state.doc_count if state.doc_count else 1.0
+        self.segments = segments
+
+        size = max((int(segment.docs.max()) for segment in segments if len(segment.docs)), default=0) + 1
+        self.lengths = np.zeros(size, dtype=np.float64)
+        for segment in segments:
+            self.lengths[segment.docs] = segment.lengths
+
+_snapshot = None
+_snapshot_lock = threading.Lock()
+
+def current_snapshot():
+    """The latest committed index version; segments are mapped once and reused across versions"""
+    global _snapshot
+
+    for attempt in range(2):
+        with Session(db.engine) as session:
+            state = session.get(SearchIndexState, STATE_ID)
+        if state is None:
+            return None
+
+        with _snapshot_lock:
+            if _snapshot is not None and _snapshot.version == state.version:
+                return _snapshot
+
+            loaded = {segment.name: segment for segment in _snapshot.segments} if _snapshot else {}
+            try:
+                segments = [loaded.get(name) or Segment.load(index_directory(), name)
+                            for name in json.loads(state.segments)]
+            except FileNotFoundError:
+                # A merge replaced these segments after the state was read
+                if attempt:
+                    raise
+                continue
+
+            _snapshot = IndexSnapshot(state, segments)
+            return _snapshot
+
+def top_candidates(job_description, k=10):
+    """
+    Best k indexed resumes for a job description by BM25, as a list of
+    (analysis_id, score 0-100) with the latest analysis of each resume.
+    Only the postings of the job's keywords are read, and every resume's
+    score is accumulated in one NumPy pass, so a query costs the length of
+    those posting lists rather than the corpus.
+    """
+    profile = get_job_profile(job_description)
+    snapshot = current_snapshot()
+    if snapshot is None or not snapshot.doc_count or not profile.keywords:
+        return []
+
+    doc_ids, contributions = [], []
+    best_possible = 0.0
+    for term in profile.keywords:
+        postings = [p for p in (segment.postings(term) for segment in snapshot.segments) if p is not None]
+        doc_freq = sum(len(ids) for ids, _ in postings)
+        idf = math.log1p((snapshot.doc_count - doc_freq + 0.5) / (doc_freq + 0.5))
+        weight = idf * profile.weights.get(term, 1.0)
+        # Normalised like the bm25 scoring engine, before its calibration to 55-95
+        best_possible += weight * (BM25_K1 + 1)
+        if not doc_freq:
+            continue
+
+        ids = np.concatenate([ids for ids, _ in postings])
+        tf = np.concatenate([tfs for _, tfs in postings]).astype(np.float64)
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * snapshot.lengths[ids] / snapshot.average_length)
+        doc_ids.append(ids)
+        contributions.append(weight * tf * (BM25_K1 + 1) / (tf + norm))
+
+    if not doc_ids or not best_possible:
+        return []
+
+    # Sum per resume over the touched ids only, not an array as long as the highest analysis id
+    touched, positions = np.unique(np.concatenate(doc_ids), return_inverse=True)
+    scores = np.bincount(positions, weights=np.concatenate(contributions), minlength=len(touched))
+    k = min(k, int(np.count_nonzero(scores)))
+    if k <= 0:
+        return []
+    top = np.argpartition(scores, -k)[-k:]
+    # Ties go to the earliest resume, as touched is sorted
+    top = top[np.lexsort((top, -scores[top]))]
+    ranked = [(int(touched[i]), round(float(scores[i]) / best_possible * 100, 2)) for i in top]
+    latest = latest_analyses([doc_id for doc_id, _ in ranked])
+    return [(latest.get(doc_id, doc_id), score) for doc_id, score in ranked]
+
+def latest_analyses(doc_ids):
+    """Latest Analysis id of each document's resume, by document id"""
+    with Session(db.engine) as session:
+        hashes = dict(session.execute(
+            select(Analysis.id, Analysis.resume_hash)
+            .where(Analysis.id.in_(doc_ids), Analysis.resume_hash.is_not(None))
+        ).all())
+        if not hashes:
+            return {}
+        latest = dict(session.execute(
+            select(Analysis.resume_hash, func.max(Analysis.id))
+            .where(Analysis.resume_hash.in_(set(hashes.values())))
+            .group_by(Analysis.resume_hash)
+        ).all())
+    return {doc_id: latest[resume_hash] for doc_id, resume_hash in hashes.items()}
+
+def search_index_stats():
+    snapshot = current_snapshot()
+    if snapshot is None:
+        return {'resumes': 0, 'segments': 0, 'postings': 0, 'version': 0}
+    return {
+        'resumes': snapshot.doc_count,
+        'segments': len(snapshot.segments),
+        'postings': sum(len(segment.doc_ids) for segment in snapshot.segments),
+        'version': snapshot.version
+    }
+
+@app.cli.command('index-resumes')
+@click.option('--rebuild', is_flag=True, help='Drop the index and build it again from scratch.')
+@click.option('--optimize', is_flag=True, help='Merge the whole index into a single segment.')
+def index_resumes_command(rebuild, optimize):
+    """Add stored resumes that are not in the search index yet."""
+    if rebuild:
+        clear_index()
+    started = time.monotonic()
+    count = index_new_analyses()
+    if optimize:
+        merge_segments(1)
+    elapsed = time.monotonic() - started
+
+    stats = search_index_stats()
+    click.echo(f"Indexed {count} resumes in {elapsed:.1f}s "
+               f"({stats['resumes']} resumes, {stats['segments']} segments, {stats['postings']} postings)")
+
+@app.cli.command('top-candidates')
+@click.argument('job_description', type=click.File('r'))
+@click.option('-k', '--top', default=10, show_default=True, help='Number of candidates to show.')
+def top_candidates_command(job_description, top):
+    """Show the stored resumes that best match a job description file ('-' for stdin)."""
+    index_new_analyses()
+    results = top_candidates(job_description.read(), min(top, MAX_TOP_K))
+    if not results:
+        click.echo("No matching resumes")
+        return
+
+    filenames = dict(db.session.execute(
+        select(Analysis.id, Analysis.filename).where(Analysis.id.in_([analysis_id for analysis_id, _ in results]))
+    ).all())
+    for rank, (analysis_id, score) in enumerate(results, 1):
+        click.echo(f"{rank:>3}. {score:6.2f}  #{analysis_id}  {filenames.get(analysis_id, '')}")
@@ -0,0 +1,199 @@
+import os
+import re
+import json
+import time
+import hashlib
+import logging
+import threading
+from collections import Counter, deque
+
+SKILLS_DICTIONARY = os.environ.get("SKILLS_DICTIONARY",
+                                   os.path.join(os.path.dirname(os.path.abspath(__file__)), 'skills.json'))
+SKILLS_RELOAD_INTERVAL = float(os.environ.get("SKILLS_RELOAD_INTERVAL", 5.0))  # seconds between mtime checks
+
+# Runs of letters/digits, and every other visible character on its own, so
+# "c#", "c++", "ci/cd" and "node.js" become token sequences that can match
+SKILL_TOKEN_PATTERN = re.compile(r'\w+|\S')
+
+def skill_tokens(text):
+    return SKILL_TOKEN_PATTERN.findall(text.lower())
+
+class ExactPhrase:
+    """
+    A phrase that only counts in the capitalisation given ("C", "Go") and
+    not next to the listed neighbours, so "Vitamin C", "J. R. Smith" or
+    "Spring 2024" are not skills. Neighbours are regular expressions matched
+    against the whole lowercased token before or after the phrase.
+    """
+
+    def __init__(self, phrase, not_preceded_by=(), not_followed_by=()):
+        self.tokens = SKILL_TOKEN_PATTERN.findall(phrase)
+        self.not_preceded_by = re.compile('|'.join(not_preceded_by)) if not_preceded_by else None
+        self.not_followed_by = re.compile('|'.join(not_followed_by)) if not_followed_by else None
+
+    def accepts(self, original, tokens, start):
+        end = start + len(self.tokens)
+        if original[start:end] != self.tokens:
+            return False
+        if self.not_preceded_by and start > 0 and self.not_preceded_by.fullmatch(tokens[start - 1]):
+            return False
+        if self.not_followed_by and end < len(tokens) and self.not_followed_by.fullmatch(tokens[end]):
+            return False
+        return True
+
+class SkillMatcher:
+    """
+    Aho-Corasick automaton over token sequences of a skills dictionary.
+    find() makes one pass over the text's tokens and returns canonical
+    skill names, preferring the leftmost-longest phrase when hits overlap.
+
+    A dictionary entry is a list of synonyms matched in any case, or, for
+    names that are also ordinary words, an object whose "exact" phrases are
+    matched as ExactPhrase with its "not_preceded_by" and "not_followed_by"
+    neighbours; the skill name itself is then only matched through them.
+    """
+
+    def __init__(self, dictionary, version=''):
+        self.version = version
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [()]
+        self.size = 0
+
+        for skill, entry in dictionary.items():
+            canonical = ' '.join(skill.lower().split())
+            if isinstance(entry, dict):
+                for phrase in entry.get('exact', []):
+                    rule = ExactPhrase(phrase, entry.get('not_preceded_by', ()), entry.get('not_followed_by', ()))
+                    self._add(skill_tokens(phrase), canonical, rule)
+                synonyms = entry.get('synonyms', [])
+            else:
+                synonyms = [skill, *entry]
+            for phrase in synonyms:
+                self._add(skill_tokens(phrase), canonical)
+        self._link()
+
+    def _add(self, tokens, canonical, rule=None):
+        if not tokens:
+            return
+        state = 0
+        for token in tokens:
+            next_state = self._goto[state].get(token)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][token] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append(())
+            state = next_state
+        if (len(tokens), canonical, rule) not in self._output[state]:
+            self._output[state] += ((len(tokens), canonical, rule),)
+            self.size += 1
+
+    def _link(self):
+        """Breadth-first failure links; each state also inherits its fallback's outputs"""
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for token, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and token not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(token, 0)
+                self._output[next_state] += self._output[self._fail[next_state]]
+
+    def find(self, text, tokens=None):
+        """Count canonical skills mentioned in text; tokens is skill_tokens(text), when the caller has it already"""
+        if tokens is None:
+            tokens = skill_tokens(text)
+
+        goto = self._goto
+        fail = self._fail
+        output = self._output
+
+        root = goto[0]
+
+        # Original-case tokens, only worked out once an exact phrase is hit
+        original = None
+
+        hits = []
+        state = 0
+        for position, token in enumerate(tokens):
+            if state:
+                while state and token not in goto[state]:
+                    state = fail[state]
+                state = goto[state].get(token, 0)
+            else:
+                # Most tokens start no phrase at all
+                state = root.get(token, 0)
+            if state:
+                for length, canonical, rule in output[state]:
+                    start = position - length + 1
+                    if rule is not None:
+                        if original is None:
+                            original = SKILL_TOKEN_PATTERN.findall(text)
+                            if len(original) != len(tokens):
+                                # Lowercasing split a token differently; skip exact phrases
+                                original = []
+                        if not rule.accepts(original, tokens, start):
+                            continue
+                    hits.append((start, -length, canonical))
+
+        # Leftmost-longest, non-overlapping: "machine learning" wins over "learning"
+        skills = Counter()
+        end = -1
+        for start, negative_length, canonical in sorted(hits):
+            if start > end:
+                skills[canonical] += 1
+                end = start - negative_length - 1
+        return skills
+
+def load_skill_matcher(path):
+    """Build a SkillMatcher from a JSON dictionary of skill -> list of synonyms, or -> exact phrase rules"""
+    with open(path, 'rb') as f:
+        content = f.read()
+    dictionary = json.loads(content)
+    return SkillMatcher(dictionary, version=hashlib.sha256(content).hexdigest()[:12])
+
+_matcher = SkillMatcher({})
+_matcher_mtime = None
+_checked_at = 0.0
+_reload_lock = threading.Lock()
+
+def get_skill_matcher():
+    """
+    The current skills automaton. The dictionary file's mtime is checked
+    at most every SKILLS_RELOAD_INTERVAL seconds and the automaton is rebuilt
+    when it changed; a broken file keeps the previous automaton.
+    """
+    global _matcher, _matcher_mtime, _checked_at
+
+    now = time.monotonic()
+    if now - _checked_at < SKILLS_RELOAD_INTERVAL and _matcher_mtime is not None:
+        return _matcher
+
+    with _reload_lock:
+        _checked_at = now
+        try:
+            mtime = os.stat(SKILLS_DICTIONARY).st_mtime_ns
+        except OSError:
+            mtime = -1
+        if mtime == _matcher_mtime:
+            return _matcher
+
+        # Remember the mtime even on failure so a broken file is reported once
+        _matcher_mtime = mtime
+        try:
+            _matcher = load_skill_matcher(SKILLS_DICTIONARY)
+            logging.info(f"Loaded {_matcher.size} skill phrases from {SKILLS_DICTIONARY}")
+        except Exception as e:
+            logging.error(f"Error loading skills dictionary {SKILLS_DICTIONARY}: {str(e)}")
+        return _matcher
+
+def extract_skills(text, tokens=None):
+    """Canonical skills and phrases from the skills dictionary found in text"""
+    return get_skill_matcher().find(text, tokens)
+
+# Build the automaton once at startup
+get_skill_matcher()
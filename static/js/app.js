@@ -9,6 +9,9 @@ document.addEventListener('DOMContentLoaded', function() {
     
     // Initialize tooltips and other Bootstrap components
     initializeBootstrapComponents();
+    
+    // Fill in AI suggestions on the results page once they are ready
+    initializeSuggestionPolling();
 });
 
 function initializeFileUpload() {
@@ -122,8 +125,12 @@ function initializeFormHandling() {
             return;
         }
         
+        // Queue the analysis in the background and poll for progress;
+        // without fetch the form falls back to a regular blocking POST
+        const useJobQueue = Boolean(form.dataset.jobUrl && window.fetch);
+        
         // Show loading modal
-        showLoadingState();
+        showLoadingState(!useJobQueue);
         loadingModal.show();
         
         // Disable form submission button
@@ -131,8 +138,83 @@ function initializeFormHandling() {
             analyzeBtn.disabled = true;
             analyzeBtn.innerHTML = '<span class="spinner-border spinner-border-sm me-2"></span>Analyzing...';
         }
+        
+        if (useJobQueue) {
+            e.preventDefault();
+            submitAnalysisJob();
+        }
     });
     
+    function submitAnalysisJob() {
+        updateJobProgress({ stage: 'queued', progress: 5 });
+        
+        fetch(form.dataset.jobUrl, {
+            method: 'POST',
+            body: new FormData(form),
+            headers: { 'Accept': 'application/json' }
+        })
+        .then(response => response.json().then(data => ({ ok: response.ok, data: data })))
+        .then(({ ok, data }) => {
+            if (!ok) {
+                throw new Error(data.error || 'An error occurred during analysis. Please try again.');
+            }
+            pollAnalysisJob(data.status_url);
+        })
+        .catch(handleJobError);
+    }
+    
+    function pollAnalysisJob(statusUrl) {
+        fetch(statusUrl, { headers: { 'Accept': 'application/json' } })
+        .then(response => response.json())
+        .then(job => {
+            updateJobProgress(job);
+            
+            // Scores are viewable once the analysis is saved; the results
+            // page polls for the AI suggestions on its own
+            if (job.results_url) {
+                window.location.href = job.results_url;
+            } else if (job.status === 'failed') {
+                throw new Error(job.error || 'An error occurred during analysis. Please try again.');
+            } else {
+                setTimeout(() => pollAnalysisJob(statusUrl), 1000);
+            }
+        })
+        .catch(handleJobError);
+    }
+    
+    function updateJobProgress(job) {
+        const stageLabels = {
+            queued: 'Waiting in queue...',
+            extracting: 'Extracting text from your resume...',
+            scoring: 'Scoring keywords, grammar and format...',
+            suggestions: 'Scores ready! Loading results...',
+            saving: 'Saving your results...',
+            done: 'Done! Loading results...'
+        };
+        
+        const stageText = document.getElementById('loadingStage');
+        if (stageText && stageLabels[job.stage]) {
+            stageText.textContent = stageLabels[job.stage];
+        }
+        
+        const progressBar = document.querySelector('.progress-bar');
+        if (progressBar && job.progress) {
+            progressBar.style.width = job.progress + '%';
+        }
+    }
+    
+    function handleJobError(error) {
+        loadingModal.hide();
+        form.classList.remove('loading');
+        
+        if (analyzeBtn) {
+            analyzeBtn.disabled = false;
+            analyzeBtn.innerHTML = '<i class="bi bi-search me-2"></i>Analyze Resume';
+        }
+        
+        showAlert(error.message, 'danger');
+    }
+    
     function validateForm() {
         const fileInput = document.getElementById('resume');
         const jobDescription = document.getElementById('job_description');
@@ -155,12 +237,14 @@ function initializeFormHandling() {
         return true;
     }
     
-    function showLoadingState() {
+    function showLoadingState(simulate) {
         // Add loading class to form
         form.classList.add('loading');
         
-        // Simulate progress for better UX
-        simulateProgress();
+        // Simulate progress for better UX when real progress is not reported
+        if (simulate) {
+            simulateProgress();
+        }
     }
     
     function simulateProgress() {
@@ -198,6 +282,34 @@ function initializeBootstrapComponents() {
     });
 }
 
+function initializeSuggestionPolling() {
+    const container = document.getElementById('aiSuggestions');
+    if (!container || !container.dataset.suggestionsUrl || !window.fetch) return;
+    
+    const suggestionsUrl = container.dataset.suggestionsUrl;
+    let attempts = 0;
+    
+    function poll() {
+        attempts += 1;
+        fetch(suggestionsUrl, { headers: { 'Accept': 'application/json' } })
+        .then(response => response.json())
+        .then(data => {
+            if (data.ready) {
+                container.innerHTML = data.html;
+            } else if (attempts < 120) {
+                setTimeout(poll, 1500);
+            }
+        })
+        .catch(() => {
+            if (attempts < 120) {
+                setTimeout(poll, 3000);
+            }
+        });
+    }
+    
+    poll();
+}
+
 function showAlert(message, type = 'info') {
     // Create alert element
     const alertDiv = document.createElement('div');
@@ -0,0 +1,39 @@
+import json
+import hashlib
+from app import app
+from models import SuggestionCacheEntry
+from cache import TieredCache
+
+MEMORY_CACHE_SIZE = 512
+
+def suggestion_cache_key(resume_text, job_description, **model_params):
+    """
+    SHA-256 over exactly what is sent to the model: the truncated resume and
+    job description plus every model parameter that changes the response
+    """
+    payload = json.dumps({
+        'resume': resume_text,
+        'job_description': job_description,
+        'model': model_params
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+def suggestion_entry(cache_key, suggestions):
+    return SuggestionCacheEntry(cache_key=cache_key, suggestions=json.dumps(suggestions))
+
+_cache = TieredCache('ai_suggestions', SuggestionCacheEntry,
+                     lambda entry: json.loads(entry.suggestions), suggestion_entry,
+                     max_entries=MEMORY_CACHE_SIZE, ttl=app.config['AI_SUGGESTION_CACHE_TTL'],
+                     max_rows=app.config['AI_SUGGESTION_CACHE_SIZE'])
+
+def get_cached_suggestions(cache_key):
+    """Return cached suggestions from memory or the database, or None"""
+    return _cache.get(cache_key)
+
+def store_suggestions(cache_key, suggestions):
+    """Cache suggestions in memory and, inside an app context, in the database"""
+    _cache.set(cache_key, suggestions)
+
+def suggestion_cache_stats():
+    """Memory-tier counters plus database hits and evictions"""
+    return _cache.stats()
@@ -0,0 +1,38 @@
+"""
+Parity of analyzer's precompiled word keywords with the original NLTK
+extract_keywords, on a fixed corpus. Needs NLTK's punkt and stopwords data,
+like the original did; skipped without them.
+"""
+import pytest
+
+from analyzer import word_frequencies
+from benchmarks.keyword_extraction import legacy_extract_keywords, make_corpus
+
+# Sentence breaks, abbreviations, contractions and quotes that Punkt and the
+# Treebank tokenizer treat specially
+EDGE_CASES = [
+    "Led the team. Delivered the project on time! Improved uptime?",
+    "Worked with Dr. Smith et al. on e.g. data pipelines, i.e. ETL.",
+    "I cannot stress this enough: we're gonna ship, wanna join? Don't.",
+    "\"Quoted\" 'single' «guillemets» résumé café naïve façade",
+    "C++ / C# / CI/CD / node.js / e-mail / 25% / 2019-2023 / U.S.A.",
+    "line one\nline two\n\n• bullet three\n- dash four",
+    "",
+]
+
+@pytest.fixture(scope='module')
+def legacy():
+    try:
+        legacy_extract_keywords("probe")
+    except (ImportError, LookupError):
+        pytest.skip("NLTK punkt/stopwords data not installed")
+    return legacy_extract_keywords
+
+@pytest.mark.parametrize('text', EDGE_CASES)
+def test_edge_cases_match_nltk(legacy, text):
+    assert list(word_frequencies(text).keys()) == legacy(text)
+
+def test_corpus_matches_nltk(legacy):
+    mismatches = [text for text in make_corpus(200, 300, seed=3)
+                  if list(word_frequencies(text).keys()) != legacy(text)]
+    assert not mismatches
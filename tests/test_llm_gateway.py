@@ -0,0 +1,57 @@
+"""
+llm_gateway against the fake OpenAI server of benchmarks/llm_gateway.py,
+through a real OpenAI client: concurrency cap, latency budget and circuit
+breaker.
+"""
+import time
+import threading
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+openai = pytest.importorskip('openai')
+
+from llm_gateway import LLMGateway
+from benchmarks.llm_gateway import FakeUpstream, FakeCompletionsHandler, run_calls
+
+@pytest.fixture(scope='module')
+def client():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FakeCompletionsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield openai.OpenAI(api_key='test', base_url=f"http://127.0.0.1:{server.server_port}/v1")
+    server.shutdown()
+
+@pytest.fixture(autouse=True)
+def upstream():
+    FakeUpstream.latency = 0.0
+    FakeUpstream.fail = False
+    FakeUpstream.peak_in_flight = 0
+    yield FakeUpstream
+    FakeUpstream.latency = 0.0
+    FakeUpstream.fail = False
+
+def test_concurrency_cap(client, upstream):
+    gateway = LLMGateway(max_concurrent=4, timeout=5.0, queue_timeout=5.0)
+    upstream.latency = 0.1
+    assert run_calls(gateway, client, 16) == ['ok'] * 16
+    assert upstream.peak_in_flight <= 4
+
+def test_budget_opens_and_recloses_circuit(client, upstream):
+    gateway = LLMGateway(max_concurrent=4, timeout=0.5, queue_timeout=0.5, failure_threshold=3, reset_timeout=1.0)
+    upstream.latency = 2.0
+    started = time.monotonic()
+    assert set(run_calls(gateway, client, 4)) == {'timeout'}
+    assert time.monotonic() - started < 1.0
+    assert gateway.breaker.state == 'open'
+    assert set(run_calls(gateway, client, 4)) == {'circuit_open'}
+
+    upstream.latency = 0.0
+    time.sleep(1.1)
+    assert run_calls(gateway, client, 1) == ['ok']
+    assert gateway.breaker.state == 'closed'
+
+def test_upstream_errors_open_circuit(client, upstream):
+    gateway = LLMGateway(max_concurrent=4, timeout=5.0, queue_timeout=5.0, failure_threshold=3)
+    upstream.fail = True
+    assert run_calls(gateway, client, 3) == ['error'] * 3
+    assert gateway.breaker.state == 'open'
@@ -0,0 +1,29 @@
+"""
+Golden check of the compiled grammar and format rules against the original
+per-heuristic implementations kept in benchmarks/resume_rules.py, on a
+fixed seeded corpus of resumes and edge cases.
+"""
+import random
+
+import pytest
+
+from analyzer import calculate_grammar_score, calculate_format_score
+from prepared_document import PreparedDocument
+from benchmarks.resume_rules import legacy_grammar_score, legacy_format_score, make_resume, make_edge_case
+
+def corpus(seed=21, resumes=500, edge_cases=2000):
+    rng = random.Random(seed)
+    return [make_resume(rng) for _ in range(resumes)] + [make_edge_case(rng) for _ in range(edge_cases)]
+
+CORPUS = corpus()
+
+@pytest.mark.parametrize('prepared', [False, True], ids=['text', 'prepared'])
+def test_scores_match_legacy(prepared):
+    mismatches = []
+    for text in CORPUS:
+        source = PreparedDocument(text) if prepared else text
+        scores = (calculate_grammar_score(source), calculate_format_score(source))
+        expected = (legacy_grammar_score(text), legacy_format_score(text))
+        if scores != expected:
+            mismatches.append((text, scores, expected))
+    assert not mismatches, mismatches[:5]
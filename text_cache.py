@@ -0,0 +1,60 @@
+import hashlib
+from app import app
+from models import ExtractedText
+from file_processor import EXTRACTOR_VERSION, PDF_MAX_PAGES, PDF_MAX_CHARS
+from cache import TieredCache
+from extraction_pool import extraction_pool
+
+MEMORY_CACHE_SIZE = 256
+
+def text_record(key, text, size_bytes):
+    return ExtractedText(content_hash=key, text=text, size_bytes=size_bytes)
+
+_cache = TieredCache('extracted_text', ExtractedText, lambda record: record.text, text_record,
+                     max_entries=MEMORY_CACHE_SIZE, max_rows=app.config['EXTRACTED_TEXT_CACHE_SIZE'],
+                     counters=('bytes_saved',))
+
+def content_hash(source):
+    """
+    SHA-256 of the file's bytes (streamed for paths) plus the extractor
+    version and caps, since those change the extracted text
+    """
+    digest = hashlib.sha256()
+    if isinstance(source, str):
+        with open(source, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+    else:
+        digest.update(source)
+    return f"{digest.hexdigest()}-{EXTRACTOR_VERSION}.{PDF_MAX_PAGES}.{PDF_MAX_CHARS}"
+
+def source_size(source):
+    if isinstance(source, str):
+        with open(source, 'rb') as f:
+            return f.seek(0, 2)
+    return len(source)
+
+def extract_text_cached(source, filename):
+    """
+    Sandboxed extraction with a content-hash cache in front of it.
+    source is the file's bytes or a path; repeated uploads of the same file
+    are served from memory or the ExtractedText table without parsing.
+    """
+    key = content_hash(source)
+
+    text = _cache.get(key)
+    if text is not None:
+        _cache.count('bytes_saved', source_size(source))
+        return text
+
+    text = extraction_pool.extract(source, filename)
+    _cache.set(key, text, size_bytes=source_size(source))
+    return text
+
+def text_cache_stats():
+    """Memory-tier counters plus database hits and upload bytes not re-parsed"""
+    stats = _cache.stats()
+    lookups = stats['hits'] + stats['misses']
+    # A memory miss that the database answered still skipped parsing
+    stats['hit_ratio'] = round((stats['hits'] + stats['db_hits']) / lookups, 4) if lookups else 0.0
+    return stats
@@ -0,0 +1,51 @@
+import os
+import zlib
+import hashlib
+import logging
+
+try:
+    import zstandard
+except ImportError:  # Optional; zlib is used instead
+    zstandard = None
+
+CONTENT_COMPRESSION = os.environ.get("CONTENT_COMPRESSION", "zlib").lower()  # none, zlib or zstd
+CONTENT_COMPRESS_MIN_BYTES = int(os.environ.get("CONTENT_COMPRESS_MIN_BYTES", 512))
+ZLIB_LEVEL = 6
+ZSTD_LEVEL = 9
+
+if CONTENT_COMPRESSION == 'zstd' and zstandard is None:
+    logging.warning("CONTENT_COMPRESSION=zstd but the zstandard package is not installed, using zlib")
+    CONTENT_COMPRESSION = 'zlib'
+
+def text_hash(text):
+    """SHA-256 of the exact text, the key of stored content rows"""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+def encode_text(text):
+    """
+    UTF-8 bytes of text, compressed when it is at least
+    CONTENT_COMPRESS_MIN_BYTES long and compression actually saves space.
+    Returns (data, compression), compression being None for plain bytes.
+    """
+    data = text.encode('utf-8')
+    if CONTENT_COMPRESSION == 'none' or len(data) < CONTENT_COMPRESS_MIN_BYTES:
+        return data, None
+
+    if CONTENT_COMPRESSION == 'zstd':
+        compressed = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    else:
+        compressed = zlib.compress(data, ZLIB_LEVEL)
+    if len(compressed) >= len(data):
+        return data, None
+    return compressed, CONTENT_COMPRESSION
+
+def decode_text(data, compression):
+    if compression == 'zlib':
+        data = zlib.decompress(data)
+    elif compression == 'zstd':
+        if zstandard is None:
+            raise RuntimeError("Stored content is zstd-compressed but the zstandard package is not installed")
+        data = zstandard.ZstdDecompressor().decompress(data)
+    elif compression is not None:
+        raise ValueError(f"Unknown content compression: {compression}")
+    return bytes(data).decode('utf-8')